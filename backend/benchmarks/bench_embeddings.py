@@ -0,0 +1,164 @@
+"""
+Benchmark: PyTorch vs int8 ONNX MiniLM embeddings.
+
+Reports load time, resident memory added, single-query latency, batch
+throughput, vector agreement (cosine) and retrieval agreement (top-k overlap
+when ranking the same passages with each backend).
+
+Usage (from backend/):
+    python benchmarks/bench_embeddings.py [--onnx-dir models/all-MiniLM-L6-v2-onnx-int8] [--rounds 200]
+
+The ONNX backend is loaded first so its memory figure does not include torch.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embeddings import (  # noqa: E402
+    DEFAULT_ONNX_MODEL_DIR,
+    MINILM_MODEL_NAME,
+    ONNX_MEAN_COSINE,
+    ONNX_MIN_COSINE,
+    OnnxMiniLMEmbeddings,
+)
+
+QUERIES = [
+    "BCNF kya hota hai example ke saath samjhao",
+    "difference between 3NF and BCNF",
+    "linked list aur array me kya difference hai",
+    "explain stack using array in C",
+    "what is a deadlock in operating system",
+    "java me applet lifecycle explain karo",
+    "TCP vs UDP short notes",
+    "binary search tree insertion algorithm",
+    "Kirchhoff's laws basic electronics",
+    "normalization ke advantages kya hai",
+    "how does paging work in memory management",
+    "ER diagram me weak entity kya hai",
+]
+
+PASSAGES = [
+    "Boyce-Codd Normal Form (BCNF) requires that for every functional dependency X -> Y, X is a super key.",
+    "Third normal form allows a non-prime attribute to depend on a candidate key only, removing transitive dependencies.",
+    "A linked list stores elements in nodes connected by pointers, while an array uses contiguous memory.",
+    "A stack can be implemented with an array and a top index; push increments top, pop decrements it.",
+    "Deadlock occurs when processes wait for resources held by each other: mutual exclusion, hold and wait, no preemption, circular wait.",
+    "The applet life cycle consists of init, start, paint, stop and destroy methods.",
+    "TCP is connection oriented and reliable; UDP is connectionless and faster but unreliable.",
+    "In a binary search tree, smaller keys go to the left subtree and larger keys to the right.",
+    "Kirchhoff's current law states the sum of currents entering a node equals the sum leaving it.",
+    "Normalization reduces redundancy and update anomalies in relational databases.",
+    "Paging divides memory into fixed-size frames and maps logical pages to frames through a page table.",
+    "A weak entity cannot be identified by its own attributes and depends on an owner entity.",
+    "IGNOU BCA assignments must be submitted before the term-end examination.",
+    "Sorting algorithms such as quicksort use divide and conquer to order elements.",
+    "HTML forms collect user input using input, select and textarea elements.",
+    "Matrices can be multiplied only when the number of columns of the first equals the rows of the second.",
+]
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except Exception:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _bench_backend(name: str, factory, rounds: int) -> tuple[dict, object]:
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    model = factory()
+    model.embed_query("warmup")
+    load_s = time.perf_counter() - started
+
+    latencies = []
+    for i in range(rounds):
+        q = QUERIES[i % len(QUERIES)]
+        t0 = time.perf_counter()
+        model.embed_query(q)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    batch = (PASSAGES * 4)[:64]
+    t0 = time.perf_counter()
+    for _ in range(5):
+        model.embed_documents(batch)
+    throughput = 5 * len(batch) / (time.perf_counter() - t0)
+
+    return {
+        "backend": name,
+        "load_s": round(load_s, 2),
+        "rss_added_mb": round(_rss_mb() - rss_before, 1),
+        "query_p50_ms": round(statistics.median(latencies), 2),
+        "query_p95_ms": round(_percentile(latencies, 95), 2),
+        "batch64_docs_per_s": round(throughput, 1),
+    }, model
+
+
+def _normalized(vectors) -> np.ndarray:
+    m = np.asarray(vectors, dtype=np.float32)
+    return m / np.clip(np.linalg.norm(m, axis=1, keepdims=True), 1e-12, None)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--onnx-dir", default=DEFAULT_ONNX_MODEL_DIR)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    onnx_stats, onnx_model = _bench_backend("onnx-int8", lambda: OnnxMiniLMEmbeddings(args.onnx_dir), args.rounds)
+
+    def _torch_factory():
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=MINILM_MODEL_NAME)
+
+    torch_stats, torch_model = _bench_backend("pytorch", _torch_factory, args.rounds)
+
+    texts = QUERIES + PASSAGES
+    a = _normalized(torch_model.embed_documents(texts))
+    b = _normalized(onnx_model.embed_documents(texts))
+    cosines = np.sum(a * b, axis=1)
+
+    pa, pb = a[len(QUERIES):], b[len(QUERIES):]
+    overlaps = []
+    top1_agree = 0
+    for qi in range(len(QUERIES)):
+        rank_a = list(np.argsort(-(pa @ a[qi]))[: args.k])
+        rank_b = list(np.argsort(-(pb @ b[qi]))[: args.k])
+        overlaps.append(len(set(rank_a) & set(rank_b)) / float(args.k))
+        top1_agree += int(rank_a[0] == rank_b[0])
+
+    print(f"{'backend':<10} {'load s':>7} {'+RSS MB':>8} {'p50 ms':>7} {'p95 ms':>7} {'docs/s':>8}")
+    for s in (torch_stats, onnx_stats):
+        print(
+            f"{s['backend']:<10} {s['load_s']:>7} {s['rss_added_mb']:>8} {s['query_p50_ms']:>7} "
+            f"{s['query_p95_ms']:>7} {s['batch64_docs_per_s']:>8}"
+        )
+    min_cos, mean_cos = float(cosines.min()), float(cosines.mean())
+    print(f"\ncosine(torch, onnx): min={min_cos:.4f} mean={mean_cos:.4f} "
+          f"(tolerance: min>={ONNX_MIN_COSINE}, mean>={ONNX_MEAN_COSINE})")
+    print(f"retrieval agreement: top-{args.k} overlap={statistics.mean(overlaps):.2%}, "
+          f"top-1 match={top1_agree}/{len(QUERIES)}")
+
+    ok = min_cos >= ONNX_MIN_COSINE and mean_cos >= ONNX_MEAN_COSINE
+    print("RESULT:", "compatible" if ok else "OUT OF TOLERANCE - do not serve the existing index with this model")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
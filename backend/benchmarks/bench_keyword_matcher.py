@@ -0,0 +1,174 @@
+"""
+Benchmark: per-detector linear keyword scans vs one shared KeywordMatcher pass.
+
+Runs the keyword detectors a /chat message goes through (Frenzy reset and
+trigger, persona trigger, Jiya question type, intent, response style, subject
+context) on realistic Hinglish messages, first the old way (every detector
+lowercases the message and runs ``any(k in text ...)`` over its own lists)
+and then from one ``KeywordMatcher.find`` result. Both must agree.
+
+Usage (from backend/):
+    python benchmarks/bench_keyword_matcher.py [--rounds 2000] [--repeat 1]
+
+``--repeat N`` concatenates each message N times to see how long pastes scale.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import KeywordMatcher  # noqa: E402
+from persona import (  # noqa: E402
+    INTENT_ACADEMIC_KEYWORDS,
+    INTENT_COMMAND_KEYWORDS,
+    INTENT_PERSONA_KEYWORDS,
+    INTENT_SUBJECT_KEYWORDS,
+    JIYA_QUESTION_KEYWORDS,
+    PERSONA_KEYWORDS,
+    PERSONA_TRIGGER_KEYWORDS,
+    RESPONSE_STYLE_KEYWORDS,
+    SUBJECT_CODE_NAMES,
+    SUBJECT_NAME_KEYWORDS,
+    classify_intent,
+    detect_jiya_question_type,
+    detect_persona_trigger,
+    detect_response_style,
+    extract_subject_context,
+)
+
+# Same lists as main.py, which cannot be imported without the model stack.
+FRENZY_TRIGGER_PHRASES = [
+    "frenzy", "frenzy mode", "activate frenzy", "frenzy identity",
+    "who is frenzy", "who are you frenzy", "i am frenzy", "you are frenzy",
+]
+FRENZY_RESET_PHRASES = ["reset frenzy", "clear frenzy", "exit frenzy", "disable frenzy", "restore theme"]
+
+MESSAGES = [
+    "BCNF kya hota hai example ke saath samjhao",
+    "bhai kal MCS-023 ka exam hai, normalization aur 3NF vs BCNF ka difference jaldi se bata do",
+    "linked list aur array me kya difference hai? C me code bhi dena",
+    "java me applet lifecycle explain karo, init start paint stop destroy sab",
+    "yaar mujhse nahi ho raha, bahut stuck hu recursion pe, i can't understand it",
+    "kya haal hai? bored ho raha tha toh socha baat kar lu",
+    "who is jiya? saurav ne tumhe kisne banaya",
+    "19 april ko kya hua tha, tell me about jiya",
+    "TCP vs UDP short notes chahiye network ke liye, unit 2 se",
+    "reset frenzy",
+    "html aur css se ek simple login form ka code likh ke do with validation",
+    "operating system me deadlock ke 4 conditions kaun si hoti hai? example do please",
+    "Statistics ka mean median mode wala chapter summary me chahiye, bcs-040 unit 1",
+    "ok thanks, next question: dbms me weak entity kya hai aur ER diagram me kaise dikhate hai",
+]
+
+
+def _any(text: str, keywords) -> bool:
+    return any(k in text for k in keywords)
+
+
+def legacy_detect(message: str) -> tuple:
+    """The scans /chat used to run, one lowercase and one ``any`` per list."""
+    msg = message.strip().lower()
+    frenzy_reset = bool(msg) and _any(msg, FRENZY_RESET_PHRASES)
+    frenzy_trigger = bool(msg) and (msg == "frenzy" or _any(msg, FRENZY_TRIGGER_PHRASES))
+    lower = message.lower()
+    trigger = next((label for label, kws in PERSONA_TRIGGER_KEYWORDS if _any(message.lower(), kws)), None)
+    jiya_type = next((label for label, kws in JIYA_QUESTION_KEYWORDS if _any(message.lower(), kws)), "jiya_general")
+    if _any(lower.strip(), INTENT_PERSONA_KEYWORDS):
+        intent = "PERSONAL"
+    elif _any(lower.strip(), INTENT_COMMAND_KEYWORDS):
+        intent = "COMMAND"
+    elif _any(lower.strip(), INTENT_ACADEMIC_KEYWORDS) or _any(lower.strip(), INTENT_SUBJECT_KEYWORDS):
+        intent = "ACADEMIC"
+    else:
+        intent = "AMBIGUOUS"
+    style = next((label for label, kws in RESPONSE_STYLE_KEYWORDS if _any(message.lower(), kws)), "ACADEMIC")
+    subject = next((c for c in SUBJECT_CODE_NAMES if c in message.lower()), None) or next(
+        (c for k, c in SUBJECT_NAME_KEYWORDS.items() if k in message.lower()), "UNKNOWN"
+    )
+    # The rest of extract_subject_context, as it was (the unit lookup re-split per word).
+    topics = [w for w in message.lower().split() if len(w) > 4 and w not in ['explain', 'teach', 'define', 'what', 'unit']]
+    unit = None
+    if 'unit' in message.lower():
+        for i, word in enumerate(message.lower().split()):
+            if word == 'unit' and i + 1 < len(message.lower().split()):
+                try:
+                    unit = int(message.lower().split()[i + 1].strip(':,;'))
+                except ValueError:
+                    pass
+    return frenzy_reset, frenzy_trigger, trigger, jiya_type, intent, style, (subject, topics[:5], unit)
+
+
+def matcher_detect(matcher: KeywordMatcher, message: str) -> tuple:
+    """The same answers from one ``find`` pass shared by every detector."""
+    hits = matcher.find(message)
+    msg = message.strip().lower()
+    frenzy_reset = bool(msg) and not hits.isdisjoint(FRENZY_RESET_PHRASES)
+    frenzy_trigger = bool(msg) and (msg == "frenzy" or not hits.isdisjoint(FRENZY_TRIGGER_PHRASES))
+    return (
+        frenzy_reset,
+        frenzy_trigger,
+        detect_persona_trigger(message, hits),
+        detect_jiya_question_type(message, hits),
+        classify_intent(message, hits=hits),
+        detect_response_style(message, hits=hits),
+        _subject_fields(extract_subject_context(message, hits=hits)),
+    )
+
+
+def _subject_fields(context: dict) -> tuple:
+    return context["subject_code"], context["topic_keywords"], context["unit"]
+
+
+def _time_per_message(fn, messages: list[str], rounds: int) -> list[float]:
+    samples = []
+    for i in range(rounds):
+        message = messages[i % len(messages)]
+        t0 = time.perf_counter()
+        fn(message)
+        samples.append((time.perf_counter() - t0) * 1e6)
+    return samples
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    messages = [" ".join([m] * max(1, args.repeat)) for m in MESSAGES]
+    t0 = time.perf_counter()
+    matcher = KeywordMatcher(PERSONA_KEYWORDS, FRENZY_TRIGGER_PHRASES, FRENZY_RESET_PHRASES)
+    build_ms = (time.perf_counter() - t0) * 1000.0
+
+    mismatches = [m for m in messages if legacy_detect(m) != matcher_detect(matcher, m)]
+    if mismatches:
+        for m in mismatches:
+            print(f"[bench] MISMATCH {m!r}: {legacy_detect(m)} != {matcher_detect(matcher, m)}")
+        return 1
+
+    avg_len = statistics.mean(len(m) for m in messages)
+    print(f"[bench] {len(matcher.keywords)} keywords, matcher built in {build_ms:.2f} ms; "
+          f"{len(messages)} messages, {avg_len:.0f} chars on average")
+    print(f"{'detectors':<10} {'p50 us':>8} {'p95 us':>8} {'mean us':>8}")
+    results = {}
+    for name, fn in (("linear", legacy_detect), ("matcher", lambda m: matcher_detect(matcher, m))):
+        fn(messages[0])
+        samples = _time_per_message(fn, messages, args.rounds)
+        results[name] = statistics.mean(samples)
+        print(f"{name:<10} {statistics.median(samples):>8.1f} {_percentile(samples, 95):>8.1f} {results[name]:>8.1f}")
+    print(f"[bench] speedup (mean): {results['linear'] / results['matcher']:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+"""
+Retrieval benchmark: recall@k, MRR, latency percentiles, memory and index size.
+
+Runs a labelled query set against candidate retrieval configurations so that
+changes to ``k``, chunking or index loading in ``_retrieve_study_material`` can
+be compared on numbers instead of gut feel. Everything runs offline:
+
+* fixture mode (default): the corpus in ``fixtures/retrieval_corpus.jsonl`` is
+  chunked and indexed once per candidate config, and queries are scored against
+  the fixture document ids they expect;
+* ``--index DIR``: the queries are run against an existing index directory
+  (e.g. the live ``vectorstore/db_faiss``) and scored on subject / source file
+  metadata, since chunk ids of a real index are not stable.
+
+Query set format (JSONL, one object per line):
+    {"query": "...", "expected_ids": ["mcs023-normalization"], "expected_subject": "MCS-023"}
+``expected_sources`` (PDF file names) may be used instead of ids for real indexes.
+
+Usage (from backend/):
+    python benchmarks/bench_retrieval.py
+    python benchmarks/bench_retrieval.py --config small:chunk_size=300,chunk_overlap=30,k=5 --config wide:k=8
+    python benchmarks/bench_retrieval.py --index vectorstore/db_faiss --match subject
+    python benchmarks/bench_retrieval.py --embeddings hashing --json results.json
+
+``--embeddings torch`` / ``onnx`` use the production MiniLM model from the local
+cache (HF_HUB_OFFLINE is set); ``hashing`` needs no model at all and is meant
+for smoke runs of the harness itself - its absolute numbers are meaningless.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Optional
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+import numpy as np  # noqa: E402
+from langchain_core.embeddings import Embeddings  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from ingest_pdfs import CHUNK_OVERLAP, CHUNK_SIZE, DEFAULT_OUTPUT, dedupe_chunks  # noqa: E402
+from vector_index import export_sqlite_docstore, load_study_store  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DEFAULT_CORPUS = os.path.join(FIXTURES_DIR, "retrieval_corpus.jsonl")
+DEFAULT_QUERIES = os.path.join(FIXTURES_DIR, "retrieval_queries.jsonl")
+
+# Mirrors production: ingest_pdfs chunking and _retrieve_study_material(k=5) over the mmap store.
+BASELINE_CONFIG = {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP, "k": 5, "mmap": True}
+RECALL_KS = (1, 3, 5, 10)
+
+
+class HashingEmbeddings(Embeddings):
+    """Model-free embedding (hashed word unigrams + bigrams) for offline smoke runs."""
+
+    def __init__(self, size: int = 512):
+        self.size = size
+
+    def _embed(self, text: str) -> list[float]:
+        words = re.findall(r"[a-z0-9]+", str(text or "").lower())
+        vec = np.zeros(self.size, dtype=np.float32)
+        for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            vec[int(hashlib.md5(token.encode("utf-8")).hexdigest()[:8], 16) % self.size] += 1.0
+        norm = float(np.linalg.norm(vec))
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+def _make_embeddings(kind: str) -> Any:
+    if kind == "hashing":
+        return HashingEmbeddings()
+    from embeddings import build_base_embeddings
+    return build_base_embeddings(kind)
+
+
+def _read_jsonl(path: str) -> list[dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_query_set(path: str = DEFAULT_QUERIES) -> list[dict[str, Any]]:
+    queries = _read_jsonl(path)
+    for row in queries:
+        if not str(row.get("query", "")).strip():
+            raise ValueError(f"Query without text in {path}: {row}")
+        if not (row.get("expected_ids") or row.get("expected_subject") or row.get("expected_sources")):
+            raise ValueError(f"Query without labels in {path}: {row['query']!r}")
+    return queries
+
+
+def parse_config(spec: str) -> tuple[str, dict[str, Any]]:
+    """Parse ``name:key=value,...`` (name optional) on top of the baseline config."""
+    name, _, body = spec.rpartition(":") if ":" in spec else ("", "", spec)
+    config = dict(BASELINE_CONFIG)
+    for item in filter(None, (p.strip() for p in body.split(","))):
+        key, _, value = item.partition("=")
+        key = key.strip()
+        if key not in config:
+            raise ValueError(f"Unknown config key {key!r} (expected one of {sorted(config)})")
+        if key == "mmap":
+            config[key] = value.strip().lower() not in {"0", "false", "no", "off"}
+        else:
+            config[key] = int(value)
+    return name or spec, config
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except Exception:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def dir_size_bytes(path: str) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def relevance_key(doc: Any, query: dict[str, Any], match: str) -> Optional[str]:
+    """Return the label ``doc`` satisfies for ``query`` (None when irrelevant)."""
+    metadata = getattr(doc, "metadata", {}) or {}
+    if match == "ids":
+        doc_id = str(metadata.get("doc_id", ""))
+        return doc_id if doc_id in set(query.get("expected_ids") or []) else None
+    expected_sources = set(query.get("expected_sources") or [])
+    if expected_sources:
+        source = os.path.basename(str(metadata.get("source", "")))
+        return source if source in expected_sources else None
+    subject = str(metadata.get("subject", "")).strip().upper()
+    expected = str(query.get("expected_subject", "")).strip().upper()
+    return subject if expected and subject == expected else None
+
+
+def _expected_count(query: dict[str, Any], match: str) -> int:
+    if match == "ids":
+        return len(set(query.get("expected_ids") or []))
+    return len(set(query.get("expected_sources") or [])) or 1
+
+
+def score_ranking(keys: list[Optional[str]], expected: int, ks: tuple[int, ...] = RECALL_KS) -> dict[str, float]:
+    """recall@k (distinct labels found / labels expected) and reciprocal rank for one query."""
+    scores: dict[str, float] = {}
+    for k in ks:
+        found = {key for key in keys[:k] if key is not None}
+        scores[f"recall@{k}"] = len(found) / float(max(1, expected))
+    first = next((rank for rank, key in enumerate(keys, start=1) if key is not None), None)
+    scores["rr"] = 1.0 / first if first else 0.0
+    return scores
+
+
+def evaluate_store(store: Any, queries: list[dict[str, Any]], match: str, k: int, repeats: int = 3) -> dict[str, Any]:
+    ks = tuple(sorted(set(RECALL_KS) | {int(k)}))
+    depth = max(ks)
+    store.similarity_search("warmup", k=1)
+
+    per_query: list[dict[str, float]] = []
+    latencies_ms: list[float] = []
+    for query in queries:
+        docs: list[Any] = []
+        for _ in range(max(1, repeats)):
+            started = time.perf_counter()
+            docs = store.similarity_search(query["query"], k=depth)
+            latencies_ms.append((time.perf_counter() - started) * 1000.0)
+        keys = [relevance_key(doc, query, match) for doc in docs]
+        per_query.append(score_ranking(keys, _expected_count(query, match), ks))
+
+    result: dict[str, Any] = {"queries": len(queries)}
+    for key in per_query[0] if per_query else []:
+        result["mrr" if key == "rr" else key] = round(statistics.mean(q[key] for q in per_query), 4)
+    # MRR is computed over the full depth; the app only ever sees the top k.
+    result["recall@k"] = result.get(f"recall@{k}", 0.0)
+    result.update({
+        "p50_ms": round(percentile(latencies_ms, 50), 2),
+        "p95_ms": round(percentile(latencies_ms, 95), 2),
+        "p99_ms": round(percentile(latencies_ms, 99), 2),
+    })
+    return result
+
+
+def build_fixture_index(corpus: list[dict[str, Any]], config: dict[str, Any], embeddings: Any, output_dir: str) -> dict[str, int]:
+    """Chunk, de-duplicate and index the fixture corpus the same way ingest_pdfs does."""
+    from langchain_community.vectorstores import FAISS
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=config["chunk_size"], chunk_overlap=config["chunk_overlap"])
+    chunks: list[tuple[str, dict[str, Any]]] = []
+    for row in corpus:
+        base_meta = {
+            "doc_id": row["id"],
+            "source": f"{row['id']}.pdf",
+            "subject": row.get("subject", ""),
+            "category": row.get("category", ""),
+        }
+        for text in splitter.split_text(row["text"]):
+            chunks.append((text, dict(base_meta)))
+    kept, stats = dedupe_chunks(chunks)
+
+    texts = [text for text, _ in kept]
+    vectors = embeddings.embed_documents(texts)
+    store = FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=[meta for _, meta in kept])
+    store.save_local(output_dir)
+    export_sqlite_docstore(output_dir, store)
+    return stats
+
+
+def run_config(
+    name: str,
+    config: dict[str, Any],
+    queries: list[dict[str, Any]],
+    embeddings: Any,
+    corpus: Optional[list[dict[str, Any]]] = None,
+    index_dir: Optional[str] = None,
+    match: str = "ids",
+    repeats: int = 3,
+) -> dict[str, Any]:
+    """Benchmark one configuration; builds a throwaway fixture index unless ``index_dir`` is given."""
+    work_dir = None
+    chunk_stats: dict[str, int] = {}
+    try:
+        if index_dir is None:
+            work_dir = tempfile.mkdtemp(prefix="bench-retrieval-")
+            index_dir = work_dir
+            chunk_stats = build_fixture_index(corpus or [], config, embeddings, index_dir)
+
+        rss_before = _rss_mb()
+        started = time.perf_counter()
+        store = load_study_store(index_dir, embeddings, prefer_mmap=config["mmap"])
+        load_ms = (time.perf_counter() - started) * 1000.0
+        result = evaluate_store(store, queries, match, config["k"], repeats=repeats)
+        result.update({
+            "config": name,
+            "settings": dict(config),
+            "store": type(store).__name__,
+            "load_ms": round(load_ms, 1),
+            "rss_added_mb": round(_rss_mb() - rss_before, 1),
+            "index_bytes": dir_size_bytes(index_dir),
+        })
+        if chunk_stats:
+            result["chunks"] = chunk_stats.get("kept", 0)
+        return result
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _print_table(results: list[dict[str, Any]]) -> None:
+    columns = ["config", "k", "recall@k", "recall@1", "recall@3", "recall@5", "recall@10", "mrr",
+               "p50_ms", "p95_ms", "p99_ms", "rss_added_mb", "index_kb"]
+    rows = []
+    for r in results:
+        rows.append([
+            r["config"], r["settings"]["k"], r["recall@k"], r["recall@1"], r["recall@3"], r["recall@5"], r["recall@10"],
+            r["mrr"], r["p50_ms"], r["p95_ms"], r["p99_ms"], r["rss_added_mb"], round(r["index_bytes"] / 1024, 1),
+        ])
+    widths = [max(len(str(c)), *(len(str(row[i])) for row in rows)) for i, c in enumerate(columns)]
+    print("  ".join(str(c).ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(v).ljust(w) for v, w in zip(row, widths)))
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark study-material retrieval on a labelled query set.")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="Labelled query set (JSONL)")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Fixture corpus (JSONL) used when --index is not given")
+    parser.add_argument("--index", nargs="?", const=DEFAULT_OUTPUT, default=None,
+                        help="Benchmark an existing index directory instead of the fixture corpus "
+                             "(no value: %(const)s)")
+    parser.add_argument("--config", action="append", default=[],
+                        help="Candidate config 'name:chunk_size=..,chunk_overlap=..,k=..,mmap=..' (repeatable); "
+                             "the production baseline is always included")
+    parser.add_argument("--match", choices=["ids", "subject"], default=None,
+                        help="Relevance labels to score on (default: ids for fixtures, subject for --index)")
+    parser.add_argument("--embeddings", choices=["torch", "onnx", "hashing"], default="torch")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed searches per query")
+    parser.add_argument("--json", dest="json_path", default="", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        queries = load_query_set(args.queries)
+        configs = [("baseline", dict(BASELINE_CONFIG))] + [parse_config(spec) for spec in args.config]
+    except (OSError, ValueError) as e:
+        print(f"[bench] {e}")
+        return 1
+    match = args.match or ("subject" if args.index else "ids")
+    if args.index and not os.path.isdir(args.index):
+        print(f"[bench] index directory not found: {args.index}")
+        return 1
+    corpus = None if args.index else _read_jsonl(args.corpus)
+    embeddings = _make_embeddings(args.embeddings)
+
+    results = []
+    for name, config in configs:
+        # Chunking only applies to fixture builds; an existing index is reused as-is.
+        results.append(run_config(name, config, queries, embeddings, corpus=corpus, index_dir=args.index,
+                                  match=match, repeats=args.repeats))
+    print(f"[bench] {len(queries)} queries, match={match}, embeddings={args.embeddings}")
+    _print_table(results)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[bench] wrote {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+SQLite write-concurrency benchmark: chat-turn throughput per storage profile.
+
+Simulates the API under load: ``--workers`` processes (uvicorn workers), each
+with ``--threads`` request threads that write /chat turns (session + user
+message + reply in one transaction, as ``ChatTurn.commit`` does) while
+``--readers`` threads per process keep reading history tails. Every profile
+runs against a fresh temporary database, so the numbers are comparable:
+
+* ``compat``: the old engine (driver defaults, rollback journal, no busy_timeout);
+* ``production``: WAL, busy_timeout, synchronous=NORMAL, foreign_keys, mmap/cache.
+
+Reported per profile: committed turns/s, commit latency p50/p95 and the number
+of turns lost to "database is locked".
+
+Usage (from backend/):
+    python benchmarks/bench_sqlite_writes.py
+    python benchmarks/bench_sqlite_writes.py --workers 4 --threads 8 --seconds 10 --profile production
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+PROFILES = ("compat", "production")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[rank]
+
+
+def _worker(url: str, profile: str, threads: int, readers: int, seconds: float, queue: Any) -> None:
+    from sqlalchemy.orm import sessionmaker
+
+    from chat_store import ChatTurn, fetch_history_tail
+    from database import create_db_engine
+
+    engine = create_db_engine(url, profile=profile, pool_size=threads + readers, max_overflow=0)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    deadline = time.perf_counter() + seconds
+    latencies: list[float] = []
+    stats = {"turns": 0, "locked": 0, "errors": 0, "reads": 0}
+    lock = threading.Lock()
+
+    def write_loop() -> None:
+        db = Session()
+        session_id: Optional[int] = None
+        try:
+            while time.perf_counter() < deadline:
+                turn = ChatTurn(db, user_id=1, session_id=session_id, new_session_title="bench")
+                turn.add_user_message("Explain BCNF with an example. " * 4)
+                turn.add_ai_message("BCNF requires every determinant to be a super key. " * 20)
+                started = time.perf_counter()
+                try:
+                    # Same statements as ChatTurn.commit, without its catch-and-log, so lock errors are counted.
+                    if turn._session is not None:
+                        db.add(turn._session)
+                    db.add_all(turn._messages)
+                    db.commit()
+                    if turn._session is not None:
+                        session_id = turn._session.id
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        stats["turns"] += 1
+                        latencies.append(elapsed)
+                except Exception as e:
+                    db.rollback()
+                    with lock:
+                        stats["locked" if "locked" in str(e) else "errors"] += 1
+        finally:
+            db.close()
+
+    def read_loop() -> None:
+        db = Session()
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    fetch_history_tail(db, 1, 40)
+                    db.rollback()  # end the read transaction like a finished request
+                    with lock:
+                        stats["reads"] += 1
+                except Exception:
+                    db.rollback()
+                    with lock:
+                        stats["errors"] += 1
+        finally:
+            db.close()
+
+    pool = [threading.Thread(target=write_loop) for _ in range(threads)]
+    pool += [threading.Thread(target=read_loop) for _ in range(readers)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    engine.dispose()
+    queue.put({"stats": stats, "latencies": latencies})
+
+
+def run_profile(profile: str, workers: int, threads: int, readers: int, seconds: float) -> dict[str, Any]:
+    from sqlalchemy.orm import sessionmaker
+
+    from database import Base, User, create_db_engine
+
+    tmp = tempfile.mkdtemp(prefix="bench_sqlite_")
+    try:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_db_engine(url, profile=profile)
+        Base.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as db:
+            db.add(User(id=1, username="bench"))
+            db.commit()
+        engine.dispose()
+
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+        procs = [ctx.Process(target=_worker, args=(url, profile, threads, readers, seconds, queue))
+                 for _ in range(workers)]
+        started = time.perf_counter()
+        for p in procs:
+            p.start()
+        parts = [queue.get() for _ in procs]
+        for p in procs:
+            p.join()
+        wall = time.perf_counter() - started
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    totals = {"turns": 0, "locked": 0, "errors": 0, "reads": 0}
+    latencies: list[float] = []
+    for part in parts:
+        for key in totals:
+            totals[key] += part["stats"][key]
+        latencies.extend(part["latencies"])
+    return {
+        "profile": profile,
+        "turns": totals["turns"],
+        "turns_per_s": totals["turns"] / max(seconds, 1e-9),
+        "commit_p50_ms": percentile(latencies, 50) * 1000,
+        "commit_p95_ms": percentile(latencies, 95) * 1000,
+        "locked": totals["locked"],
+        "errors": totals["errors"],
+        "reads_per_s": totals["reads"] / max(seconds, 1e-9),
+        "wall_s": wall,
+    }
+
+
+def _print_table(results: list[dict[str, Any]]) -> None:
+    header = f"{'profile':<12}{'turns/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'locked':>9}{'errors':>8}{'reads/s':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['profile']:<12}{r['turns_per_s']:>10.1f}{r['commit_p50_ms']:>10.2f}{r['commit_p95_ms']:>10.2f}"
+              f"{r['locked']:>9}{r['errors']:>8}{r['reads_per_s']:>10.1f}")
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark concurrent /chat turn writes per SQLite profile.")
+    parser.add_argument("--profile", action="append", choices=PROFILES, default=[],
+                        help="Profile to run (repeatable; default: all)")
+    parser.add_argument("--workers", type=int, default=2, help="Writer processes (API workers)")
+    parser.add_argument("--threads", type=int, default=4, help="Writing threads per process")
+    parser.add_argument("--readers", type=int, default=2, help="History-reading threads per process")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration per profile")
+    parser.add_argument("--json", dest="json_path", default="", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    profiles = args.profile or list(PROFILES)
+    results = [run_profile(p, max(1, args.workers), max(1, args.threads), max(0, args.readers), args.seconds)
+               for p in profiles]
+    print(f"[bench] {args.workers} workers x {args.threads} writers (+{args.readers} readers), {args.seconds:g}s each")
+    _print_table(results)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Record SQLite query plans and timings for the hot queries before/after migrations.
+
+Builds a temporary database at ``--before`` (default: the baseline revision),
+seeds it with synthetic users, sessions, messages, roadmaps and APC logs,
+prints ``EXPLAIN QUERY PLAN`` plus the mean latency of each hot query, then
+upgrades to ``--after`` (default: head) and does the same again. The queries
+are the statements the endpoints issue (history tail, /history, /sessions,
+/syllabus-progress, /apc/history, /study-roadmap/history).
+
+Usage (from backend/):
+    python benchmarks/query_plans.py
+    python benchmarks/query_plans.py --users 500 --output benchmarks/query_plans.md
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import create_engine, select, text
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from database import APCLog, ChatHistory, ChatSession, StudyRoadmap, run_migrations  # noqa: E402
+
+USER_ID = 7
+SESSION_ID = 77
+
+
+def hot_queries() -> list[tuple[str, Any]]:
+    tail = (
+        select(ChatHistory.id, ChatHistory.sender, ChatHistory.text)
+        .where(ChatHistory.session_id == SESSION_ID)
+        .order_by(ChatHistory.id.desc())
+        .limit(40)
+    )
+    session_history = select(ChatHistory).where(ChatHistory.session_id == SESSION_ID).order_by(ChatHistory.id)
+    sessions = select(ChatSession).where(ChatSession.user_id == USER_ID).order_by(ChatSession.id.desc())
+    user_sessions = select(ChatSession.id).where(ChatSession.user_id == USER_ID)
+    recent_history = (
+        select(ChatHistory)
+        .where(ChatHistory.session_id.in_(user_sessions))
+        .order_by(ChatHistory.id.desc())
+        .limit(500)
+    )
+    last_user_message = (
+        select(ChatHistory)
+        .join(ChatSession, ChatHistory.session_id == ChatSession.id)
+        .where(ChatSession.user_id == USER_ID, ChatHistory.sender == "user")
+        .order_by(ChatHistory.id.desc())
+        .limit(1)
+    )
+    apc_history = select(APCLog).where(APCLog.user_id == USER_ID).order_by(APCLog.id.desc()).limit(50)
+    roadmaps = select(StudyRoadmap).where(StudyRoadmap.user_id == USER_ID).order_by(StudyRoadmap.id.desc()).limit(100)
+    return [
+        ("history tail (/chat)", tail),
+        ("session history (/history?session_id)", session_history),
+        ("sessions list (/sessions)", sessions),
+        ("recent history (/history)", recent_history),
+        ("last user message (/syllabus-progress)", last_user_message),
+        ("apc history (/apc/history)", apc_history),
+        ("roadmap history (/study-roadmap/history)", roadmaps),
+    ]
+
+
+def seed(engine: Any, users: int, sessions_per_user: int, messages_per_session: int, logs_per_user: int) -> None:
+    rng = random.Random(13)
+    now = datetime(2026, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, default_response_mode, enable_notifications, "
+                          "auto_save_history, show_quick_suggestions, privacy_mode) VALUES (:id, :u, 'fast', 1, 1, 1, 0)"),
+                     [{"id": u, "u": f"user{u}"} for u in range(1, users + 1)])
+        # Sessions and messages are interleaved across users, as they are in a live database.
+        session_rows = [{"id": s, "user_id": rng.randint(1, users), "title": "chat", "created_at": now}
+                        for s in range(1, users * sessions_per_user + 1)]
+        session_rows[SESSION_ID - 1]["user_id"] = USER_ID
+        conn.execute(ChatSession.__table__.insert(), session_rows)
+        message_rows = []
+        for _ in range(messages_per_session):
+            for s in range(1, len(session_rows) + 1):
+                message_rows.append({"session_id": s, "sender": rng.choice(["user", "ai"]),
+                                     "text": "x" * rng.randint(40, 400), "created_at": now})
+        conn.execute(ChatHistory.__table__.insert(), message_rows)
+        conn.execute(APCLog.__table__.insert(), [
+            {"user_id": rng.randint(1, users), "tool_name": "quiz", "response_text": "ok", "created_at": now}
+            for _ in range(users * logs_per_user)
+        ])
+        conn.execute(StudyRoadmap.__table__.insert(), [
+            {"user_id": rng.randint(1, users), "roadmap_json": "{}", "created_at": now}
+            for _ in range(users * 2)
+        ])
+
+
+def measure(engine: Any, repeats: int) -> list[dict[str, Any]]:
+    results = []
+    with engine.connect() as conn:
+        for name, stmt in hot_queries():
+            sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+            plan = [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+            conn.exec_driver_sql(sql).fetchall()  # warm the page cache
+            started = time.perf_counter()
+            for _ in range(repeats):
+                conn.exec_driver_sql(sql).fetchall()
+            results.append({"query": name, "plan": plan, "ms": (time.perf_counter() - started) / repeats * 1000})
+    return results
+
+
+def render(before: list[dict[str, Any]], after: list[dict[str, Any]], labels: tuple[str, str], setup: str) -> str:
+    lines = ["# Hot query plans (SQLite)", "", setup, "",
+             f"| query | {labels[0]} ms | {labels[1]} ms |", "|---|---:|---:|"]
+    for b, a in zip(before, after):
+        lines.append(f"| {b['query']} | {b['ms']:.3f} | {a['ms']:.3f} |")
+    for b, a in zip(before, after):
+        lines += ["", f"## {b['query']}", "", f"{labels[0]}:", "```"] + b["plan"] + ["```", f"{labels[1]}:", "```"]
+        lines += a["plan"] + ["```"]
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Record query plans for the hot queries before/after a migration.")
+    parser.add_argument("--before", default="0001", help="Revision to measure first (default: %(default)s)")
+    parser.add_argument("--after", default="head", help="Revision to upgrade to and measure (default: %(default)s)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--sessions-per-user", type=int, default=20)
+    parser.add_argument("--messages-per-session", type=int, default=30)
+    parser.add_argument("--logs-per-user", type=int, default=30)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--output", default="", help="Also write the markdown report to this file")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="query_plans_")
+    try:
+        url = f"sqlite:///{os.path.join(tmp, 'plans.db')}"
+        run_migrations(url, args.before)
+        engine = create_engine(url)
+        seed(engine, max(1, args.users), args.sessions_per_user, args.messages_per_session, args.logs_per_user)
+        before = measure(engine, args.repeats)
+        engine.dispose()
+        run_migrations(url, args.after)
+        engine = create_engine(url)
+        after = measure(engine, args.repeats)
+        engine.dispose()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    setup = (f"{args.users} users x {args.sessions_per_user} sessions x {args.messages_per_session} messages, "
+             f"{args.users * args.logs_per_user} APC logs; mean of {args.repeats} runs, no ANALYZE statistics.")
+    report = render(before, after, (f"rev {args.before}", f"rev {args.after}"), setup)
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
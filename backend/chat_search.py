@@ -0,0 +1,160 @@
+"""
+Full-text search over a user's chat history.
+
+SQLite uses the FTS5 index ``chat_history_fts`` (ranked by ``bm25``, excerpts
+from ``snippet``); PostgreSQL uses the GIN index on
+``to_tsvector('simple', text)`` (``ts_rank`` / ``ts_headline``). Both are
+created and kept in sync by migration 0006, so a search is an index lookup
+rather than a ``LIKE`` scan of every message. Other databases fall back to
+exactly that scan (every word as a substring, newest first, snippets cut in
+Python), so search still works there, just without ranking.
+
+User input is reduced to plain words before it reaches the engine, so FTS
+operators (quotes, ``NEAR``, ``-``, ``:``) never cause syntax errors; every
+word must match and the last one also matches as a prefix.
+"""
+
+import re
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy import DateTime, func, select, text
+
+from database import ChatHistory, ChatSession
+
+HIGHLIGHT = ("**", "**")  # Markdown bold, like the rest of the chat UI
+SNIPPET_TOKENS = 16
+MAX_TERMS = 12
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+_SQLITE_SEARCH = """
+SELECT h.id, h.session_id, h.sender, h.created_at, s.title AS session_title,
+       snippet(chat_history_fts, 0, :open, :close, '…', :tokens) AS snippet,
+       bm25(chat_history_fts) AS rank
+FROM chat_history_fts
+JOIN chat_history h ON h.id = chat_history_fts.rowid
+JOIN chat_sessions s ON s.id = h.session_id
+WHERE chat_history_fts MATCH :query AND s.user_id = :user_id {session_filter}
+ORDER BY rank, h.id DESC
+LIMIT :limit OFFSET :offset
+"""
+
+_POSTGRES_SEARCH = """
+WITH q AS (SELECT to_tsquery('simple', :query) AS query)
+SELECT h.id, h.session_id, h.sender, h.created_at, s.title AS session_title,
+       ts_headline('simple', coalesce(h.text, ''), q.query, :headline_options) AS snippet,
+       -ts_rank(to_tsvector('simple', coalesce(h.text, '')), q.query) AS rank
+FROM chat_history h
+JOIN chat_sessions s ON s.id = h.session_id, q
+WHERE to_tsvector('simple', coalesce(h.text, '')) @@ q.query AND s.user_id = :user_id {session_filter}
+ORDER BY rank, h.id DESC
+LIMIT :limit OFFSET :offset
+"""
+
+
+class SearchHit(NamedTuple):
+    """Row shape of the ``LIKE`` fallback (same fields as the SQL searches)."""
+
+    id: int
+    session_id: int
+    sender: str
+    created_at: Any
+    session_title: Optional[str]
+    snippet: str
+    rank: float
+
+
+def search_terms(query: str) -> list[str]:
+    return _WORD.findall(str(query or "").lower())[:MAX_TERMS]
+
+
+def fts5_query(terms: list[str]) -> str:
+    """``["normal", "form"]`` -> ``"normal" "form"*`` (all terms, last one as a prefix)."""
+    quoted = [f'"{t}"' for t in terms]
+    if quoted:
+        quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def tsquery(terms: list[str]) -> str:
+    """``["normal", "form"]`` -> ``normal & form:*``."""
+    parts = list(terms)
+    if parts:
+        parts[-1] += ":*"
+    return " & ".join(parts)
+
+
+def like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def highlight_snippet(body: str, terms: list[str], tokens: int = SNIPPET_TOKENS) -> str:
+    """About ``tokens`` words around the first matching word, with every term marked like ``snippet()``."""
+    words = str(body or "").split()
+    lowered = [w.lower() for w in words]
+    first = next((i for i, w in enumerate(lowered) if any(t in w for t in terms)), 0)
+    start = max(0, min(first - tokens // 4, len(words) - tokens))
+    window = words[start:start + tokens]
+    pattern = re.compile("|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    marked = " ".join(pattern.sub(lambda m: f"{HIGHLIGHT[0]}{m.group()}{HIGHLIGHT[1]}", w) for w in window)
+    return ("…" if start > 0 else "") + marked + ("…" if start + tokens < len(words) else "")
+
+
+async def _like_search(
+    db: Any, user_id: int, terms: list[str], session_id: Optional[int], limit: int, offset: int
+) -> list[SearchHit]:
+    stmt = (
+        select(
+            ChatHistory.id, ChatHistory.session_id, ChatHistory.sender, ChatHistory.created_at,
+            ChatSession.title, ChatHistory.text,
+        )
+        .join(ChatSession, ChatSession.id == ChatHistory.session_id)
+        .where(ChatSession.user_id == user_id)
+    )
+    for term in terms:
+        stmt = stmt.where(func.lower(ChatHistory.text).like(like_pattern(term), escape="\\"))
+    if session_id is not None:
+        stmt = stmt.where(ChatHistory.session_id == session_id)
+    stmt = stmt.order_by(ChatHistory.id.desc()).limit(limit).offset(offset)
+    rows = (await db.execute(stmt)).all()
+    return [SearchHit(r[0], r[1], r[2], r[3], r[4], highlight_snippet(r[5], terms), 0.0) for r in rows]
+
+
+async def search_messages(
+    db: Any,
+    user_id: int,
+    query: str,
+    session_id: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> tuple[list[Any], Optional[int]]:
+    """Best matches first for ``user_id`` (optionally one session); returns ``(rows, next_offset)``."""
+    terms = search_terms(query)
+    if not terms:
+        return [], None
+    dialect = db.get_bind().dialect.name
+    offset = max(0, int(offset))
+    if dialect == "sqlite":
+        sql, match = _SQLITE_SEARCH, fts5_query(terms)
+    elif dialect == "postgresql":
+        sql, match = _POSTGRES_SEARCH, tsquery(terms)
+    else:
+        rows = await _like_search(db, user_id, terms, session_id, limit + 1, offset)
+        return (rows, None) if len(rows) <= limit else (rows[:limit], offset + limit)
+    params: dict[str, Any] = {"query": match, "user_id": user_id, "limit": limit + 1, "offset": offset}
+    if dialect == "sqlite":
+        params.update(open=HIGHLIGHT[0], close=HIGHLIGHT[1], tokens=SNIPPET_TOKENS)
+    else:
+        params["headline_options"] = (
+            f'StartSel="{HIGHLIGHT[0]}", StopSel="{HIGHLIGHT[1]}", MaxWords={SNIPPET_TOKENS}, MinWords=6'
+        )
+    session_filter = ""
+    if session_id is not None:
+        session_filter = "AND h.session_id = :session_id"
+        params["session_id"] = session_id
+    stmt = text(sql.format(session_filter=session_filter)).columns(created_at=DateTime)
+    rows = list((await db.execute(stmt, params)).all())
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], params["offset"] + limit
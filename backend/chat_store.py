@@ -0,0 +1,242 @@
+"""
+Chat persistence helpers for /chat.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy import func
+
+from database import ChatHistory, ChatSession
+from rollups import record_chat_turn
+from topic_coverage import TopicMatcher, record_topic_coverage
+
+
+class ChatLine(NamedTuple):
+    """Lightweight history row (id, sender, text) used to build LLM context."""
+
+    id: int
+    sender: str
+    text: str
+
+
+def fetch_history_tail(db: Any, session_id: int, limit: int) -> list[ChatLine]:
+    """Last ``limit`` messages of a session, oldest first (``ORDER BY id DESC LIMIT n``)."""
+    rows = (
+        db.query(ChatHistory.id, ChatHistory.sender, ChatHistory.text)
+        .filter(ChatHistory.session_id == session_id)
+        .order_by(ChatHistory.id.desc())
+        .limit(max(0, int(limit)))
+        .all()
+    )
+    return [ChatLine(int(r[0]), str(r[1] or ""), str(r[2] or "")) for r in reversed(rows)]
+
+
+def _latest_message_id(db: Any, session_id: int, below_id: Optional[int] = None) -> Optional[int]:
+    query = db.query(func.max(ChatHistory.id)).filter(ChatHistory.session_id == session_id)
+    if below_id is not None:
+        query = query.filter(ChatHistory.id < below_id)
+    value = query.scalar()
+    return int(value) if value is not None else None
+
+
+class HistoryTailCache:
+    """Per-process LRU of the last ``tail_size`` messages of recently active sessions.
+
+    A cached tail is only served after checking that the session's newest
+    message id still matches (one indexed ``max(id)`` lookup), so rows written
+    by another worker or deleted sessions are picked up. ``ChatTurn.commit``
+    appends the new rows in place, which keeps the common case to that single
+    lookup per turn no matter how long the session is.
+    """
+
+    def __init__(self, tail_size: int = 40, max_sessions: int = 256):
+        self.tail_size = max(1, int(tail_size))
+        self.max_sessions = max(1, int(max_sessions))
+        self._entries: "OrderedDict[int, list[ChatLine]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, db: Any, session_id: int, limit: Optional[int] = None) -> list[ChatLine]:
+        limit = self.tail_size if limit is None else min(int(limit), self.tail_size)
+        session_id = int(session_id)
+        latest = _latest_message_id(db, session_id)
+        with self._lock:
+            tail = self._entries.get(session_id)
+            if tail is not None and (tail[-1].id if tail else None) == latest:
+                self._entries.move_to_end(session_id)
+                self.stats["hits"] += 1
+                return list(tail[-limit:]) if limit > 0 else []
+            self.stats["misses"] += 1
+
+        tail = fetch_history_tail(db, session_id, self.tail_size) if latest is not None else []
+        self._store(session_id, tail)
+        return list(tail[-limit:]) if limit > 0 else []
+
+    async def get_async(self, db: Any, session_id: int, limit: Optional[int] = None) -> list[ChatLine]:
+        """``get`` for an ``AsyncSession``."""
+        return await db.run_sync(lambda sync_db: self.get(sync_db, session_id, limit))
+
+    def _store(self, session_id: int, tail: list[ChatLine]) -> None:
+        with self._lock:
+            self._entries[session_id] = tail[-self.tail_size:]
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def extend(self, db: Any, session_id: int, lines: list[ChatLine]) -> None:
+        """Append freshly written rows (call inside the writing transaction, before commit)."""
+        if not lines:
+            return
+        session_id = int(session_id)
+        with self._lock:
+            tail = self._entries.get(session_id)
+        if tail is None:
+            if _latest_message_id(db, session_id, below_id=lines[0].id) is None:
+                self._store(session_id, list(lines))  # brand-new session: the rows are the whole history
+            return
+        # Only safe if nothing else was written to the session since the tail was cached.
+        if _latest_message_id(db, session_id, below_id=lines[0].id) == (tail[-1].id if tail else None):
+            self._store(session_id, tail + list(lines))
+        else:
+            self.invalidate(session_id)
+
+    def invalidate(self, *session_ids: int) -> None:
+        with self._lock:
+            for session_id in session_ids:
+                self._entries.pop(int(session_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class ChatTurn:
+    """Unit of work for one /chat turn.
+
+    The new session (if any), the user message and the reply are staged in
+    memory and written in a single transaction by ``commit``. Nothing touches
+    the database while the LLM call is in flight, so a turn holds SQLite's
+    write lock for one short transaction instead of up to four, and a failed
+    LLM call leaves no half-written turn behind. The session and user
+    counters (``rollups``) and, given a ``topic_matcher``, the syllabus topic
+    coverage are updated in that same transaction.
+    """
+
+    def __init__(
+        self,
+        db: Any,
+        user_id: int,
+        session_id: Optional[int] = None,
+        new_session_title: str = "New Chat",
+        tail_cache: Optional[HistoryTailCache] = None,
+        subject: Optional[str] = None,
+        topic_matcher: Optional[TopicMatcher] = None,
+    ):
+        self.db = db
+        self.user_id = user_id
+        self.subject = subject
+        self.topic_matcher = topic_matcher
+        self.tail_cache = tail_cache
+        self.session_id = session_id
+        self._session: Optional[ChatSession] = None
+        if session_id is None:
+            self._session = ChatSession(user_id=user_id, title=new_session_title)
+        self._messages: list[ChatHistory] = []
+        self._written_session_id: Optional[int] = None
+        self.error: Optional[str] = None
+
+    @property
+    def is_new_session(self) -> bool:
+        return self._session is not None
+
+    def _message(self, sender: str, text: str) -> ChatHistory:
+        if self._session is not None:
+            message = ChatHistory(session=self._session, sender=sender, text=text)
+        else:
+            message = ChatHistory(session_id=self.session_id, sender=sender, text=text)
+        self._messages.append(message)
+        return message
+
+    def add_user_message(self, text: str) -> ChatHistory:
+        return self._message("user", text)
+
+    def add_ai_message(self, text: str) -> ChatHistory:
+        return self._message("ai", text)
+
+    def commit(self) -> Optional[int]:
+        """Write the staged rows in one transaction and return the session id.
+
+        On failure the transaction is rolled back, the error logged and kept
+        in ``error``, and only an id that already existed is returned (``None``
+        for a new session). The caller still returns the reply, marked unsaved.
+        """
+        if not self._messages and self._session is None:
+            return self.session_id
+        try:
+            session_id = self._write(self.db)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            return self._failed(e)
+        return self._committed(session_id)
+
+    async def commit_async(self) -> Optional[int]:
+        """``commit`` for an ``AsyncSession`` (same single transaction)."""
+        if not self._messages and self._session is None:
+            return self.session_id
+        try:
+            session_id = await self.db.run_sync(self._write)
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            return self._failed(e)
+        return self._committed(session_id)
+
+    def _write(self, db: Any) -> Optional[int]:
+        """Add and flush the staged rows on a sync Session; returns the session id."""
+        if self._session is not None:
+            db.add(self._session)
+        db.add_all(self._messages)
+        db.flush()
+        session_id = self._session.id if self._session is not None else self.session_id
+        self._written_session_id = session_id
+        at = max((m.created_at for m in self._messages if m.created_at is not None), default=None)
+        record_chat_turn(
+            db,
+            self.user_id,
+            session_id,
+            len(self._messages),
+            new_session=self._session is not None,
+            subject=self.subject,
+            at=at,
+        )
+        if self.topic_matcher is not None:
+            record_topic_coverage(db, self.topic_matcher, self.user_id, [str(m.text or "") for m in self._messages], at)
+        if self.tail_cache is not None:
+            lines = [ChatLine(int(m.id), str(m.sender), str(m.text or "")) for m in self._messages]
+            self.tail_cache.extend(db, session_id, lines)
+        return session_id
+
+    def _failed(self, error: Exception) -> Optional[int]:
+        session_id = self._written_session_id or self.session_id
+        if self.tail_cache is not None and session_id is not None:
+            self.tail_cache.invalidate(session_id)
+        self.error = str(error) or type(error).__name__
+        print(f"Chat persistence failed for session {self.session_id or 'new'}: {error}")
+        return self.session_id
+
+    def _committed(self, session_id: Optional[int]) -> Optional[int]:
+        self.session_id = session_id
+        self._session = None
+        self._messages = []
+        return self.session_id
+
+    def discard(self) -> None:
+        self._messages = []
+        self.db.rollback()
+
+    async def discard_async(self) -> None:
+        self._messages = []
+        await self.db.rollback()
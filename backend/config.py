@@ -39,12 +39,140 @@ class Settings(BaseModel):
         description="Frontend base URL used to construct password reset links",
     )
 
+    # Database
+    database_url: str = Field(
+        default="sqlite:///./bcabuddy.db", description="SQLAlchemy database URL"
+    )
+    sqlite_profile: str = Field(
+        default="production",
+        description="'production' (WAL, busy_timeout, synchronous=NORMAL, foreign_keys, mmap/cache, pooled) "
+        "or 'compat' (driver defaults, foreign_keys stays ON)",
+    )
+    sqlite_busy_timeout_ms: int = Field(
+        default=5000, description="How long a SQLite writer waits for the lock before 'database is locked'"
+    )
+    sqlite_mmap_size_mb: int = Field(default=256, description="SQLite mmap_size per connection (MB)")
+    sqlite_cache_size_mb: int = Field(default=64, description="SQLite page cache per connection (MB)")
+    db_pool_size: int = Field(
+        default=8,
+        description="Pooled connections per worker process (sync endpoints run on a threadpool)",
+    )
+    db_max_overflow: int = Field(default=16, description="Extra connections allowed under bursts")
+    db_auto_migrate: bool = Field(
+        default=True,
+        description="Run 'alembic upgrade head' when the API starts (disable when deploys migrate separately)",
+    )
+
+    # Chat retention (0 = unlimited; the background job only starts when a limit is set)
+    retention_max_sessions: int = Field(default=0, description="Newest chat sessions kept per user")
+    retention_max_age_days: int = Field(
+        default=0, description="Drop sessions with no message newer than this many days"
+    )
+    retention_max_bytes: int = Field(default=0, description="Chat message bytes kept per user")
+    retention_user_policies: str = Field(
+        default="",
+        description='Per-user overrides as JSON, e.g. {"42": {"max_sessions": 500}}; {} keeps everything',
+    )
+    retention_interval_min: float = Field(default=360, description="Minutes between retention runs")
+    retention_batch_size: int = Field(default=500, description="Rows deleted per retention transaction")
+    retention_vacuum_pages: int = Field(
+        default=2000, description="Pages released per run via PRAGMA incremental_vacuum (SQLite)"
+    )
+
     # Storage paths
     upload_dir: str = Field(default="uploads", description="Directory for uploaded files")
     profile_pics_dir: str = Field(
         default="profile_pics", description="Directory for local profile pictures"
     )
 
+    # Study-material vector store
+    vector_db_mmap: bool = Field(
+        default=True,
+        description="Memory-map vectorstore/db_faiss and read chunks from docstore.sqlite when present",
+    )
+    vector_db_snapshots_dir: Optional[str] = Field(
+        default=None,
+        description="Versioned snapshot directory (CURRENT pointer) served instead of db_faiss when non-empty "
+        "(default: vectorstore/snapshots next to db_faiss)",
+    )
+    vector_db_watch_interval_s: float = Field(
+        default=30.0,
+        description="How often workers poll for a new study-material index version (0 disables the watcher)",
+    )
+    admin_token: Optional[str] = Field(
+        default=None,
+        description="Shared secret for /admin endpoints (X-Admin-Token header); unset = dev-only access",
+    )
+
+    retrieval_sidecar_url: Optional[str] = Field(
+        default=None,
+        description="Use the retrieval sidecar (http://host:port or unix:///path.sock) instead of loading "
+        "the embedding model and index in every worker",
+    )
+    retrieval_sidecar_timeout_ms: int = Field(
+        default=1000, description="Read timeout for sidecar searches"
+    )
+    retrieval_sidecar_pool_size: int = Field(
+        default=16, description="Keep-alive connections per worker to the retrieval sidecar"
+    )
+
+    embedding_backend: str = Field(
+        default="torch",
+        description="MiniLM runtime: 'torch' (sentence-transformers) or 'onnx' (int8 ONNX Runtime)",
+    )
+    onnx_embedding_model_dir: Optional[str] = Field(
+        default=None,
+        description="Directory with model.onnx + tokenizer.json (default: backend/models/all-MiniLM-L6-v2-onnx-int8)",
+    )
+    embedding_batching: bool = Field(
+        default=True,
+        description="Coalesce concurrent query embeddings into batched forward passes",
+    )
+    embedding_batch_max: int = Field(default=32, description="Max queries per embedding batch")
+    embedding_batch_wait_ms: float = Field(
+        default=3.0, description="Max time the first query in a batch waits for company"
+    )
+
+    # RAG (user-uploaded documents)
+    rag_delta_compaction_threshold: int = Field(
+        default=8,
+        description="Number of per-upload delta shards that triggers background compaction into the base index",
+    )
+    rag_chunking: str = Field(
+        default="flat",
+        description="Upload chunking: 'flat' (500/50 chunks) or 'parent_child' (small indexed chunks "
+        "answered with their parent section)",
+    )
+    rag_parent_max_chars: int = Field(
+        default=1500, description="Size cap for each parent section returned in parent_child mode"
+    )
+    chat_retrieval_timeout_ms: int = Field(
+        default=1500,
+        description="Per-source deadline for /chat retrieval; slower sources are skipped",
+    )
+    chat_retrieval_primary_grace_ms: int = Field(
+        default=3000,
+        description="Extra wait for the study material after the retrieval deadline before it is skipped too",
+    )
+    user_index_dir: str = Field(
+        default="user_indexes", description="Root directory for per-user notes indexes"
+    )
+    user_index_max_resident_mb: int = Field(
+        default=256,
+        description="Memory ceiling (MB) for per-user indexes kept loaded; least recently used are evicted",
+    )
+    user_index_max_resident: int = Field(
+        default=64, description="Max number of per-user indexes kept loaded at once"
+    )
+
+    # Chat history
+    chat_history_tail: int = Field(
+        default=40, description="Messages per session kept in the /chat history tail cache"
+    )
+    chat_history_cache_sessions: int = Field(
+        default=256, description="Sessions whose history tail is cached per worker (LRU)"
+    )
+
     # CORS
     backend_cors_origins: List[str] = Field(
         default_factory=lambda: [
@@ -130,8 +258,45 @@ def get_settings() -> Settings:
         password_reset_frontend_base_url=os.getenv(
             "PASSWORD_RESET_FRONTEND_BASE_URL", "http://localhost:5173"
         ).rstrip("/"),
+        database_url=os.getenv("DATABASE_URL", "sqlite:///./bcabuddy.db"),
+        sqlite_profile=os.getenv("SQLITE_PROFILE", "production").strip().lower(),
+        sqlite_busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        sqlite_mmap_size_mb=int(os.getenv("SQLITE_MMAP_SIZE_MB", "256")),
+        sqlite_cache_size_mb=int(os.getenv("SQLITE_CACHE_SIZE_MB", "64")),
+        db_pool_size=int(os.getenv("DB_POOL_SIZE", "8")),
+        db_max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "16")),
+        db_auto_migrate=os.getenv("DB_AUTO_MIGRATE", "1").strip().lower() not in {"0", "false", "no", "off"},
+        retention_max_sessions=int(os.getenv("RETENTION_MAX_SESSIONS", "0")),
+        retention_max_age_days=int(os.getenv("RETENTION_MAX_AGE_DAYS", "0")),
+        retention_max_bytes=int(os.getenv("RETENTION_MAX_BYTES", "0")),
+        retention_user_policies=os.getenv("RETENTION_USER_POLICIES", ""),
+        retention_interval_min=float(os.getenv("RETENTION_INTERVAL_MIN", "360")),
+        retention_batch_size=int(os.getenv("RETENTION_BATCH_SIZE", "500")),
+        retention_vacuum_pages=int(os.getenv("RETENTION_VACUUM_PAGES", "2000")),
         upload_dir=os.getenv("UPLOAD_DIR", "uploads"),
         profile_pics_dir=os.getenv("PROFILE_PICS_DIR", "profile_pics"),
+        vector_db_mmap=os.getenv("VECTOR_DB_MMAP", "1").strip().lower() not in {"0", "false", "no", "off"},
+        vector_db_snapshots_dir=os.getenv("VECTOR_DB_SNAPSHOTS_DIR") or None,
+        vector_db_watch_interval_s=float(os.getenv("VECTOR_DB_WATCH_INTERVAL_S", "30")),
+        admin_token=os.getenv("ADMIN_TOKEN") or None,
+        retrieval_sidecar_url=os.getenv("RETRIEVAL_SIDECAR_URL") or None,
+        retrieval_sidecar_timeout_ms=int(os.getenv("RETRIEVAL_SIDECAR_TIMEOUT_MS", "1000")),
+        retrieval_sidecar_pool_size=int(os.getenv("RETRIEVAL_SIDECAR_POOL_SIZE", "16")),
+        embedding_backend=os.getenv("EMBEDDING_BACKEND", "torch").strip().lower(),
+        onnx_embedding_model_dir=os.getenv("ONNX_EMBEDDING_MODEL_DIR"),
+        embedding_batching=os.getenv("EMBEDDING_BATCHING", "1").strip().lower() not in {"0", "false", "no", "off"},
+        embedding_batch_max=int(os.getenv("EMBEDDING_BATCH_MAX", "32")),
+        embedding_batch_wait_ms=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "3")),
+        rag_delta_compaction_threshold=int(os.getenv("RAG_DELTA_COMPACTION_THRESHOLD", "8")),
+        rag_chunking=os.getenv("RAG_CHUNKING", "flat").strip().lower(),
+        rag_parent_max_chars=int(os.getenv("RAG_PARENT_MAX_CHARS", "1500")),
+        chat_retrieval_timeout_ms=int(os.getenv("CHAT_RETRIEVAL_TIMEOUT_MS", "1500")),
+        chat_retrieval_primary_grace_ms=int(os.getenv("CHAT_RETRIEVAL_PRIMARY_GRACE_MS", "3000")),
+        user_index_dir=os.getenv("USER_INDEX_DIR", "user_indexes"),
+        user_index_max_resident_mb=int(os.getenv("USER_INDEX_MAX_RESIDENT_MB", "256")),
+        user_index_max_resident=int(os.getenv("USER_INDEX_MAX_RESIDENT", "64")),
+        chat_history_tail=int(os.getenv("CHAT_HISTORY_TAIL", "40")),
+        chat_history_cache_sessions=int(os.getenv("CHAT_HISTORY_CACHE_SESSIONS", "256")),
     )
 
     cors_env = os.getenv("BACKEND_CORS_ORIGINS")
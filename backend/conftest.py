@@ -0,0 +1,52 @@
+"""
+Shared fixtures for the storage tests: SQLite databases with the full schema.
+"""
+
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import Base, User, create_db_engine  # noqa: E402
+
+
+@pytest.fixture()
+def engine():
+    """In-memory SQLite; every connection shares the one database."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def db_url(tmp_path):
+    """URL of an empty SQLite file for tests that build the schema themselves (migrations)."""
+    return f"sqlite:///{tmp_path / 'bcabuddy.db'}"
+
+
+@pytest.fixture()
+def file_engine(db_url):
+    """Production-profile SQLite on a temporary file (WAL, incremental vacuum)."""
+    engine = create_db_engine(db_url)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def db(engine):
+    """ORM session with user 1 ("student"); ``db.info["commits"]`` counts its commits."""
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    session.add(User(id=1, username="student"))
+    session.commit()
+    commits = []
+    event.listen(session, "after_commit", lambda s: commits.append(1))
+    session.info["commits"] = commits
+    yield session
+    session.close()
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Float
+from sqlalchemy import create_engine, event, Column, Index, Integer, String, Text, DateTime, ForeignKey, Float
 try:
     # SQLAlchemy 2.x preferred import
     from sqlalchemy.orm import DeclarativeBase, sessionmaker, relationship
@@ -10,13 +10,198 @@ except ImportError:
     from sqlalchemy.orm import sessionmaker, relationship
     Base = declarative_base()
 
+import os
 from datetime import datetime
+from typing import Optional
 
-DATABASE_URL = "sqlite:///./bcabuddy.db"
+from config import get_settings
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+settings = get_settings()
+DATABASE_URL = settings.database_url
+
+SQLITE_PROFILES = {"production", "compat"}
+
+
+def sqlite_pragmas(
+    busy_timeout_ms: int = 5000,
+    mmap_size_mb: int = 256,
+    cache_size_mb: int = 64,
+) -> list[str]:
+    """PRAGMAs applied to every new connection by the "production" SQLite profile.
+
+    WAL lets readers proceed while a writer commits, busy_timeout makes
+    writers queue instead of failing with "database is locked", and
+    synchronous=NORMAL is durable in WAL mode except for the last commits
+    before a power loss. auto_vacuum only takes effect on a new file (see
+    ``retention.py --enable-incremental-vacuum`` for existing ones).
+    """
+    return [
+        "PRAGMA auto_vacuum=INCREMENTAL",
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA busy_timeout={max(0, int(busy_timeout_ms))}",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA foreign_keys=ON",
+        f"PRAGMA mmap_size={max(0, int(mmap_size_mb)) * 1024 * 1024}",
+        f"PRAGMA cache_size=-{max(0, int(cache_size_mb)) * 1024}",  # negative = KiB
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def _is_in_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (
+        url.split("?")[0].split("://", 1)[-1] in {"", "/:memory:"} or "mode=memory" in url
+    )
+
+
+def _install_sqlite_profile(engine, pragmas: list[str]) -> None:
+    """Run ``pragmas`` on every new DBAPI connection of ``engine`` (a sync Engine)."""
+
+    @event.listens_for(engine, "connect")
+    def _apply_sqlite_profile(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def _engine_kwargs(
+    url: str,
+    profile: str,
+    pool_size: int,
+    max_overflow: int,
+    pool_timeout_s: float,
+) -> dict:
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE {profile!r} (expected one of {sorted(SQLITE_PROFILES)})")
+    kwargs: dict = {}
+    if url.startswith("sqlite"):
+        kwargs["connect_args"] = {"check_same_thread": False}
+    else:
+        # Server databases sit behind a network/container boundary; drop dead connections before use.
+        kwargs["pool_pre_ping"] = True
+    if (profile != "compat" or not url.startswith("sqlite")) and not _is_in_memory_sqlite(url):
+        kwargs.update(pool_size=max(1, int(pool_size)), max_overflow=max(0, int(max_overflow)), pool_timeout=pool_timeout_s)
+    return kwargs
+
+
+def _profile_pragmas(url: str, profile: str, busy_timeout_ms: int, mmap_size_mb: int, cache_size_mb: int) -> list[str]:
+    if not url.startswith("sqlite"):
+        return []
+    if profile == "compat":
+        # Session deletes rely on ON DELETE CASCADE, which SQLite only enforces with foreign_keys=ON.
+        return ["PRAGMA foreign_keys=ON"]
+    pragmas = sqlite_pragmas(busy_timeout_ms, mmap_size_mb, cache_size_mb)
+    if _is_in_memory_sqlite(url):
+        pragmas = [p for p in pragmas if "journal_mode" not in p]
+    return pragmas
+
+
+def create_db_engine(
+    url: str,
+    profile: str = "production",
+    pool_size: int = 8,
+    max_overflow: int = 16,
+    pool_timeout_s: float = 10.0,
+    busy_timeout_ms: int = 5000,
+    mmap_size_mb: int = 256,
+    cache_size_mb: int = 64,
+):
+    """Create the SQLAlchemy engine for ``url`` with the configured storage profile.
+
+    ``compat`` reproduces the old SQLite engine (driver defaults, rollback
+    journal). Non-SQLite URLs (PostgreSQL) get the pool settings only.
+    """
+    engine = create_engine(url, **_engine_kwargs(url, profile, pool_size, max_overflow, pool_timeout_s))
+    pragmas = _profile_pragmas(url, profile, busy_timeout_ms, mmap_size_mb, cache_size_mb)
+    if pragmas:
+        _install_sqlite_profile(engine, pragmas)
+    return engine
+
+
+def async_database_url(url: str) -> str:
+    """Async-driver form of a database URL (asyncpg for PostgreSQL, aiosqlite for SQLite)."""
+    from sqlalchemy.engine import make_url
+
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    return url
+
+
+def create_async_db_engine(
+    url: str,
+    profile: str = "production",
+    pool_size: int = 8,
+    max_overflow: int = 16,
+    pool_timeout_s: float = 10.0,
+    busy_timeout_ms: int = 5000,
+    mmap_size_mb: int = 256,
+    cache_size_mb: int = 64,
+):
+    """Async counterpart of ``create_db_engine`` (same pool sizing and SQLite profile)."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    kwargs = _engine_kwargs(url, profile, pool_size, max_overflow, pool_timeout_s)
+    if url.startswith("sqlite"):
+        kwargs.pop("connect_args", None)  # aiosqlite runs each connection on its own thread
+        if "pool_size" in kwargs:
+            kwargs["poolclass"] = AsyncAdaptedQueuePool  # aiosqlite would otherwise default to NullPool
+    engine = create_async_engine(async_database_url(url), **kwargs)
+    pragmas = _profile_pragmas(url, profile, busy_timeout_ms, mmap_size_mb, cache_size_mb)
+    if pragmas:
+        _install_sqlite_profile(engine.sync_engine, pragmas)
+    return engine
+
+
+engine = create_db_engine(
+    DATABASE_URL,
+    profile=settings.sqlite_profile,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+    mmap_size_mb=settings.sqlite_mmap_size_mb,
+    cache_size_mb=settings.sqlite_cache_size_mb,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The async engine is created on first use so that importing this module does
+# not require asyncpg/aiosqlite (scripts and tests only use the sync engine).
+_async_engine = None
+_async_sessionmaker = None
+
+
+def get_async_sessionmaker():
+    global _async_engine, _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _async_engine = create_async_db_engine(
+            DATABASE_URL,
+            profile=settings.sqlite_profile,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+            mmap_size_mb=settings.sqlite_mmap_size_mb,
+            cache_size_mb=settings.sqlite_cache_size_mb,
+        )
+        _async_sessionmaker = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_sessionmaker
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_sessionmaker = None
+
 class User(Base):
     __tablename__ = "users"
     
@@ -46,20 +231,30 @@ class User(Base):
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
+    __table_args__ = (Index("ix_chat_sessions_user_id_id", "user_id", "id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     title = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Rollups maintained by rollups.py alongside every chat_history insert.
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_message_at = Column(DateTime, nullable=True)
+    subject = Column(String, nullable=True)  # latest subject code detected in the session
     
     user = relationship("User", back_populates="sessions")
-    messages = relationship("ChatHistory", back_populates="session", cascade="all, delete-orphan")
+    # The database deletes the messages (ON DELETE CASCADE); the ORM never loads them to do it.
+    messages = relationship("ChatHistory", back_populates="session", cascade="all, delete-orphan", passive_deletes=True)
 
 class ChatHistory(Base):
     __tablename__ = "chat_history"
+    __table_args__ = (
+        Index("ix_chat_history_session_id_id", "session_id", "id"),
+        Index("ix_chat_history_session_id_sender_id", "session_id", "sender", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, ForeignKey("chat_sessions.id"))
+    session_id = Column(Integer, ForeignKey("chat_sessions.id", ondelete="CASCADE"))
     sender = Column(String)
     text = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -68,11 +263,39 @@ class ChatHistory(Base):
     
     session = relationship("ChatSession", back_populates="messages")
 
+class UserStats(Base):
+    """One row of per-user counters for the dashboard, kept current by rollups.py."""
+
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    session_count = Column(Integer, nullable=False, default=0, server_default="0")
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_message_at = Column(DateTime, nullable=True)
+    last_subject = Column(String, nullable=True)
+    quiz_count = Column(Integer, nullable=False, default=0, server_default="0")
+    quiz_score_total = Column(Float, nullable=False, default=0, server_default="0")
+
+class TopicCoverage(Base):
+    """Syllabus topics a user's chats have mentioned, maintained by topic_coverage.py."""
+
+    __tablename__ = "topic_coverage"
+    __table_args__ = (Index("ux_topic_coverage_user_subject_topic", "user_id", "subject", "topic", unique=True),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    subject = Column(String, nullable=False)
+    topic = Column(String, nullable=False)
+    first_seen_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_seen_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    hits = Column(Integer, nullable=False, default=1, server_default="1")
+
 class StudyRoadmap(Base):
     __tablename__ = "study_roadmaps"
+    __table_args__ = (Index("ix_study_roadmaps_user_id_id", "user_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
     subject = Column(String, nullable=True)
     title = Column(String, nullable=True)
     roadmap_json = Column(Text, nullable=False)
@@ -82,9 +305,10 @@ class StudyRoadmap(Base):
 
 class APCLog(Base):
     __tablename__ = "apc_logs"
+    __table_args__ = (Index("ix_apc_logs_user_id_id", "user_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
     tool_name = Column(String)
     subject = Column(String, nullable=True)
     semester = Column(String, nullable=True)
@@ -92,49 +316,36 @@ class APCLog(Base):
     response_text = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-Base.metadata.create_all(bind=engine)
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
 
 
-def _sqlite_ensure_column(table: str, column: str, ddl: str) -> None:
-    """Best-effort SQLite migration for additive columns."""
-    if not str(engine.url).startswith("sqlite"):
-        return
-    try:
-        conn = engine.raw_connection()
-        try:
-            cur = conn.cursor()
-            cur.execute(f"PRAGMA table_info({table})")
-            existing = {row[1] for row in cur.fetchall()}  # row[1] is column name
-            if column not in existing:
-                cur.execute(f"ALTER TABLE {table} ADD COLUMN {ddl}")
-                conn.commit()
-        finally:
-            conn.close()
-    except Exception:
-        # If migration fails, app may still run on fresh DB.
-        pass
+def alembic_config(url: Optional[str] = None):
+    """Alembic config for ``migrations/`` bound to ``url`` (default: DATABASE_URL)."""
+    from alembic.config import Config
+
+    cfg = Config(os.path.join(os.path.dirname(MIGRATIONS_DIR), "alembic.ini"))
+    cfg.set_main_option("script_location", MIGRATIONS_DIR)
+    # ConfigParser interpolation: a literal % in a password must be doubled.
+    cfg.set_main_option("sqlalchemy.url", (url or DATABASE_URL).replace("%", "%%"))
+    cfg.attributes["configure_logger"] = False  # keep the application's logging setup
+    return cfg
 
 
-# Ensure additive columns exist for older sqlite db files.
-_sqlite_ensure_column("chat_history", "intent_type", "intent_type VARCHAR")
-_sqlite_ensure_column("chat_history", "confidence_score", "confidence_score FLOAT")
+def run_migrations(url: Optional[str] = None, revision: str = "head") -> None:
+    """Upgrade the schema to ``revision`` (the API runs this once at startup)."""
+    from alembic import command
+
+    command.upgrade(alembic_config(url), revision)
 
-_sqlite_ensure_column("users", "email", "email VARCHAR")
-_sqlite_ensure_column("users", "college", "college VARCHAR")
-_sqlite_ensure_column("users", "enrollment_id", "enrollment_id VARCHAR")
-_sqlite_ensure_column("users", "bio", "bio TEXT")
-_sqlite_ensure_column("users", "exam_date", "exam_date VARCHAR")
-_sqlite_ensure_column("users", "exam_session", "exam_session VARCHAR")
-_sqlite_ensure_column("users", "default_response_mode", "default_response_mode VARCHAR DEFAULT 'fast'")
-_sqlite_ensure_column("users", "enable_notifications", "enable_notifications INTEGER DEFAULT 1")
-_sqlite_ensure_column("users", "auto_save_history", "auto_save_history INTEGER DEFAULT 1")
-_sqlite_ensure_column("users", "show_quick_suggestions", "show_quick_suggestions INTEGER DEFAULT 1")
-_sqlite_ensure_column("users", "privacy_mode", "privacy_mode INTEGER DEFAULT 0")
-_sqlite_ensure_column("users", "achievements_json", "achievements_json TEXT")
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
\ No newline at end of file
@@ -0,0 +1,194 @@
+"""
+Embedding helpers shared by the study-material store and RAGService.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Optional
+
+from langchain_core.embeddings import Embeddings
+
+MINILM_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_ONNX_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "all-MiniLM-L6-v2-onnx-int8")
+
+# Documented compatibility bound for the int8 ONNX backend against the PyTorch
+# vectors already stored in the FAISS indexes (checked by benchmarks/bench_embeddings.py).
+ONNX_MIN_COSINE = 0.98
+ONNX_MEAN_COSINE = 0.99
+
+
+class _Histogram:
+    """Fixed-bucket histogram (cumulative counts per upper bound, Prometheus style)."""
+
+    def __init__(self, bounds: list[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value: float) -> None:
+        idx = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                idx = i
+                break
+        self.counts[idx] += 1
+        self.total += value
+        self.n += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        buckets: dict[str, int] = {}
+        running = 0
+        for bound, count in zip(self.bounds + [float("inf")], self.counts):
+            running += count
+            buckets["+Inf" if bound == float("inf") else f"{bound:g}"] = running
+        return {"count": self.n, "mean": round(self.total / self.n, 3) if self.n else 0.0, "buckets": buckets}
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """Coalesce concurrent ``embed_query`` calls into one batched forward pass.
+
+    Callers enqueue their text and block on a future. A single worker thread
+    takes the first waiting request, keeps collecting for up to
+    ``max_wait_ms`` (or until ``max_batch`` items), encodes the batch with
+    ``embed_documents`` and resolves every future. Only valid for symmetric
+    models such as all-MiniLM-L6-v2, where query and document encodings match.
+    """
+
+    def __init__(self, base: Embeddings, max_batch: int = 32, max_wait_ms: float = 3.0):
+        self.base = base
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue: "queue.Queue[tuple[str, float, Future]]" = queue.Queue()
+        self._metrics_lock = threading.Lock()
+        self._batch_sizes = _Histogram([1, 2, 4, 8, 16, 32, 64])
+        self._queue_wait_ms = _Histogram([0.5, 1, 2, 5, 10, 25, 50, 100])
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        # Document batches (ingestion, uploads) are already batched; pass straight through.
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        future: Future = Future()
+        self._queue.put((text, time.perf_counter(), future))
+        return future.result()
+
+    def _collect_batch(self) -> list[tuple[str, float, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            started = time.perf_counter()
+            with self._metrics_lock:
+                self._batch_sizes.observe(len(batch))
+                for _, enqueued, _ in batch:
+                    self._queue_wait_ms.observe((started - enqueued) * 1000.0)
+            try:
+                vectors = self.base.embed_documents([text for text, _, _ in batch])
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), vector in zip(batch, vectors):
+                future.set_result(list(vector))
+
+    def metrics(self) -> dict[str, Any]:
+        with self._metrics_lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait_s * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "batch_size": self._batch_sizes.snapshot(),
+                "queue_wait_ms": self._queue_wait_ms.snapshot(),
+            }
+
+
+class OnnxMiniLMEmbeddings(Embeddings):
+    """all-MiniLM-L6-v2 on ONNX Runtime (int8-quantized export, CPU).
+
+    Reproduces the sentence-transformers pipeline - WordPiece tokens truncated
+    to 256, mean pooling over the attention mask, L2 normalisation - so vectors
+    stay interchangeable with the PyTorch ones within ONNX_MIN_COSINE.
+    Needs only ``onnxruntime`` and ``tokenizers``; build the model directory
+    with ``python export_onnx_embeddings.py``.
+    """
+
+    def __init__(self, model_dir: str = DEFAULT_ONNX_MODEL_DIR, max_length: int = 256, threads: Optional[int] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_dir = model_dir
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        pad_id = self.tokenizer.token_to_id("[PAD]")
+        self.tokenizer.enable_padding(pad_id=0 if pad_id is None else pad_id, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = int(threads)
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode(self, texts: list[str]) -> list[list[float]]:
+        import numpy as np
+
+        if not texts:
+            return []
+        encodings = self.tokenizer.encode_batch([str(t or "") for t in texts])
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self._input_names})[0]
+
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._encode(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._encode([text])[0]
+
+
+def build_base_embeddings(backend: str = "torch", onnx_model_dir: str = DEFAULT_ONNX_MODEL_DIR) -> Embeddings:
+    """Create the MiniLM embedding model for the configured backend ("torch" or "onnx")."""
+    if str(backend or "").strip().lower() == "onnx":
+        try:
+            return OnnxMiniLMEmbeddings(onnx_model_dir)
+        except Exception as e:
+            print(f"ONNX embeddings unavailable ({e}); falling back to PyTorch.")
+    # Imported lazily so the ONNX path never pays the torch import.
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=MINILM_MODEL_NAME)
+
+
+def wrap_with_batcher(base: Embeddings, enabled: bool = True, max_batch: int = 32, max_wait_ms: float = 3.0) -> Embeddings:
+    if not enabled:
+        return base
+    return MicroBatchingEmbeddings(base, max_batch=max_batch, max_wait_ms=max_wait_ms)
+
+
+def batcher_metrics(embeddings: Any) -> Optional[dict[str, Any]]:
+    return embeddings.metrics() if isinstance(embeddings, MicroBatchingEmbeddings) else None
@@ -0,0 +1,68 @@
+"""
+Export all-MiniLM-L6-v2 to an int8-quantized ONNX model for EMBEDDING_BACKEND=onnx.
+
+Run once on a machine that has torch + transformers installed; the output
+directory (model.onnx + tokenizer.json) is all the API containers need.
+
+Usage:
+    python export_onnx_embeddings.py [--output models/all-MiniLM-L6-v2-onnx-int8]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+from embeddings import DEFAULT_ONNX_MODEL_DIR, MINILM_MODEL_NAME
+
+
+def export_quantized_minilm(output_dir: str = DEFAULT_ONNX_MODEL_DIR, model_name: str = MINILM_MODEL_NAME) -> str:
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    sample = tokenizer(["BCNF kya hota hai?"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+
+    os.makedirs(output_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="minilm-onnx-")
+    try:
+        fp32_path = os.path.join(work_dir, "model_fp32.onnx")
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                fp32_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+            )
+        # Dynamic int8 quantization of the weights; activations stay fp32.
+        quantize_dynamic(fp32_path, os.path.join(output_dir, "model.onnx"), weight_type=QuantType.QInt8)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    tokenizer.save_pretrained(output_dir)  # writes tokenizer.json for the fast tokenizer
+    return output_dir
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export MiniLM to int8 ONNX for the embedding backend.")
+    parser.add_argument("--output", default=DEFAULT_ONNX_MODEL_DIR, help="Output directory (default: %(default)s)")
+    args = parser.parse_args(argv)
+    try:
+        path = export_quantized_minilm(args.output)
+    except Exception as e:
+        print(f"[onnx-export] failed: {e}")
+        return 1
+    print(f"[onnx-export] wrote {path}. Set EMBEDDING_BACKEND=onnx to use it.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
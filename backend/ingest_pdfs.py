@@ -0,0 +1,311 @@
+"""
+Offline ingestion pipeline for the study-material vector store.
+
+Builds ``vectorstore/db_faiss`` from a directory of books / PYQ PDFs:
+  1. PDFs are parsed and split in a process pool (one file per task).
+  2. Duplicate and boilerplate chunks are dropped by content hash.
+  3. Remaining chunks are embedded in batches with the MiniLM model.
+  4. The index (plus a SQLite docstore for memory-mapped loading) is written
+     to a staging directory and renamed into place.
+
+Metadata (category / subject / semester) is inferred from the folder layout,
+e.g. ``pdfs/pyq/sem 3/MCS-023/june-2023.pdf``, and can be overridden by flags.
+
+Usage:
+    python ingest_pdfs.py <source_dir> [--output vectorstore/db_faiss] [--workers 4]
+    python ingest_pdfs.py <source_dir> --snapshots-dir vectorstore/snapshots   # hot reload, no restart
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Optional
+
+from vector_index import export_sqlite_docstore, make_build_dir, publish_index_atomically, publish_snapshot
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BACKEND_DIR, "vectorstore", "db_faiss")
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+MIN_CHUNK_CHARS = 40
+
+_PYQ_DIR_NAMES = {"pyq", "pyqs", "previous year questions", "question papers", "papers"}
+_SEMESTER_RE = re.compile(r"^(?:sem(?:ester)?)[\s_-]*([1-6])$", re.I)
+_SUBJECT_RE = re.compile(r"(?<![A-Z])([A-Z]{2,4})[\s_-]?(\d{2,3})(?!\d)", re.I)
+
+
+def _load_subject_codes() -> set[str]:
+    try:
+        with open(os.path.join(BACKEND_DIR, "syllabus_topics.json"), "r", encoding="utf-8") as f:
+            return {str(code).upper() for code in json.load(f).keys()}
+    except Exception:
+        return set()
+
+
+KNOWN_SUBJECT_CODES = _load_subject_codes()
+
+
+def infer_metadata(pdf_path: str, source_root: str, overrides: Optional[dict[str, str]] = None) -> dict[str, str]:
+    """Derive category/subject/semester for a PDF from its path relative to the source root."""
+    rel = os.path.relpath(pdf_path, source_root)
+    parts = [p for p in re.split(r"[\\/]+", rel) if p]
+    dir_parts = [p.strip().lower() for p in parts[:-1]]
+
+    category = "pyq" if any(p in _PYQ_DIR_NAMES for p in dir_parts) else "book"
+
+    semester = ""
+    for p in dir_parts:
+        m = _SEMESTER_RE.match(p)
+        if m:
+            semester = m.group(1)
+            break
+
+    subject = ""
+    for p in reversed(parts):
+        m = _SUBJECT_RE.search(p)
+        if not m:
+            continue
+        code = f"{m.group(1).upper()}-{m.group(2)}"
+        if not KNOWN_SUBJECT_CODES or code in KNOWN_SUBJECT_CODES:
+            subject = code
+            break
+
+    metadata = {
+        "category": category,
+        "subject": subject,
+        "semester": semester,
+        "source": rel.replace("\\", "/"),
+    }
+    for key, value in (overrides or {}).items():
+        if value:
+            metadata[key] = value
+    return metadata
+
+
+def chunk_fingerprint(text: str) -> str:
+    """Hash of the chunk text with case and whitespace normalised."""
+    normalized = " ".join(str(text or "").lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def _parse_pdf(pdf_path: str, metadata: dict[str, str]) -> list[tuple[str, dict[str, Any]]]:
+    """Worker task: load and split one PDF into (text, metadata) pairs."""
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    docs = PyPDFLoader(pdf_path).load()
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks = splitter.split_documents(docs)
+
+    out: list[tuple[str, dict[str, Any]]] = []
+    for chunk in chunks:
+        text = str(getattr(chunk, "page_content", "") or "").strip()
+        if not text:
+            continue
+        page = (getattr(chunk, "metadata", {}) or {}).get("page")
+        chunk_meta: dict[str, Any] = dict(metadata)
+        if page is not None:
+            chunk_meta["page"] = page
+        out.append((text, chunk_meta))
+    return out
+
+
+def dedupe_chunks(
+    chunks: list[tuple[str, dict[str, Any]]],
+    boilerplate_min_files: int = 3,
+) -> tuple[list[tuple[str, dict[str, Any]]], dict[str, int]]:
+    """Drop exact duplicates, boilerplate and near-empty chunks.
+
+    A chunk counts as boilerplate when the same normalised text appears in at
+    least ``boilerplate_min_files`` different source files (running headers,
+    copyright pages, "Check Your Progress" blocks).
+    """
+    files_per_hash: dict[str, set[str]] = {}
+    hashes: list[str] = []
+    for text, meta in chunks:
+        h = chunk_fingerprint(text)
+        hashes.append(h)
+        files_per_hash.setdefault(h, set()).add(str(meta.get("source", "")))
+
+    kept: list[tuple[str, dict[str, Any]]] = []
+    seen: set[str] = set()
+    stats = {"input": len(chunks), "duplicate": 0, "boilerplate": 0, "too_short": 0}
+    for (text, meta), h in zip(chunks, hashes):
+        if len(re.sub(r"\W+", "", text)) < MIN_CHUNK_CHARS:
+            stats["too_short"] += 1
+            continue
+        if boilerplate_min_files > 1 and len(files_per_hash[h]) >= boilerplate_min_files:
+            stats["boilerplate"] += 1
+            continue
+        if h in seen:
+            stats["duplicate"] += 1
+            continue
+        seen.add(h)
+        meta = dict(meta)
+        meta["chunk_hash"] = h
+        kept.append((text, meta))
+    stats["kept"] = len(kept)
+    return kept, stats
+
+
+def embed_in_batches(embeddings: Any, texts: list[str], batch_size: int = 256) -> list[list[float]]:
+    vectors: list[list[float]] = []
+    total = len(texts)
+    for start in range(0, total, batch_size):
+        batch = texts[start:start + batch_size]
+        vectors.extend(embeddings.embed_documents(batch))
+        print(f"[ingest] embedded {min(start + batch_size, total)}/{total} chunks")
+    return vectors
+
+
+def collect_pdfs(source_dir: str) -> list[str]:
+    found: list[str] = []
+    for root, _dirs, files in os.walk(source_dir):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                found.append(os.path.join(root, name))
+    return sorted(found)
+
+
+def parse_pdfs_parallel(
+    pdf_paths: list[str],
+    source_dir: str,
+    overrides: Optional[dict[str, str]] = None,
+    workers: Optional[int] = None,
+) -> list[tuple[str, dict[str, Any]]]:
+    chunks: list[tuple[str, dict[str, Any]]] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_parse_pdf, path, infer_metadata(path, source_dir, overrides)): path
+            for path in pdf_paths
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                parsed = future.result()
+            except Exception as e:
+                print(f"[ingest] skipped {path}: {e}")
+                continue
+            chunks.extend(parsed)
+            print(f"[ingest] parsed {os.path.basename(path)} -> {len(parsed)} chunks")
+    # as_completed order is nondeterministic; keep the index stable across runs.
+    chunks.sort(key=lambda c: (str(c[1].get("source", "")), int(c[1].get("page", 0) or 0)))
+    return chunks
+
+
+def build_vectorstore(
+    source_dir: str,
+    output_dir: str = DEFAULT_OUTPUT,
+    workers: Optional[int] = None,
+    batch_size: int = 256,
+    overrides: Optional[dict[str, str]] = None,
+    boilerplate_min_files: int = 3,
+    embeddings: Any = None,
+    snapshots_dir: Optional[str] = None,
+) -> dict[str, Any]:
+    """Run the full pipeline and atomically publish the index at ``output_dir``.
+
+    With ``snapshots_dir`` the index is published as a new versioned snapshot
+    instead, which running API workers pick up without a restart.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    started = time.time()
+    pdf_paths = collect_pdfs(source_dir)
+    if not pdf_paths:
+        raise FileNotFoundError(f"No PDFs found under {source_dir}")
+
+    chunks = parse_pdfs_parallel(pdf_paths, source_dir, overrides, workers)
+    kept, stats = dedupe_chunks(chunks, boilerplate_min_files=boilerplate_min_files)
+    if not kept:
+        raise ValueError("No chunks left to index after de-duplication")
+
+    if embeddings is None:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+
+    texts = [text for text, _ in kept]
+    metadatas = [meta for _, meta in kept]
+    vectors = embed_in_batches(embeddings, texts, batch_size=batch_size)
+
+    store = FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas)
+    build_dir = make_build_dir(os.path.join(snapshots_dir, "next") if snapshots_dir else output_dir)
+    try:
+        store.save_local(build_dir)
+        export_sqlite_docstore(build_dir, store)
+        if snapshots_dir:
+            version = publish_snapshot(build_dir, snapshots_dir)
+            output_dir = os.path.join(snapshots_dir, version)
+        else:
+            publish_index_atomically(build_dir, output_dir)
+    except Exception:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    stats.update({
+        "pdfs": len(pdf_paths),
+        "seconds": round(time.time() - started, 2),
+        "output": os.path.abspath(output_dir),
+    })
+    return stats
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the BCABuddy study-material FAISS index from PDFs.")
+    parser.add_argument("source_dir", help="Directory containing book / PYQ PDFs (searched recursively)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Index directory to publish (default: %(default)s)")
+    parser.add_argument(
+        "--snapshots-dir",
+        default="",
+        help="Publish as a new versioned snapshot in this directory (hot-reloaded by the API) instead of --output",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per embedding batch")
+    parser.add_argument("--category", default="", help="Force category metadata (e.g. pyq, book)")
+    parser.add_argument("--subject", default="", help="Force subject code metadata (e.g. MCS-023)")
+    parser.add_argument("--semester", default="", help="Force semester metadata (1-6)")
+    parser.add_argument(
+        "--boilerplate-min-files",
+        type=int,
+        default=3,
+        help="Drop chunks repeated across at least this many PDFs (0 disables)",
+    )
+    args = parser.parse_args(argv)
+
+    overrides = {
+        "category": args.category.strip().lower(),
+        "subject": args.subject.strip().upper(),
+        "semester": args.semester.strip(),
+    }
+    try:
+        stats = build_vectorstore(
+            args.source_dir,
+            output_dir=args.output,
+            workers=args.workers,
+            batch_size=max(1, args.batch_size),
+            overrides=overrides,
+            boilerplate_min_files=args.boilerplate_min_files,
+            snapshots_dir=args.snapshots_dir or None,
+        )
+    except Exception as e:
+        print(f"[ingest] failed: {e}")
+        return 1
+
+    print(
+        f"[ingest] published {stats['kept']} chunks from {stats['pdfs']} PDFs to {stats['output']} "
+        f"in {stats['seconds']}s (dropped: {stats['duplicate']} duplicate, "
+        f"{stats['boilerplate']} boilerplate, {stats['too_short']} too short)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
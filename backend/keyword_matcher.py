@@ -0,0 +1,79 @@
+"""
+One-pass multi-keyword matching.
+
+``KeywordMatcher`` compiles a set of keywords into a single regular
+expression shaped like a trie (shared prefixes are written once, so the
+engine follows one branch per character instead of retrying every keyword).
+``find`` lowercases the text once and searches it from every position where
+a keyword can start, so overlapping keywords are all reported. It returns
+every keyword that occurs in a text, case-insensitively, which is exactly
+what ``any(k in text.lower() for k in keywords)`` checks one keyword list at
+a time. Callers build one matcher over all the lists they care about and
+test the result with set operations.
+
+The regex runs at roughly 100ns per character, while ``str.__contains__`` is
+much faster per character but pays a fixed cost per keyword, so above
+``REGEX_MAX_CHARS`` (the crossover measured by
+``benchmarks/bench_keyword_matcher.py``) ``find`` checks each distinct
+keyword once instead. The result is the same either way.
+"""
+
+import re
+from typing import Iterable
+
+REGEX_MAX_CHARS = 128
+
+
+def _trie_pattern(keys: Iterable[str]) -> str:
+    trie: dict = {}
+    for key in keys:
+        node = trie
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        ends = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends:
+            # Greedy: the longest keyword starting here wins, shorter ones come from ``_contained``.
+            return (body if len(branches) > 1 else "(?:" + body + ")") + "?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Finds which of a fixed set of keywords occur in a text, in one pass."""
+
+    def __init__(self, *keyword_lists: Iterable[str]):
+        keys = {str(k).strip().lower() for keywords in keyword_lists for k in keywords}
+        keys.discard("")
+        self.keywords = frozenset(keys)
+        self._ordered = tuple(sorted(keys))
+        self._pattern = re.compile(_trie_pattern(keys)) if keys else None
+        # A match is the longest keyword starting at its position; every other keyword
+        # occurring inside it is a substring of it.
+        self._contained = {k: frozenset(o for o in keys if o != k and o in k) for k in keys}
+
+    def find(self, text: str) -> frozenset[str]:
+        """Lowercased keywords that appear anywhere in ``text``."""
+        if self._pattern is None or not text:
+            return frozenset()
+        lowered = text.lower()
+        if len(lowered) > REGEX_MAX_CHARS:
+            return frozenset(k for k in self._ordered if k in lowered)
+        search = self._pattern.search
+        found: set[str] = set()
+        m = search(lowered)
+        while m is not None:
+            key = m.group()
+            if key not in found:
+                found.add(key)
+                found.update(self._contained[key])
+            # Resume one character in, not at the end: a keyword may start inside this match.
+            m = search(lowered, m.start() + 1)
+        return frozenset(found)
@@ -20,7 +20,8 @@ if sys.stdout and hasattr(sys.stdout, "buffer"):
 if sys.stderr and hasattr(sys.stderr, "buffer"):
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Header, Response, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
@@ -30,13 +31,39 @@ from typing import Optional, Any, cast, List
 import os, shutil
 import uvicorn
 from datetime import datetime, timedelta
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from database import ChatHistory, User, ChatSession, StudyRoadmap, get_db
+from database import (
+    ChatHistory,
+    ChatSession,
+    StudyRoadmap,
+    User,
+    TopicCoverage,
+    UserStats,
+    dispose_async_engine,
+    engine,
+    get_async_db,
+    get_db,
+    run_migrations,
+)
+from retention import build_retention_job, purge_sessions
+from rollups import recent_activity_label, release_sessions
+from report_inputs import collect_report_inputs, format_report_data
+from topic_coverage import TopicMatcher, coverage_history
+from keyword_matcher import KeywordMatcher
 from rag_service import RAGService
+from retrieval import compress_chunks, merge_context_sections, retrieve_parallel
+from chat_store import ChatTurn, HistoryTailCache
+from chat_search import search_messages
+from pagination import NEXT_CURSOR_HEADER, clamp_limit, fetch_keyset_page, preview, preview_column
+from retrieval_client import RemoteEmbeddings, RetrievalClient, SidecarUnavailableError
+from vector_index import open_study_store, resolve_study_index_path
+from embeddings import DEFAULT_ONNX_MODEL_DIR, batcher_metrics, build_base_embeddings, wrap_with_batcher
 from PIL import Image
 import json
+import hmac
 import time
 import re
 import difflib
@@ -61,7 +88,7 @@ from persona import (
     classify_intent, extract_subject_context, build_conversation_context,
     validate_subject_mapping, get_intent_specific_protocol,
     detect_response_style, get_persona_style_instruction, get_jiya_variant_response,
-    COMPLETION_DIRECTIVE, CRITICAL_OUTPUT_RULE,
+    COMPLETION_DIRECTIVE, CRITICAL_OUTPUT_RULE, PERSONA_KEYWORDS,
 )
 
 # --- CONFIG ---
@@ -82,7 +109,6 @@ SUPABASE_AVATAR_BUCKET = os.getenv("SUPABASE_AVATAR_BUCKET", "avatars")
 
 
 # --- SERVICES ---
-rag_system = RAGService(groq_api_key=GROQ_API_KEY)
 client = Groq(api_key=GROQ_API_KEY)
 MAX_TOKENS = 8192
 AUTO_CONTINUE_PROMPT = (
@@ -110,38 +136,56 @@ class StudyDay(BaseModel):
 class StudyPlanResponse(BaseModel):
     study_plan: List[StudyDay]
 
+# Last messages of recently active chat sessions; /chat reads only this tail per turn.
+# 40 rows covers the 10-message context window and the 15-AI-message easter-egg scan.
+CHAT_HISTORY_TAIL = HistoryTailCache(
+    tail_size=settings.chat_history_tail,
+    max_sessions=settings.chat_history_cache_sessions,
+)
+
 # --- FAISS VECTOR STORE (LOAD ONCE AT STARTUP) ---
 BACKEND_DIR = os.path.dirname(__file__)
+VECTOR_DB_PATH = resolve_study_index_path(BACKEND_DIR)
+
+if settings.retrieval_sidecar_url:
+    # The sidecar owns the model and the index; this worker only keeps a pooled client.
+    RETRIEVAL_CLIENT = RetrievalClient(
+        settings.retrieval_sidecar_url,
+        timeout_s=settings.retrieval_sidecar_timeout_ms / 1000.0,
+        pool_size=settings.retrieval_sidecar_pool_size,
+    )
+    VECTOR_EMBEDDINGS = RemoteEmbeddings(RETRIEVAL_CLIENT)
+    STUDY_STORE = RETRIEVAL_CLIENT
+    print(f"Retrieval: using sidecar at {settings.retrieval_sidecar_url}")
+else:
+    # Concurrent query encodes are coalesced into one batched forward pass (see embeddings.py).
+    VECTOR_EMBEDDINGS = wrap_with_batcher(
+        build_base_embeddings(settings.embedding_backend, settings.onnx_embedding_model_dir or DEFAULT_ONNX_MODEL_DIR),
+        enabled=settings.embedding_batching,
+        max_batch=settings.embedding_batch_max,
+        max_wait_ms=settings.embedding_batch_wait_ms,
+    )
+    # Holds the active index; new versions (snapshots or a republished db_faiss) are
+    # loaded in the background and swapped in without restarting workers.
+    STUDY_STORE = open_study_store(
+        VECTOR_DB_PATH,
+        VECTOR_EMBEDDINGS,
+        snapshots_dir=settings.vector_db_snapshots_dir,
+        prefer_mmap=settings.vector_db_mmap,
+        poll_interval_s=settings.vector_db_watch_interval_s,
+    )
 
-def _resolve_vectorstore_path() -> str:
-    candidates = [
-        os.path.join(BACKEND_DIR, "vectorstore", "db_faiss"),
-        os.path.join(BACKEND_DIR, "..", "vectorstore", "db_faiss"),
-        "vectorstore/db_faiss",
-    ]
-    for path in candidates:
-        if os.path.exists(path):
-            return path
-    return "vectorstore/db_faiss"
-
-VECTOR_DB_PATH = _resolve_vectorstore_path()
-VECTOR_EMBEDDINGS = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-def _load_vector_db_once():
-    try:
-        if not os.path.isdir(VECTOR_DB_PATH):
-            print(f"FAISS load skipped: missing directory at {VECTOR_DB_PATH}")
-            return None
-        return FAISS.load_local(
-            VECTOR_DB_PATH,
-            VECTOR_EMBEDDINGS,
-            allow_dangerous_deserialization=True,
-        )
-    except Exception as e:
-        print(f"FAISS load skipped: {e}")
-        return None
-
-VECTOR_DB = _load_vector_db_once()
+# Shares the model with the study-material store instead of loading a second copy.
+rag_system = RAGService(
+    groq_api_key=GROQ_API_KEY,
+    embeddings=VECTOR_EMBEDDINGS,
+    compact_threshold=settings.rag_delta_compaction_threshold,
+    user_index_dir=settings.user_index_dir,
+    user_index_max_resident_bytes=settings.user_index_max_resident_mb * 1024 * 1024,
+    user_index_max_resident=settings.user_index_max_resident,
+    chunking=settings.rag_chunking,
+    parent_max_chars=settings.rag_parent_max_chars,
+)
 
 def _doc_category(doc: Any) -> str:
     metadata = getattr(doc, "metadata", {}) or {}
@@ -194,11 +238,17 @@ def _is_chat_persistence_enabled(user: Any) -> bool:
     auto_save_history = bool(getattr(user, "auto_save_history", 1))
     return (not privacy_mode) and auto_save_history
 
-def _retrieve_study_material(user_query: str, active_tool: Optional[str], k: int = 5):
-    if not VECTOR_DB or not str(user_query or "").strip():
+def _retrieve_study_material(
+    user_query: str,
+    active_tool: Optional[str],
+    k: int = 5,
+    token_budget: Optional[int] = None,
+):
+    store = STUDY_STORE.current()
+    if not store or not str(user_query or "").strip():
         return "", [], []
     try:
-        docs = VECTOR_DB.similarity_search(user_query, k=k)
+        docs = store.similarity_search(user_query, k=k)
     except Exception:
         return "", [], []
 
@@ -220,7 +270,11 @@ def _retrieve_study_material(user_query: str, active_tool: Optional[str], k: int
         for d in selected_docs
         if str(getattr(d, "page_content", "")).strip()
     ]
-    retrieved_context = "\n\n---\n\n".join(chunks[:5]).strip()
+    if token_budget:
+        # Drop near-duplicate/overlapping chunks and keep query-relevant sentences only.
+        retrieved_context = compress_chunks(user_query, chunks, VECTOR_EMBEDDINGS, token_budget=token_budget)
+    else:
+        retrieved_context = "\n\n---\n\n".join(chunks[:5]).strip()
     return retrieved_context, pyq_docs, book_docs
 
 def _hard_chop_next_suggestions(text: str) -> str:
@@ -238,7 +292,8 @@ def _retrieve_exam_predictor_pyq_context(
     selected_semester: str,
     k: int = 30,
 ):
-    if not VECTOR_DB:
+    store = STUDY_STORE.current()
+    if not store:
         return "", []
 
     subject_key = str(selected_subject or "").strip().lower()
@@ -248,7 +303,7 @@ def _retrieve_exam_predictor_pyq_context(
     semester_key = _normalize_semester_value(selected_semester)
 
     try:
-        docs = VECTOR_DB.similarity_search(
+        docs = store.similarity_search(
             f"Previous year questions for {selected_subject}",
             k=max(60, k * 3),
         )
@@ -491,6 +546,10 @@ try:
 except Exception:
     pass
 
+# Schema changes live in migrations/ (Alembic); a no-op when the database is already at head.
+if settings.db_auto_migrate:
+    run_migrations()
+
 app = FastAPI(
     title="BCABuddy Ultimate",
     description="AI Learning Assistant for IGNOU BCA",
@@ -507,6 +566,21 @@ app.include_router(auth_router)
 app.include_router(apc_router)
 
 
+# Chat retention runs on its own thread every RETENTION_INTERVAL_MIN, never inside a request.
+RETENTION_JOB = build_retention_job(engine, settings)
+
+
+@app.on_event("startup")
+def _start_retention_job():
+    if RETENTION_JOB.start():
+        print(f"Retention job every {settings.retention_interval_min:g} min")
+
+
+@app.on_event("shutdown")
+async def _close_async_db_engine():
+    await dispose_async_engine()
+
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
@@ -527,6 +601,8 @@ with open(os.path.join(os.path.dirname(__file__), "syllabus.json"), "r", encodin
     SUBJECT_TITLES = json.load(f)
 with open(os.path.join(os.path.dirname(__file__), "syllabus_topics.json"), "r", encoding="utf-8") as f:
     SUBJECT_TOPICS = json.load(f)
+# All syllabus topics in one compiled pattern; chat turns record what they mention (topic_coverage.py).
+SYLLABUS_TOPIC_MATCHER = TopicMatcher(SUBJECT_TOPICS)
 
 START_FROM_BEGINNING_TRIGGERS = [
     "start from beginning",
@@ -555,6 +631,9 @@ FRENZY_RESET_PHRASES = [
     "restore theme"
 ]
 
+# Every keyword the /chat detectors look for, so each message is scanned once.
+MESSAGE_KEYWORDS = KeywordMatcher(PERSONA_KEYWORDS, FRENZY_TRIGGER_PHRASES, FRENZY_RESET_PHRASES)
+
 FRENZY_POEM = (
     "We were never in a relationship. Not even close. No name for it. No claim. No future.\n\n"
     "And still… I built space for you inside me — space you never asked for, space you never promised to fill.\n\n"
@@ -585,19 +664,21 @@ FRENZY_POEM = (
     "But the emptiness you left behind is painfully real — and it echoes in places I still can’t reach."
 )
 
-def _detect_frenzy_trigger(text: str) -> bool:
+def _detect_frenzy_trigger(text: str, hits: Optional[frozenset] = None) -> bool:
     msg = (text or "").strip().lower()
     if not msg:
         return False
     if msg == "frenzy":
         return True
-    return any(phrase in msg for phrase in FRENZY_TRIGGER_PHRASES)
+    hits = MESSAGE_KEYWORDS.find(msg) if hits is None else hits
+    return not hits.isdisjoint(FRENZY_TRIGGER_PHRASES)
 
-def _detect_frenzy_reset(text: str) -> bool:
+def _detect_frenzy_reset(text: str, hits: Optional[frozenset] = None) -> bool:
     msg = (text or "").strip().lower()
     if not msg:
         return False
-    return any(phrase in msg for phrase in FRENZY_RESET_PHRASES)
+    hits = MESSAGE_KEYWORDS.find(msg) if hits is None else hits
+    return not hits.isdisjoint(FRENZY_RESET_PHRASES)
 
 def _clean_json_text(text: str) -> str:
     if not text:
@@ -892,25 +973,16 @@ def _format_suggestions(session_id: Optional[int], suggestions: list[str]) -> li
             formatted.append(f"• {s}")
     return formatted
 
-def _finalize_reply_payload(session_id: Optional[int], payload: dict) -> dict:
+def _finalize_reply_payload(session_id: Optional[int], payload: dict, turn: Optional[ChatTurn] = None) -> dict:
     if not isinstance(payload, dict):
         return payload
+    if turn is not None:
+        # The reply is still returned when the write fails, but the client is told it was not saved.
+        payload["saved"] = turn.error is None
     payload["answer"] = _strip_banned_openers(payload.get("answer", ""))
     payload["next_suggestions"] = []
     return payload
 
-def _extract_score_percent(text: str) -> Optional[int]:
-    raw = (text or "").lower()
-    m = re.search(r"(\d{1,3})\s*%|\bscore\s*(\d{1,3})\b", raw)
-    if not m:
-        return None
-    val = m.group(1) or m.group(2)
-    try:
-        num = int(val)
-        return max(0, min(num, 100))
-    except Exception:
-        return None
-
 def _short_words(text: str, min_words: int = 2, max_words: int = 4) -> str:
     tokens = [t for t in re.split(r"\s+", str(text or "").strip()) if t]
     if not tokens:
@@ -995,16 +1067,6 @@ def _is_basic_question(message: str) -> bool:
     triggers = ["what is", "define", "meaning of", "full form", "expand", "basics of"]
     return any(t in msg for t in triggers) and len(msg.split()) <= 8
 
-def _enforce_session_limit(db: Session, user_id: int, max_sessions: int = 20) -> None:
-    sessions = db.query(ChatSession).filter(ChatSession.user_id == user_id).order_by(ChatSession.id.asc()).all()
-    if len(sessions) <= max_sessions:
-        return
-    overflow = len(sessions) - max_sessions
-    for s in sessions[:overflow]:
-        db.query(ChatHistory).filter(ChatHistory.session_id == s.id).delete()
-        db.delete(s)
-    db.commit()
-
 def _fuzzy_normalize_message(text: str) -> str:
     if not text:
         return text
@@ -1169,6 +1231,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
     max_age=3600,
 )
 
@@ -1231,22 +1294,20 @@ def _extract_text_from_pdf_bytes(data: bytes) -> str:
 
 @app.get("/dashboard-stats")
 def get_dashboard_stats(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    sessions = db.query(ChatSession).filter(ChatSession.user_id == current_user.id).all()
-    total_sessions = len(sessions)
-    
-    last_subject: str = "N/A"
-    if sessions:
-        last_chat = db.query(ChatHistory).filter(ChatHistory.session_id == sessions[0].id).order_by(ChatHistory.id.desc()).first()
-        if last_chat:
-            last_text = getattr(cast(Any, last_chat), "text", None)
-            last_subject = str(last_text)[:30] if last_text is not None else "N/A"
-    
+    # One row of counters maintained on write (rollups.py); no history scan.
+    stats = db.get(UserStats, current_user.id)
+    total_sessions = int(stats.session_count) if stats else 0
+    quiz_count = int(stats.quiz_count) if stats else 0
+    last_at = stats.last_message_at if stats else None
     return DashboardStats(
         total_sessions=total_sessions,
-        last_subject=last_subject,
+        last_subject=str(stats.last_subject) if stats and stats.last_subject else "N/A",
         study_hours=float(total_sessions * 0.5),
-        avg_quiz_score=85.0,
-        recent_activity="Last active 2 hours ago"
+        avg_quiz_score=round(float(stats.quiz_score_total) / quiz_count, 1) if quiz_count else 0.0,
+        recent_activity=recent_activity_label(last_at),
+        total_messages=int(stats.message_count) if stats else 0,
+        quiz_count=quiz_count,
+        last_active_at=last_at,
     )
 
 @app.get("/debug/session-state")
@@ -1281,31 +1342,93 @@ def debug_session_state(
         "count": len(SESSION_STATE)
     }
 
+@app.get("/debug/rag-namespaces")
+def debug_rag_namespaces(current_user: User = Depends(get_current_user)):
+    """Development-only: resident per-user notes indexes and LRU counters."""
+    if os.getenv("ENV", "dev").lower() not in {"dev", "development", "local"}:
+        raise HTTPException(status_code=403, detail="Debug endpoint disabled")
+    return rag_system.user_indexes.metrics()
+
+@app.get("/debug/embedding-batcher")
+def debug_embedding_batcher(current_user: User = Depends(get_current_user)):
+    """Development-only: micro-batcher batch-size and queue-wait histograms."""
+    if os.getenv("ENV", "dev").lower() not in {"dev", "development", "local"}:
+        raise HTTPException(status_code=403, detail="Debug endpoint disabled")
+    return batcher_metrics(VECTOR_EMBEDDINGS) or {"enabled": False}
+
+def _require_admin(x_admin_token: Optional[str]) -> None:
+    if settings.admin_token:
+        if not hmac.compare_digest(str(x_admin_token or ""), settings.admin_token):
+            raise HTTPException(status_code=403, detail="Admin token required")
+    elif os.getenv("ENV", "dev").lower() not in {"dev", "development", "local"}:
+        raise HTTPException(status_code=403, detail="Set ADMIN_TOKEN to enable admin endpoints")
+
+@app.get("/admin/vector-store")
+def vector_store_status(x_admin_token: Optional[str] = Header(default=None)):
+    """Active study-material index version, when it was loaded and how long it took."""
+    _require_admin(x_admin_token)
+    try:
+        return STUDY_STORE.status()
+    except SidecarUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.post("/admin/vector-store/reload")
+def reload_vector_store(force: bool = False, x_admin_token: Optional[str] = Header(default=None)):
+    """Load the newest published index in this worker and swap it in (in-flight queries finish on the old one)."""
+    _require_admin(x_admin_token)
+    try:
+        status = STUDY_STORE.reload(force=force)
+    except SidecarUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if status.get("last_error"):
+        raise HTTPException(status_code=500, detail=status["last_error"])
+    return status
+
+@app.get("/admin/retention")
+def retention_status(x_admin_token: Optional[str] = Header(default=None)):
+    """Retention policies and the rows/bytes reclaimed by the last background run."""
+    _require_admin(x_admin_token)
+    return RETENTION_JOB.status()
+
+@app.post("/notes/upload-pdf")
+def upload_notes_pdf(
+    file: UploadFile = File(...),
+    subject: str = Form(default=""),
+    current_user: User = Depends(get_current_user),
+):
+    """Index a PDF into the current user's personal notes namespace."""
+    filename = os.path.basename(str(file.filename or ""))
+    if not filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported.")
+
+    user_id = int(getattr(cast(Any, current_user), "id", 0) or 0)
+    # Kept outside UPLOAD_DIR, which is served publicly under /uploads.
+    notes_dir = os.path.join(settings.user_index_dir, "_sources", f"u{user_id}")
+    os.makedirs(notes_dir, exist_ok=True)
+    saved_path = os.path.join(notes_dir, f"{int(time.time())}_{filename}")
+    with open(saved_path, "wb") as out:
+        shutil.copyfileobj(file.file, out)
+
+    try:
+        chunks = rag_system.upload_pdf(saved_path, user_id=user_id, subject=subject.strip() or None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"filename": filename, "chunks": chunks, "subject": subject.strip() or None}
+
 @app.get("/syllabus-progress")
 def get_syllabus_progress(
     subject: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Returns syllabus completion % based on which subject topics appear in the user's chat history."""
+    """Returns syllabus completion % from the topics recorded as covered by the user's chats."""
 
     subject_code = (subject or "").strip().upper()
 
     if not subject_code:
-        # Best-effort: infer from last user message (no LLM calls; uses existing heuristic extractor)
-        last_user_msg = (
-            db.query(ChatHistory)
-            .join(ChatSession, ChatHistory.session_id == ChatSession.id)
-            .filter(ChatSession.user_id == current_user.id)
-            .filter(ChatHistory.sender == "user")
-            .order_by(ChatHistory.id.desc())
-            .first()
-        )
-        last_text = str(getattr(cast(Any, last_user_msg), "text", "") or "") if last_user_msg else ""
-        ctx = extract_subject_context(last_text)
-        inferred = str(ctx.get("subject_code") or "").strip().upper()
-        if inferred and inferred != "UNKNOWN":
-            subject_code = inferred
+        # Best-effort: the subject of the user's latest chat turn (kept in user_stats)
+        stats = db.get(UserStats, current_user.id)
+        subject_code = str(stats.last_subject or "").strip().upper() if stats else ""
 
     topics = SUBJECT_TOPICS.get(subject_code, []) if subject_code else []
     total_topics = len(topics)
@@ -1317,28 +1440,18 @@ def get_syllabus_progress(
             "covered_topics": [],
             "covered_count": 0,
             "completion_pct": 0.0,
+            "topics": [],
+            "history": [],
         }
 
-    history = (
-        db.query(ChatHistory)
-        .join(ChatSession, ChatHistory.session_id == ChatSession.id)
-        .filter(ChatSession.user_id == current_user.id)
-        .order_by(ChatHistory.id.desc())
-        .limit(500)
+    # One indexed read of (user, subject) coverage rows recorded on write.
+    rows = (
+        db.query(TopicCoverage.topic, TopicCoverage.first_seen_at, TopicCoverage.last_seen_at, TopicCoverage.hits)
+        .filter(TopicCoverage.user_id == current_user.id, TopicCoverage.subject == subject_code)
         .all()
     )
-
-    corpus = " ".join(
-        [str(getattr(cast(Any, m), "text", "") or "") for m in reversed(history)]
-    ).lower()
-
-    covered_topics: list[str] = []
-    for t in topics:
-        tl = str(t).lower().strip()
-        if not tl:
-            continue
-        if tl in corpus:
-            covered_topics.append(str(t))
+    seen = {str(r.topic): r for r in rows}
+    covered_topics = [str(t) for t in topics if str(t) in seen]
 
     covered_count = len(covered_topics)
     completion_pct = float((covered_count / total_topics) * 100.0) if total_topics else 0.0
@@ -1349,6 +1462,16 @@ def get_syllabus_progress(
         "covered_topics": covered_topics,
         "covered_count": covered_count,
         "completion_pct": completion_pct,
+        "topics": [
+            {
+                "topic": t,
+                "first_seen_at": seen[t].first_seen_at,
+                "last_seen_at": seen[t].last_seen_at,
+                "mentions": int(seen[t].hits or 0),
+            }
+            for t in covered_topics
+        ],
+        "history": coverage_history(seen[t].first_seen_at for t in covered_topics),
     }
 
 @app.get("/study-roadmap/latest")
@@ -1453,23 +1576,15 @@ def generate_apc_performance_report(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    sessions = db.query(ChatSession).filter(ChatSession.user_id == current_user.id).all()
-    session_ids = [int(getattr(cast(Any, s), "id", 0) or 0) for s in sessions]
-    chats = []
-    if session_ids:
-        chats = db.query(ChatHistory).filter(ChatHistory.session_id.in_(session_ids)).order_by(ChatHistory.id.asc()).all()
-
-    total_messages = len(chats)
-    eta_minutes = 1 if total_messages <= 120 else 2
-    user_msgs = [c for c in chats if str(getattr(cast(Any, c), "sender", "")).lower() == "user"]
-    ai_msgs = [c for c in chats if str(getattr(cast(Any, c), "sender", "")).lower() == "ai"]
+    # Aggregated in SQL (counts, GROUP BY subject/tool/day); no message rows are loaded.
+    inputs = collect_report_inputs(db, current_user.id)
+    eta_minutes = 1 if inputs["total_messages"] <= 120 else 2
 
     prompt = (
         "You are a performance analyzer for an IGNOU BCA student. "
         "Return plain Markdown with these sections: Progress Summary, Weak Areas, Latest Updates, Next 7-Day Action Plan. "
         "Keep it practical and realistic in Hinglish.\n\n"
-        f"DATA: total_sessions={len(sessions)}, total_messages={total_messages}, "
-        f"user_messages={len(user_msgs)}, ai_messages={len(ai_msgs)}"
+        f"DATA:\n{format_report_data(inputs)}"
     )
     completion = get_ai_response(messages=[{"role": "user", "content": prompt}], temperature=0.4)
     report_markdown = str(getattr(completion.choices[0].message, "content", "") or "").strip()
@@ -1488,6 +1603,7 @@ def generate_apc_performance_report(
         "eta_minutes": eta_minutes,
         "highlights": highlights,
         "report_markdown": report_markdown,
+        "inputs": inputs,
     }
     USER_PERFORMANCE_REPORTS[int(getattr(cast(Any, current_user), "id", 0) or 0)] = payload
     return payload
@@ -1502,26 +1618,69 @@ def get_latest_apc_performance_summary(current_user: User = Depends(get_current_
         "report_markdown": "",
     })
 
+async def _owned_session(db: AsyncSession, session_id: int, user_id: Any) -> Optional[ChatSession]:
+    result = await db.execute(
+        select(ChatSession).where(ChatSession.id == session_id, ChatSession.user_id == user_id)
+    )
+    return result.scalars().first()
+
+async def _owns_session(db: AsyncSession, session_id: int, user_id: Any) -> bool:
+    result = await db.execute(
+        select(ChatSession.id).where(ChatSession.id == session_id, ChatSession.user_id == user_id)
+    )
+    return result.scalar() is not None
+
+def _set_next_cursor(response: Response, next_cursor: Optional[int]) -> None:
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
+
 @app.get("/sessions")
-def get_sessions(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_sessions(
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Sidebar list, newest first, with each session's message count and last activity; paged by ``cursor`` (X-Next-Cursor)."""
     if not _is_chat_persistence_enabled(current_user):
         return []
-    return db.query(ChatSession).filter(ChatSession.user_id == current_user.id).order_by(ChatSession.id.desc()).all()
+    rows, next_cursor = await fetch_keyset_page(
+        db,
+        select(
+            ChatSession.id,
+            ChatSession.title,
+            ChatSession.created_at,
+            ChatSession.message_count,
+            ChatSession.last_message_at,
+        ).where(ChatSession.user_id == current_user.id),
+        ChatSession.id,
+        cursor,
+        clamp_limit(limit, default=100, maximum=500),
+    )
+    _set_next_cursor(response, next_cursor)
+    return [
+        {
+            "id": r.id,
+            "title": r.title,
+            "created_at": r.created_at,
+            "message_count": r.message_count,
+            "last_message_at": r.last_message_at,
+        }
+        for r in rows
+    ]
 
 # FIXED: Proper PUT endpoint to rename session
 @app.put("/sessions/{session_id}")
-def rename_session(
+async def rename_session(
     session_id: int, 
     title: str, 
     current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         # Verify session belongs to current user
-        session = db.query(ChatSession).filter(
-            ChatSession.id == session_id, 
-            ChatSession.user_id == current_user.id
-        ).first()
+        session = await _owned_session(db, session_id, current_user.id)
         
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
@@ -1532,8 +1691,7 @@ def rename_session(
         # Update session title
         session_any = cast(Any, session)
         session_any.title = str(title.strip())
-        db.commit()
-        db.refresh(session)
+        await db.commit()
         
         return {
             "message": "Session renamed successfully",
@@ -1543,98 +1701,178 @@ def rename_session(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error renaming session: {str(e)}")
 
 # FIXED: Proper DELETE endpoint with cascade delete
 @app.delete("/sessions/{session_id}")
-def delete_session(session_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_session(session_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     try:
         # Verify session belongs to current user
-        session = db.query(ChatSession).filter(
-            ChatSession.id == session_id, 
-            ChatSession.user_id == current_user.id
-        ).first()
-        
-        if not session:
+        if not await _owns_session(db, session_id, current_user.id):
             raise HTTPException(status_code=404, detail="Session not found")
         
-        # Delete all chat history associated with this session
-        db.query(ChatHistory).filter(ChatHistory.session_id == session_id).delete()
-        
-        # Delete the session itself
-        db.delete(session)
-        db.commit()
+        # Messages go with it (ON DELETE CASCADE)
+        await db.run_sync(lambda sync_db: release_sessions(sync_db, [session_id]))
+        await db.execute(delete(ChatSession).where(ChatSession.id == session_id))
+        await db.commit()
+        CHAT_HISTORY_TAIL.invalidate(session_id)
         
         return {"message": "Session deleted successfully", "session_id": session_id}
+    except HTTPException:
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting session: {str(e)}")
 
 
 @app.delete("/sessions")
-def clear_all_sessions(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def clear_all_sessions(
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Hide every session at once, then delete their messages in batches after the response is sent."""
     try:
-        sessions = db.query(ChatSession).filter(ChatSession.user_id == current_user.id).all()
-        if not sessions:
-            return {"message": "No sessions to clear", "deleted_sessions": 0, "deleted_messages": 0}
-
-        session_ids = [int(getattr(cast(Any, s), "id", 0) or 0) for s in sessions]
-        deleted_messages = 0
-        if session_ids:
-            deleted_messages = db.query(ChatHistory).filter(ChatHistory.session_id.in_(session_ids)).delete(synchronize_session=False)
-
-        deleted_sessions = db.query(ChatSession).filter(ChatSession.user_id == current_user.id).delete(synchronize_session=False)
-        db.commit()
+        result = await db.execute(select(ChatSession.id).where(ChatSession.user_id == current_user.id))
+        session_ids = [int(sid) for sid in result.scalars().all()]
+        if not session_ids:
+            return {"message": "No sessions to clear", "deleted_sessions": 0}
+
+        # Only chat_sessions rows change here; a purge interrupted later is finished by the retention job.
+        await db.run_sync(lambda sync_db: release_sessions(sync_db, session_ids))
+        await db.execute(
+            update(ChatSession).where(ChatSession.id.in_(session_ids)).values(user_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        CHAT_HISTORY_TAIL.invalidate(*session_ids)
+        background_tasks.add_task(purge_sessions, engine, session_ids, settings.retention_batch_size)
 
-        return {
-            "message": "All sessions cleared successfully",
-            "deleted_sessions": int(deleted_sessions or 0),
-            "deleted_messages": int(deleted_messages or 0),
-        }
+        return {"message": "All sessions cleared successfully", "deleted_sessions": len(session_ids)}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error clearing sessions: {str(e)}")
 
 @app.get("/history")
-def get_history(
+async def get_history(
+    response: Response,
     session_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[int] = None,
+    full: bool = False,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    """Messages oldest-first within the page; ``cursor`` (X-Next-Cursor) pages back to older messages.
+
+    With ``session_id`` the page holds full message bodies (the chat is open).
+    Across all sessions each row carries a ``preview`` unless ``full=true``
+    (exports); ``GET /history/{message_id}`` returns one full message.
+    """
     if not _is_chat_persistence_enabled(current_user):
         return []
 
+    columns = [ChatHistory.id, ChatHistory.sender, ChatHistory.session_id]
     # If session_id is provided, enforce ownership.
     if session_id is not None:
-        session = db.query(ChatSession).filter(
-            ChatSession.id == session_id,
-            ChatSession.user_id == current_user.id
-        ).first()
-        if not session:
+        if not await _owns_session(db, session_id, current_user.id):
             raise HTTPException(status_code=404, detail="Session not found")
-        chats = db.query(ChatHistory).filter(ChatHistory.session_id == session_id).order_by(ChatHistory.id).all()
-        return [{"id": c.id, "text": c.text, "sender": c.sender, "session_id": c.session_id} for c in chats]
+        rows, next_cursor = await fetch_keyset_page(
+            db,
+            select(*columns, ChatHistory.text).where(ChatHistory.session_id == session_id),
+            ChatHistory.id,
+            cursor,
+            clamp_limit(limit, default=200, maximum=1000),
+        )
+        _set_next_cursor(response, next_cursor)
+        return [{"id": r.id, "text": r.text, "sender": r.sender, "session_id": r.session_id} for r in reversed(rows)]
+
+    # No session_id: recent history across all the user's sessions (prevents 422 and supports exports).
+    user_sessions = select(ChatSession.id).where(ChatSession.user_id == current_user.id)
+    rows, next_cursor = await fetch_keyset_page(
+        db,
+        select(*columns, ChatHistory.text if full else preview_column(ChatHistory.text))
+        .where(ChatHistory.session_id.in_(user_sessions)),
+        ChatHistory.id,
+        cursor,
+        clamp_limit(limit, default=500 if full else 100, maximum=500),
+    )
+    _set_next_cursor(response, next_cursor)
+    if full:
+        return [{"id": r.id, "text": r.text, "sender": r.sender, "session_id": r.session_id} for r in reversed(rows)]
+    items = []
+    for r in reversed(rows):
+        text, truncated = preview(r.text)
+        items.append({"id": r.id, "preview": text, "truncated": truncated, "sender": r.sender, "session_id": r.session_id})
+    return items
+
+@app.get("/history/search")
+async def search_history(
+    response: Response,
+    q: str,
+    session_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Full-text search of the user's messages, best match first, with highlighted snippets.
 
-    # No session_id: return a bounded recent history across all user's sessions (prevents 422 and supports exports).
-    session_ids = [sid for (sid,) in db.query(ChatSession.id).filter(ChatSession.user_id == current_user.id).all()]
-    if not session_ids:
+    ``session_id`` narrows it to one chat; ``cursor`` is the X-Next-Cursor of the previous page.
+    """
+    if not _is_chat_persistence_enabled(current_user):
         return []
+    try:
+        rows, next_cursor = await search_messages(
+            db,
+            current_user.id,
+            q,
+            session_id=session_id,
+            limit=clamp_limit(limit, default=20, maximum=100),
+            offset=cursor or 0,
+        )
+    except OperationalError as e:
+        raise HTTPException(status_code=503, detail=f"Search index unavailable (run 'alembic upgrade head'): {e.orig}")
+    _set_next_cursor(response, next_cursor)
+    return [
+        {
+            "id": r.id,
+            "session_id": r.session_id,
+            "session_title": r.session_title,
+            "sender": r.sender,
+            "created_at": r.created_at,
+            "snippet": r.snippet,
+            "score": round(-float(r.rank), 4),
+        }
+        for r in rows
+    ]
 
-    chats_desc = db.query(ChatHistory).filter(
-        ChatHistory.session_id.in_(session_ids)
-    ).order_by(ChatHistory.id.desc()).limit(500).all()
-    chats = list(reversed(chats_desc))
-    return [{"id": c.id, "text": c.text, "sender": c.sender, "session_id": c.session_id} for c in chats]
+@app.get("/history/{message_id}")
+async def get_history_message(
+    message_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    row = (await db.execute(
+        select(ChatHistory.id, ChatHistory.sender, ChatHistory.session_id, ChatHistory.text, ChatHistory.created_at)
+        .join(ChatSession, ChatHistory.session_id == ChatSession.id)
+        .where(ChatHistory.id == message_id, ChatSession.user_id == current_user.id)
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Message not found")
+    return {"id": row.id, "text": row.text, "sender": row.sender, "session_id": row.session_id,
+            "created_at": row.created_at}
 
 # --- ENHANCED CHAT ENDPOINT ---
 
 @app.post("/chat")
-def chat_endpoint(request: ChatRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def chat_endpoint(request: ChatRequest, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     requested_mode = str(getattr(request, "mode", "auto") or "auto").strip().lower()
     is_lite_mode = requested_mode in {"lite", "fast", "quick"}
 
     user_message = request.message[:2200] if is_lite_mode else request.message[:4000]
+    message_hits = MESSAGE_KEYWORDS.find(user_message)
     is_creator_user = bool(getattr(current_user, "is_creator", 0))
     active_tool_raw = getattr(request, "active_tool", None)
     active_tool_key = _normalize_tool_key(active_tool_raw)
@@ -1643,30 +1881,39 @@ def chat_endpoint(request: ChatRequest, current_user: User = Depends(get_current
     selected_semester = str(getattr(request, "selected_semester", "") or "").strip()
     persistence_enabled = _is_chat_persistence_enabled(current_user)
 
-    # Session handling
+    # Session handling: the whole turn is staged and committed once, after the reply exists.
     session_id = getattr(request, 'session_id', None) if persistence_enabled else None
     history = []
+    turn = None
     if persistence_enabled:
+        if session_id and not await _owns_session(db, session_id, current_user.id):
+            raise HTTPException(status_code=404, detail="Session not found")
+        # The title is an LLM call: only new sessions need one, and never on the event loop.
+        new_session_title = "New Chat"
         if not session_id:
-            session = ChatSession(user_id=current_user.id, title=_generate_short_chat_title(user_message))
-            db.add(session)
-            db.commit()
-            db.refresh(session)
-            session_id = session.id
-
-        # Save user message
-        db.add(ChatHistory(session_id=session_id, sender="user", text=user_message))
-        db.commit()
-
-        # Build history for context
-        history = db.query(ChatHistory).filter(ChatHistory.session_id == session_id).order_by(ChatHistory.id).all()
+            new_session_title = await run_in_threadpool(_generate_short_chat_title, user_message)
+        subject_code = str(extract_subject_context(user_message, selected_subject or None, hits=message_hits).get("subject_code") or "")
+        turn = ChatTurn(
+            db,
+            user_id=current_user.id,
+            session_id=session_id or None,
+            new_session_title=new_session_title,
+            tail_cache=CHAT_HISTORY_TAIL,
+            subject=subject_code.upper() if subject_code and subject_code != "UNKNOWN" else None,
+            topic_matcher=SYLLABUS_TOPIC_MATCHER,
+        )
+        if not turn.is_new_session:
+            # Only the tail is ever used (context window + easter-egg scan), so never load the whole session.
+            history = await CHAT_HISTORY_TAIL.get_async(db, session_id)
+        # Build history for context (the pending user message is its last entry)
+        history.append(turn.add_user_message(user_message))
 
     # Frenzy mode controls (frontend listens to theme_override payload)
-    if _detect_frenzy_reset(user_message):
+    if _detect_frenzy_reset(user_message, message_hits):
         reset_text = "Frenzy mode disabled. Theme restored."
-        if persistence_enabled and session_id is not None:
-            db.add(ChatHistory(session_id=session_id, sender="ai", text=reset_text))
-            db.commit()
+        if turn is not None:
+            turn.add_ai_message(reset_text)
+            session_id = await turn.commit_async()
         payload = _build_response_payload(reset_text)
         payload["session_id"] = session_id
         payload["mode"] = "lite" if is_lite_mode else requested_mode
@@ -1674,13 +1921,13 @@ def chat_endpoint(request: ChatRequest, current_user: User = Depends(get_current
         payload["active"] = False
         payload["persona"] = "frenzy"
         payload["reset_label"] = "Restore"
-        return _finalize_reply_payload(session_id, payload)
+        return _finalize_reply_payload(session_id, payload, turn)
 
-    if _detect_frenzy_trigger(user_message):
+    if _detect_frenzy_trigger(user_message, message_hits):
         frenzy_text = "Frenzy mode activated."
-        if persistence_enabled and session_id is not None:
-            db.add(ChatHistory(session_id=session_id, sender="ai", text=frenzy_text))
-            db.commit()
+        if turn is not None:
+            turn.add_ai_message(frenzy_text)
+            session_id = await turn.commit_async()
         payload = _build_response_payload(frenzy_text)
         payload["session_id"] = session_id
         payload["mode"] = "lite" if is_lite_mode else requested_mode
@@ -1690,13 +1937,13 @@ def chat_endpoint(request: ChatRequest, current_user: User = Depends(get_current
         payload["message"] = FRENZY_POEM
         payload["speed_ms"] = 60
         payload["reset_label"] = "Restore"
-        return _finalize_reply_payload(session_id, payload)
+        return _finalize_reply_payload(session_id, payload, turn)
 
-    persona_trigger = detect_persona_trigger(user_message)
+    persona_trigger = detect_persona_trigger(user_message, message_hits)
     easter_egg_allowed = _is_easter_egg_allowed(history, window=15)
 
     if persona_trigger == "jiya":
-        jiya_question_type = detect_jiya_question_type(user_message)
+        jiya_question_type = detect_jiya_question_type(user_message, message_hits)
         if jiya_question_type == "jiya_identity":
             system_prompt = get_jiya_identity_prompt(is_creator_user)
         elif jiya_question_type == "developer_crush":
@@ -1714,31 +1961,57 @@ def chat_endpoint(request: ChatRequest, current_user: User = Depends(get_current
         str(getattr(request, "response_mode", "fast") or "fast")
     )
 
-    tool_context = ""
-    if persona_trigger != "jiya" and active_tool_prompt_name:
-        tool_prompt = get_study_tool_prompt(active_tool_prompt_name, selected_subject)
-        if tool_prompt:
-            system_prompt += f"\n\n{tool_prompt}"
-
-        if active_tool_key == "exam predictor":
-            tool_context, _ = _retrieve_exam_predictor_pyq_context(
-                selected_subject=selected_subject,
-                selected_semester=selected_semester,
-                k=20 if is_lite_mode else 30,
-            )
-        else:
-            tool_context, _, _ = _retrieve_study_material(
-                user_query=user_message,
-                active_tool=active_tool_raw,
-                k=4 if is_lite_mode else 7,
-            )
+    retrieval_sources: dict[str, Any] = {}
+    if persona_trigger != "jiya":
+        if active_tool_prompt_name:
+            tool_prompt = get_study_tool_prompt(active_tool_prompt_name, selected_subject)
+            if tool_prompt:
+                system_prompt += f"\n\n{tool_prompt}"
+
+            if active_tool_key == "exam predictor":
+                retrieval_sources["study_material"] = lambda: _retrieve_exam_predictor_pyq_context(
+                    selected_subject=selected_subject,
+                    selected_semester=selected_semester,
+                    k=20 if is_lite_mode else 30,
+                )[0]
+            else:
+                retrieval_sources["study_material"] = lambda: _retrieve_study_material(
+                    user_query=user_message,
+                    active_tool=active_tool_raw,
+                    k=4 if is_lite_mode else 7,
+                    token_budget=500 if is_lite_mode else 1200,
+                )[0]
+
+        notes_user_id = int(getattr(cast(Any, current_user), "id", 0) or 0)
+        retrieval_sources["user_notes"] = lambda: rag_system.query(
+            user_message,
+            k=2 if is_lite_mode else 3,
+            user_id=notes_user_id,
+            subject=selected_subject or None,
+            token_budget=250 if is_lite_mode else 500,
+        )
 
-        if tool_context:
-            system_prompt += (
-                "\n\nREFERENCE_CONTEXT_START\n"
-                f"{tool_context[:7000]}\n"
-                "REFERENCE_CONTEXT_END"
-            )
+    # Both stores are searched concurrently; user notes that miss the deadline are left out,
+    # study material (when a tool asked for it) gets a bounded grace period first.
+    # Retrieval and the Groq call block, so they run on the threadpool, off the event loop.
+    retrieved = await run_in_threadpool(
+        retrieve_parallel,
+        retrieval_sources,
+        timeout_s=settings.chat_retrieval_timeout_ms / 1000.0,
+        primary="study_material",
+        primary_grace_s=settings.chat_retrieval_primary_grace_ms / 1000.0,
+    )
+    tool_context = merge_context_sections(
+        [("study_material", retrieved.get("study_material", "")), ("user_notes", retrieved.get("user_notes", ""))],
+        budget_chars=7000,
+        labels={"study_material": "STUDY MATERIAL", "user_notes": "YOUR UPLOADED NOTES"},
+    )
+    if tool_context:
+        system_prompt += (
+            "\n\nREFERENCE_CONTEXT_START\n"
+            f"{tool_context}\n"
+            "REFERENCE_CONTEXT_END"
+        )
 
     if is_lite_mode:
         system_prompt += (
@@ -1754,26 +2027,31 @@ def chat_endpoint(request: ChatRequest, current_user: User = Depends(get_current
 
     # Get AI response
     try:
-        response = get_ai_response(
+        response = await run_in_threadpool(
+            get_ai_response,
             messages=messages,
             temperature=0.45 if is_lite_mode else 0.7,
             max_tokens=520 if is_lite_mode else 1400,
         )
         ai_text = str(getattr(response.choices[0].message, "content", "") or "").strip()
     except ProviderRateLimitError as e:
+        if turn is not None:
+            await turn.discard_async()
         raise HTTPException(status_code=429, detail=e.message)
     except Exception as e:
+        if turn is not None:
+            await turn.discard_async()
         raise HTTPException(status_code=500, detail=str(e))
 
-    # Save AI response
-    if persistence_enabled and session_id is not None:
-        db.add(ChatHistory(session_id=session_id, sender="ai", text=ai_text))
-        db.commit()
+    # Save session, user message and AI response in one transaction
+    if turn is not None:
+        turn.add_ai_message(ai_text)
+        session_id = await turn.commit_async()
 
     payload = _build_response_payload(ai_text)
     payload["session_id"] = session_id
     payload["mode"] = "lite" if is_lite_mode else requested_mode
-    return _finalize_reply_payload(session_id, payload)
+    return _finalize_reply_payload(session_id, payload, turn)
 
 
 @app.post("/upload-notes-ocr")
@@ -1783,7 +2061,7 @@ async def upload_notes_ocr(
 ):
     try:
         data = await file.read()
-        extracted = _extract_text_from_image_bytes(data)
+        extracted = await run_in_threadpool(_extract_text_from_image_bytes, data)
         if not extracted.strip():
             return {
                 "filename": file.filename,
@@ -1797,7 +2075,8 @@ async def upload_notes_ocr(
             "Return ONLY valid JSON array of short strings, max 12 items.\n\n"
             f"OCR_TEXT:\n{extracted[:9000]}"
         )
-        completion = get_ai_response(
+        completion = await run_in_threadpool(
+            get_ai_response,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.25,
             max_tokens=700,
@@ -1837,7 +2116,7 @@ async def apc_ocr_quiz(
 ):
     try:
         data = await file.read()
-        extracted = _extract_text_from_image_bytes(data)
+        extracted = await run_in_threadpool(_extract_text_from_image_bytes, data)
         if not extracted.strip():
             raise HTTPException(status_code=400, detail="No readable text found in uploaded image.")
 
@@ -1848,7 +2127,8 @@ async def apc_ocr_quiz(
             f"REMARKS: {remarks or 'None'}\n\n"
             f"OCR_TEXT:\n{extracted[:9000]}"
         )
-        completion = get_ai_response(
+        completion = await run_in_threadpool(
+            get_ai_response,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.4,
             max_tokens=1400,
@@ -2110,7 +2390,8 @@ async def generate_study_plan(request: StudyPlanRequest):
         '{"study_plan": [{"day": 1, "focus_subject": "Subject", "topics_to_cover": ["Topic 1"], "allocated_hours": 2}]}'
     )
     try:
-        response = get_ai_response(
+        response = await run_in_threadpool(
+            get_ai_response,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.5,
             max_tokens=1000,
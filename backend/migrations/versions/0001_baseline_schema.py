@@ -0,0 +1,145 @@
+"""Baseline schema (users, chat sessions/history, study roadmaps, APC logs)
+
+Matches what ``Base.metadata.create_all`` plus the old import-time
+``_sqlite_ensure_column`` calls produced. Databases created before migrations
+existed already have these tables: they are left alone, and any additive
+column they are missing is added once here instead of on every import.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _additive_columns() -> dict[str, list[sa.Column]]:
+    """Columns added after the first release; older database files may lack them."""
+    return {
+        "chat_history": [
+            sa.Column("intent_type", sa.String(), nullable=True),
+            sa.Column("confidence_score", sa.Float(), nullable=True),
+        ],
+        "users": [
+            sa.Column("email", sa.String(), nullable=True),
+            sa.Column("college", sa.String(), nullable=True),
+            sa.Column("enrollment_id", sa.String(), nullable=True),
+            sa.Column("bio", sa.Text(), nullable=True),
+            sa.Column("exam_date", sa.String(), nullable=True),
+            sa.Column("exam_session", sa.String(), nullable=True),
+            sa.Column("default_response_mode", sa.String(), server_default="fast"),
+            sa.Column("enable_notifications", sa.Integer(), server_default="1"),
+            sa.Column("auto_save_history", sa.Integer(), server_default="1"),
+            sa.Column("show_quick_suggestions", sa.Integer(), server_default="1"),
+            sa.Column("privacy_mode", sa.Integer(), server_default="0"),
+            sa.Column("achievements_json", sa.Text(), nullable=True),
+            sa.Column("profile_picture_url", sa.String(), nullable=True),
+            sa.Column("is_creator", sa.Integer(), server_default="0"),
+        ],
+    }
+
+
+def _create_tables(existing: set[str]) -> None:
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("username", sa.String()),
+            sa.Column("hashed_password", sa.String()),
+            sa.Column("display_name", sa.String()),
+            sa.Column("gender", sa.String(), nullable=True),
+            sa.Column("mobile_number", sa.String(), nullable=True),
+            sa.Column("email", sa.String(), nullable=True),
+            sa.Column("college", sa.String(), nullable=True),
+            sa.Column("enrollment_id", sa.String(), nullable=True),
+            sa.Column("bio", sa.Text(), nullable=True),
+            sa.Column("exam_date", sa.String(), nullable=True),
+            sa.Column("exam_session", sa.String(), nullable=True),
+            sa.Column("default_response_mode", sa.String(), nullable=False),
+            sa.Column("enable_notifications", sa.Integer(), nullable=False),
+            sa.Column("auto_save_history", sa.Integer(), nullable=False),
+            sa.Column("show_quick_suggestions", sa.Integer(), nullable=False),
+            sa.Column("privacy_mode", sa.Integer(), nullable=False),
+            sa.Column("achievements_json", sa.Text(), nullable=True),
+            sa.Column("profile_picture_url", sa.String(), nullable=True),
+            sa.Column("is_creator", sa.Integer()),
+            sa.Column("created_at", sa.DateTime()),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    if "chat_sessions" not in existing:
+        op.create_table(
+            "chat_sessions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("title", sa.String()),
+            sa.Column("created_at", sa.DateTime()),
+        )
+        op.create_index("ix_chat_sessions_id", "chat_sessions", ["id"])
+
+    if "chat_history" not in existing:
+        op.create_table(
+            "chat_history",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("session_id", sa.Integer(), sa.ForeignKey("chat_sessions.id")),
+            sa.Column("sender", sa.String()),
+            sa.Column("text", sa.Text()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("intent_type", sa.String(), nullable=True),
+            sa.Column("confidence_score", sa.Float(), nullable=True),
+        )
+        op.create_index("ix_chat_history_id", "chat_history", ["id"])
+
+    if "study_roadmaps" not in existing:
+        op.create_table(
+            "study_roadmaps",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("subject", sa.String(), nullable=True),
+            sa.Column("title", sa.String(), nullable=True),
+            sa.Column("roadmap_json", sa.Text(), nullable=False),
+            sa.Column("raw_text", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime()),
+        )
+        op.create_index("ix_study_roadmaps_id", "study_roadmaps", ["id"])
+        op.create_index("ix_study_roadmaps_user_id", "study_roadmaps", ["user_id"])
+
+    if "apc_logs" not in existing:
+        op.create_table(
+            "apc_logs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+            sa.Column("tool_name", sa.String()),
+            sa.Column("subject", sa.String(), nullable=True),
+            sa.Column("semester", sa.String(), nullable=True),
+            sa.Column("prompt_text", sa.Text(), nullable=True),
+            sa.Column("response_text", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime()),
+        )
+        op.create_index("ix_apc_logs_id", "apc_logs", ["id"])
+        op.create_index("ix_apc_logs_user_id", "apc_logs", ["user_id"])
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    existing = set(sa.inspect(bind).get_table_names())
+    _create_tables(existing)
+    for table, columns in _additive_columns().items():
+        if table not in existing:
+            continue
+        present = {c["name"] for c in sa.inspect(bind).get_columns(table)}
+        for column in columns:
+            if column.name not in present:
+                op.add_column(table, column)
+
+
+def downgrade() -> None:
+    for table in ("apc_logs", "study_roadmaps", "chat_history", "chat_sessions", "users"):
+        op.drop_table(table)
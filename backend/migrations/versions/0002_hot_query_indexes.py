@@ -0,0 +1,57 @@
+"""Composite indexes for the hot per-user / per-session queries
+
+* chat_history(session_id, id): history tail, /history, session deletes
+* chat_history(session_id, sender, id): last user message in /syllabus-progress
+* chat_sessions(user_id, id): sidebar list and every "sessions of this user" join
+* apc_logs(user_id, id), study_roadmaps(user_id, id): newest-first per-user lists
+
+The single-column user_id indexes on apc_logs and study_roadmaps are prefixes
+of the new composites and are dropped. Query plans before/after are recorded
+in benchmarks/query_plans.md (python benchmarks/query_plans.py).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+NEW_INDEXES = [
+    ("ix_chat_history_session_id_id", "chat_history", ["session_id", "id"]),
+    ("ix_chat_history_session_id_sender_id", "chat_history", ["session_id", "sender", "id"]),
+    ("ix_chat_sessions_user_id_id", "chat_sessions", ["user_id", "id"]),
+    ("ix_apc_logs_user_id_id", "apc_logs", ["user_id", "id"]),
+    ("ix_study_roadmaps_user_id_id", "study_roadmaps", ["user_id", "id"]),
+]
+SUPERSEDED_INDEXES = [
+    ("ix_apc_logs_user_id", "apc_logs"),
+    ("ix_study_roadmaps_user_id", "study_roadmaps"),
+]
+
+
+def _index_names(table: str) -> set[str]:
+    return {ix["name"] for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    # Checked per index: a file created by create_all from the current models already has them.
+    for name, table, columns in NEW_INDEXES:
+        if name not in _index_names(table):
+            op.create_index(name, table, columns)
+    for name, table in SUPERSEDED_INDEXES:
+        if name in _index_names(table):
+            op.drop_index(name, table_name=table)
+
+
+def downgrade() -> None:
+    for name, table in SUPERSEDED_INDEXES:
+        op.create_index(name, table, ["user_id"])
+    for name, table, _ in reversed(NEW_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,56 @@
+"""ON DELETE CASCADE from chat_history.session_id to chat_sessions
+
+Deleting a session now removes its messages inside the database (SQLite runs
+with foreign_keys=ON), so the endpoints no longer issue their own
+chat_history deletes and the ORM never loads messages to delete them.
+Messages whose session no longer exists cannot be read by any endpoint; they
+are removed first so the constraint can be created. SQLite cannot alter a
+constraint in place, so chat_history is rebuilt in batch mode there.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+
+from typing import Optional
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+FK_NAME = "fk_chat_history_session_id_chat_sessions"
+# Lets batch mode address the unnamed constraint SQLite reflects.
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def _session_fk() -> Optional[dict]:
+    for fk in sa.inspect(op.get_bind()).get_foreign_keys("chat_history"):
+        if fk["referred_table"] == "chat_sessions":
+            return fk
+    return None
+
+
+def _replace_session_fk(ondelete: Optional[str]) -> None:
+    fk = _session_fk()
+    if fk is not None and (fk.get("options") or {}).get("ondelete") == ondelete:
+        return  # created by create_all from the current models
+    with op.batch_alter_table("chat_history", naming_convention=NAMING_CONVENTION) as batch:
+        if fk is not None:
+            batch.drop_constraint(fk.get("name") or FK_NAME, type_="foreignkey")
+        batch.create_foreign_key(FK_NAME, "chat_sessions", ["session_id"], ["id"], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    op.execute(
+        "DELETE FROM chat_history WHERE session_id IS NOT NULL "
+        "AND session_id NOT IN (SELECT id FROM chat_sessions)"
+    )
+    _replace_session_fk("CASCADE")
+
+
+def downgrade() -> None:
+    _replace_session_fk(None)
@@ -0,0 +1,89 @@
+"""Rollup counters: chat_sessions.message_count/last_message_at and user_stats
+
+The dashboard and sidebar read these instead of counting chat_history; the
+application keeps them current on every write (rollups.py). Existing data is
+backfilled here with set-based statements. Quiz averages are rebuilt from the
+scores already recorded in quiz/exam APC logs.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# Same pattern as rollups.extract_score_percent (migrations do not import app code).
+SCORE_RE = re.compile(r"(\d{1,3})\s*%|\bscore\s*(\d{1,3})\b")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {c["name"] for c in sa.inspect(bind).get_columns("chat_sessions")}
+    with op.batch_alter_table("chat_sessions") as batch:
+        if "message_count" not in columns:
+            batch.add_column(sa.Column("message_count", sa.Integer(), nullable=False, server_default="0"))
+        if "last_message_at" not in columns:
+            batch.add_column(sa.Column("last_message_at", sa.DateTime(), nullable=True))
+    if "user_stats" not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            "user_stats",
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("session_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("message_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("last_message_at", sa.DateTime(), nullable=True),
+            sa.Column("last_subject", sa.String(), nullable=True),
+            sa.Column("quiz_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("quiz_score_total", sa.Float(), nullable=False, server_default="0"),
+        )
+
+    op.execute(
+        """
+        UPDATE chat_sessions SET
+            message_count = (SELECT COUNT(*) FROM chat_history h WHERE h.session_id = chat_sessions.id),
+            last_message_at = (SELECT MAX(h.created_at) FROM chat_history h WHERE h.session_id = chat_sessions.id)
+        """
+    )
+    op.execute("DELETE FROM user_stats")
+    op.execute(
+        """
+        INSERT INTO user_stats (user_id, session_count, message_count, last_message_at, quiz_count, quiz_score_total)
+        SELECT u.id,
+               (SELECT COUNT(*) FROM chat_sessions s WHERE s.user_id = u.id),
+               (SELECT COALESCE(SUM(s.message_count), 0) FROM chat_sessions s WHERE s.user_id = u.id),
+               (SELECT MAX(s.last_message_at) FROM chat_sessions s WHERE s.user_id = u.id),
+               0, 0
+        FROM users u
+        """
+    )
+
+    totals: dict[int, list[float]] = {}
+    logs = bind.execute(sa.text(
+        "SELECT user_id, response_text FROM apc_logs "
+        "WHERE user_id IS NOT NULL AND (LOWER(tool_name) LIKE '%quiz%' OR LOWER(tool_name) LIKE '%exam%')"
+    ))
+    for user_id, response_text in logs:
+        m = SCORE_RE.search(str(response_text or "").lower())
+        if m:
+            entry = totals.setdefault(int(user_id), [0, 0.0])
+            entry[0] += 1
+            entry[1] += max(0, min(int(m.group(1) or m.group(2)), 100))
+    if totals:
+        bind.execute(
+            sa.text("UPDATE user_stats SET quiz_count = :count, quiz_score_total = :total WHERE user_id = :user_id"),
+            [{"user_id": u, "count": c, "total": t} for u, (c, t) in totals.items()],
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("user_stats")
+    with op.batch_alter_table("chat_sessions") as batch:
+        batch.drop_column("last_message_at")
+        batch.drop_column("message_count")
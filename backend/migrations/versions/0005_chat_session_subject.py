@@ -0,0 +1,31 @@
+"""chat_sessions.subject for per-subject report aggregates
+
+ChatTurn records the subject code detected in each turn on its session, so
+the APC performance report can sum message_count per subject in SQL.
+Sessions written before this revision have no subject and are reported as
+"unknown".
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("chat_sessions")}
+    if "subject" not in columns:
+        with op.batch_alter_table("chat_sessions") as batch:
+            batch.add_column(sa.Column("subject", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("chat_sessions") as batch:
+        batch.drop_column("subject")
@@ -0,0 +1,62 @@
+"""Full-text search over chat_history
+
+SQLite: an external-content FTS5 table (chat_history_fts, rowid = chat_history.id)
+kept in sync by AFTER INSERT/UPDATE/DELETE triggers on chat_history, so it
+follows cascade deletes and retention purges too. Existing rows are indexed
+with the FTS5 'rebuild' command.
+
+PostgreSQL: a GIN index on to_tsvector('simple', text); chat_search.py issues
+the matching expression.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chat_history_fts USING fts5("
+    "text, content='chat_history', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS chat_history_fts_ai AFTER INSERT ON chat_history BEGIN "
+    "INSERT INTO chat_history_fts(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_history_fts_ad AFTER DELETE ON chat_history BEGIN "
+    "INSERT INTO chat_history_fts(chat_history_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_history_fts_au AFTER UPDATE OF text ON chat_history BEGIN "
+    "INSERT INTO chat_history_fts(chat_history_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO chat_history_fts(rowid, text) VALUES (new.id, new.text); END",
+    "INSERT INTO chat_history_fts(chat_history_fts) VALUES ('rebuild')",
+]
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS chat_history_fts_au",
+    "DROP TRIGGER IF EXISTS chat_history_fts_ad",
+    "DROP TRIGGER IF EXISTS chat_history_fts_ai",
+    "DROP TABLE IF EXISTS chat_history_fts",
+]
+POSTGRES_INDEX = "ix_chat_history_text_fts"
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+    elif dialect == "postgresql":
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS {POSTGRES_INDEX} ON chat_history "
+            "USING GIN (to_tsvector('simple', coalesce(text, '')))"
+        )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+    elif dialect == "postgresql":
+        op.execute(f"DROP INDEX IF EXISTS {POSTGRES_INDEX}")
@@ -0,0 +1,105 @@
+"""topic_coverage: syllabus topics covered per user
+
+Chat turns now record the syllabus topics they mention (topic_coverage.py), so
+/syllabus-progress no longer rescans recent messages. Existing history is
+scanned once here, in id order and in batches, with the same rule: a topic is
+covered when its name appears in a message, case-insensitively.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+
+import json
+import os
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+SYLLABUS_TOPICS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "syllabus_topics.json")
+BATCH = 2000
+
+
+def _load_topics() -> list[tuple[str, str, str]]:
+    try:
+        with open(SYLLABUS_TOPICS, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except OSError:
+        return []
+    return [
+        (str(subject).upper(), str(topic), str(topic).strip().lower())
+        for subject, topics in data.items()
+        for topic in topics
+        if str(topic).strip()
+    ]
+
+
+def _backfill(bind) -> None:
+    topics = _load_topics()
+    if not topics:
+        return
+    coverage: dict[tuple[int, str, str], list] = {}
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT h.id, s.user_id, h.text, h.created_at FROM chat_history h "
+                "JOIN chat_sessions s ON s.id = h.session_id "
+                "WHERE h.id > :last_id AND s.user_id IS NOT NULL ORDER BY h.id LIMIT :batch"
+            ).columns(created_at=sa.DateTime),
+            {"last_id": last_id, "batch": BATCH},
+        ).all()
+        if not rows:
+            break
+        for message_id, user_id, text, created_at in rows:
+            lowered = str(text or "").lower()
+            for subject, topic, key in topics:
+                if key in lowered:
+                    entry = coverage.setdefault((int(user_id), subject, topic), [created_at, created_at, 0])
+                    if created_at is not None:
+                        entry[0] = created_at if entry[0] is None else min(entry[0], created_at)
+                        entry[1] = created_at if entry[1] is None else max(entry[1], created_at)
+                    entry[2] += 1
+        last_id = rows[-1][0]
+    if coverage:
+        now = datetime.utcnow()
+        table = sa.table(
+            "topic_coverage",
+            sa.column("user_id"), sa.column("subject"), sa.column("topic"),
+            sa.column("first_seen_at", sa.DateTime), sa.column("last_seen_at", sa.DateTime), sa.column("hits"),
+        )
+        op.bulk_insert(table, [
+            {"user_id": u, "subject": s, "topic": t, "first_seen_at": first or now, "last_seen_at": last or now, "hits": n}
+            for (u, s, t), (first, last, n) in coverage.items()
+        ])
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if "topic_coverage" in sa.inspect(bind).get_table_names():
+        return
+    op.create_table(
+        "topic_coverage",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("subject", sa.String(), nullable=False),
+        sa.Column("topic", sa.String(), nullable=False),
+        sa.Column("first_seen_at", sa.DateTime(), nullable=False),
+        sa.Column("last_seen_at", sa.DateTime(), nullable=False),
+        sa.Column("hits", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.create_index(
+        "ux_topic_coverage_user_subject_topic", "topic_coverage", ["user_id", "subject", "topic"], unique=True
+    )
+    _backfill(bind)
+
+
+def downgrade() -> None:
+    op.drop_index("ux_topic_coverage_user_subject_topic", table_name="topic_coverage")
+    op.drop_table("topic_coverage")
@@ -2,6 +2,7 @@
 BCABuddy Pydantic Models — Author: Saurav Kumar
 """
 from pydantic import BaseModel, Field
+from datetime import datetime
 from typing import Optional, List
 
 class UserCreate(BaseModel):
@@ -78,6 +79,9 @@ class DashboardStats(BaseModel):
     study_hours: float
     avg_quiz_score: float
     recent_activity: str
+    total_messages: int = 0
+    quiz_count: int = 0
+    last_active_at: Optional[datetime] = None
 
 class UserProfile(BaseModel):
     username: str
@@ -0,0 +1,63 @@
+"""
+Keyset (cursor) pagination helpers for list endpoints.
+
+Pages are ordered by ``id`` and continue from the last id seen
+(``WHERE id < cursor`` for newest-first lists), so every page is one indexed
+range scan no matter how deep the user pages. List endpoints keep returning a
+plain JSON array; the cursor for the next page is sent in the
+``X-Next-Cursor`` response header and is absent on the last page. Every list
+has a default page size; clients that need the whole list follow the header.
+"""
+
+from typing import Any, Optional
+
+from sqlalchemy import func
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+PREVIEW_CHARS = 160
+
+
+def clamp_limit(limit: Optional[int], default: int, maximum: int) -> int:
+    if limit is None:
+        return default
+    return max(1, min(int(limit), maximum))
+
+
+def preview(text: Optional[str], chars: int = PREVIEW_CHARS) -> tuple[str, bool]:
+    """``(text cut to ~chars on a word boundary, was_truncated)``."""
+    text = str(text or "")
+    if len(text) <= chars:
+        return text, False
+    cut = text[:chars]
+    space = cut.rfind(" ")
+    if space >= chars // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "…", True
+
+
+def preview_column(column: Any, chars: int = PREVIEW_CHARS) -> Any:
+    """Select only the first ``chars + 1`` characters of a text column (enough for ``preview``)."""
+    return func.substr(column, 1, chars + 1).label(column.key)
+
+
+async def fetch_keyset_page(
+    db: Any,
+    stmt: Any,
+    id_column: Any,
+    cursor: Optional[int],
+    limit: int,
+    newest_first: bool = True,
+) -> tuple[list[Any], Optional[int]]:
+    """Run ``stmt`` for one page after ``cursor``; returns ``(rows, next_cursor)``.
+
+    ``stmt`` must not be ordered or limited yet. One extra row is fetched to
+    tell whether another page exists.
+    """
+    if cursor is not None:
+        stmt = stmt.where(id_column < cursor if newest_first else id_column > cursor)
+    stmt = stmt.order_by(id_column.desc() if newest_first else id_column.asc()).limit(limit + 1)
+    rows = list((await db.execute(stmt)).all())
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, int(rows[-1]._mapping[id_column.key])
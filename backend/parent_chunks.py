@@ -0,0 +1,146 @@
+"""
+Parent-child chunking for uploaded documents.
+
+Small child chunks are embedded for precise matching; each one records the id
+of the parent section (a page, or a slice of a long page) it came from. At
+query time child hits are mapped back to their parents, de-duplicated, and
+returned under a size cap, so one answer-bearing section reaches the prompt as
+one piece instead of several 500-char fragments.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Optional
+
+PARENT_CHUNK_SIZE = 2000
+CHILD_CHUNK_SIZE = 250
+CHILD_CHUNK_OVERLAP = 25
+PARENT_ID_KEY = "parent_id"
+
+
+def parent_id_for(text: str, metadata: dict[str, Any]) -> str:
+    basis = f"{metadata.get('source', '')}|{metadata.get('page', '')}|{text}"
+    return hashlib.sha1(basis.encode("utf-8")).hexdigest()
+
+
+def split_parent_child(
+    docs: list[Any],
+    parent_size: int = PARENT_CHUNK_SIZE,
+    child_size: int = CHILD_CHUNK_SIZE,
+    child_overlap: int = CHILD_CHUNK_OVERLAP,
+) -> tuple[list[Any], dict[str, Any]]:
+    """Split loader pages into parents (<= ``parent_size``) and small indexed children.
+
+    Returns ``(children, parents_by_id)``; every child carries ``parent_id`` in
+    its metadata.
+    """
+    from langchain_core.documents import Document
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    parent_splitter = RecursiveCharacterTextSplitter(chunk_size=parent_size, chunk_overlap=0)
+    child_splitter = RecursiveCharacterTextSplitter(chunk_size=child_size, chunk_overlap=child_overlap)
+
+    children: list[Any] = []
+    parents: dict[str, Any] = {}
+    for parent in parent_splitter.split_documents(docs):
+        text = str(getattr(parent, "page_content", "") or "").strip()
+        if not text:
+            continue
+        metadata = dict(getattr(parent, "metadata", {}) or {})
+        pid = parent_id_for(text, metadata)
+        parents[pid] = Document(page_content=text, metadata=metadata)
+        for child_text in child_splitter.split_text(text):
+            children.append(Document(page_content=child_text, metadata=dict(metadata, **{PARENT_ID_KEY: pid})))
+    return children, parents
+
+
+class ParentStore:
+    """SQLite table of parent sections keyed by ``parent_id`` (append-only, idempotent)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS parents (parent_id TEXT PRIMARY KEY, page_content TEXT NOT NULL, "
+                "metadata TEXT NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def put_many(self, parents: dict[str, Any]) -> int:
+        rows = [
+            (pid, str(doc.page_content), json.dumps(doc.metadata or {}, ensure_ascii=False, default=str))
+            for pid, doc in parents.items()
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            conn = self._conn()
+            conn.executemany("INSERT OR IGNORE INTO parents VALUES (?, ?, ?)", rows)
+            conn.commit()
+        return len(rows)
+
+    def get_many(self, parent_ids: list[str]) -> dict[str, str]:
+        if not parent_ids or not os.path.isfile(self.path):
+            return {}
+        placeholders = ",".join("?" for _ in parent_ids)
+        rows = self._conn().execute(
+            f"SELECT parent_id, page_content FROM parents WHERE parent_id IN ({placeholders})", list(parent_ids)
+        ).fetchall()
+        return {str(pid): str(text) for pid, text in rows}
+
+
+def _window(parent_text: str, child_text: str, max_chars: int) -> str:
+    """Cut ``parent_text`` to ``max_chars`` around where ``child_text`` occurs."""
+    if len(parent_text) <= max_chars:
+        return parent_text
+    at = parent_text.find(child_text[:80]) if child_text else -1
+    if at < 0:
+        return parent_text[:max_chars].rstrip()
+    start = max(0, min(at - (max_chars - len(child_text)) // 2, len(parent_text) - max_chars))
+    # Prefer starting on a sentence/line boundary inside the window.
+    boundary = max(parent_text.rfind(". ", start, at), parent_text.rfind("\n", start, at))
+    if boundary >= 0 and boundary + 2 <= at:
+        start = boundary + 2 if parent_text[boundary] == "." else boundary + 1
+    return parent_text[start:start + max_chars].strip()
+
+
+def expand_to_parents(
+    docs: list[Any],
+    parent_store: Optional[ParentStore],
+    max_parents: int = 3,
+    max_chars: int = 1500,
+) -> list[str]:
+    """Map ranked child hits to de-duplicated parent texts (best-ranked parents first).
+
+    Hits without a ``parent_id`` (flat-mode chunks) or whose parent is missing
+    are passed through as their own text. Each returned piece is capped at
+    ``max_chars`` around the matching child.
+    """
+    ordered: list[tuple[Optional[str], str]] = []
+    seen: set[str] = set()
+    for doc in docs:
+        text = str(getattr(doc, "page_content", "") or "").strip()
+        if not text:
+            continue
+        pid = (getattr(doc, "metadata", {}) or {}).get(PARENT_ID_KEY)
+        key = pid or f"text:{text}"
+        if key in seen:
+            continue
+        seen.add(key)
+        ordered.append((pid, text))
+        if len(ordered) >= max_parents:
+            break
+
+    parent_texts = parent_store.get_many([pid for pid, _ in ordered if pid]) if parent_store else {}
+    return [_window(parent_texts.get(pid, text) if pid else text, text, max_chars) for pid, text in ordered]
@@ -4,7 +4,9 @@ License: MIT
 Author: Saurav Kumar
 """
 
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, AbstractSet, Iterable, Tuple
+
+from keyword_matcher import KeywordMatcher
 
 CRITICAL_OUTPUT_RULE = (
     "ABSOLUTE RULE #1 — OUTPUT FORMAT: NEVER wrap your response in JSON. "
@@ -52,12 +54,92 @@ def get_developer_crush_prompt(is_creator: bool = False):
 def get_ai_love_prompt(is_creator: bool = False):
     return get_jiya_identity_prompt(is_creator)
 
-def detect_jiya_question_type(message: str) -> str:
-    message_lower = message.lower()
-    if any(t in message_lower for t in ["who do you love", "do you love", "your feelings", "your crush"]): return 'ai_love'
-    if any(t in message_lower for t in ["developer's crush", "saurav's crush", "who does saurav love"]): return 'developer_crush'
-    if any(t in message_lower for t in ["who is jiya", "tell me about jiya", "jiya kaun hai"]): return 'jiya_identity'
-    return 'jiya_general'
+# ===== KEYWORD TABLES =====
+# Every detector below checks these, in order, against one shared scan of the message
+# (see scan_message); the first group with a hit wins.
+
+JIYA_QUESTION_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ('ai_love', ("who do you love", "do you love", "your feelings", "your crush")),
+    ('developer_crush', ("developer's crush", "saurav's crush", "who does saurav love")),
+    ('jiya_identity', ("who is jiya", "tell me about jiya", "jiya kaun hai")),
+)
+
+PERSONA_TRIGGER_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ('saurav', ("saurav", "supreme architect", "who created you", "your developer")),
+    ('jiya', ("jiya", "crush", "girlfriend", "bhabhi", "your love", "partner")),
+    ('april19', ("19 april", "19/04", "april 19")),
+)
+
+RESPONSE_STYLE_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("MOTIVATION", ("i can't", "stuck", "confused", "lost", "give up", "hard", "tired")),
+    ("CASUAL", ("what's up", "sup", "kya haal", "bored", "chill", "hello", "hi")),
+)
+
+INTENT_PERSONA_KEYWORDS = ('saurav', 'jiya', 'bhabhi', '19 april', 'april 19', '19/04', 'supreme', 'architect', 'creator', 'developer')
+INTENT_COMMAND_KEYWORDS = ('start exam', 'clear chat', 'new chat', 'export', 'download', 'reset', 'help', 'menu', 'settings')
+INTENT_ACADEMIC_KEYWORDS = ('explain', 'what', 'how', 'define', 'teach me', 'solve', 'question', 'example', 'difference', 'algorithm', 'code', 'unit', 'chapter')
+INTENT_SUBJECT_KEYWORDS = ('bcs-', 'mcs-', 'java', 'network', 'dbms', 'algorithm', 'database', 'os', 'operating', 'web', 'html', 'css', 'sql', 'python', 'c++', 'statistics', 'math')
+
+# Subject code mapping (IGNOU BCA); dict order is the match priority
+SUBJECT_CODE_NAMES = {
+    'bcs-011': 'Computer Basics',
+    'bcs-012': 'Basic Mathematics',
+    'mcs-012': 'Computer Organization',
+    'bcs-040': 'Statistical Techniques',
+    'mcs-024': 'Java Programming',
+    'bcs-041': 'Computer Networks',
+    'bcs-042': 'Algorithm Design',
+    'mcs-011': 'Problem Solving',
+    'mcs-015': 'Web Development',
+    'mcs-021': 'Data Structures',
+    'mcs-023': 'Database Systems',
+    'bcs-031': 'Object-Oriented Programming'
+}
+
+SUBJECT_NAME_KEYWORDS = {
+    'java': 'mcs-024',
+    'network': 'bcs-041',
+    'dbms': 'mcs-023',
+    'database': 'mcs-023',
+    'algorithm': 'bcs-042',
+    'data structure': 'mcs-021',
+    'web': 'mcs-015',
+    'html': 'mcs-015',
+    'css': 'mcs-015',
+    'oop': 'bcs-031',
+    'object-oriented': 'bcs-031',
+    'statistics': 'bcs-040',
+    'math': 'bcs-012'
+}
+
+PERSONA_KEYWORDS: Tuple[str, ...] = tuple(
+    kw
+    for table in (JIYA_QUESTION_KEYWORDS, PERSONA_TRIGGER_KEYWORDS, RESPONSE_STYLE_KEYWORDS)
+    for _, keywords in table
+    for kw in keywords
+) + INTENT_PERSONA_KEYWORDS + INTENT_COMMAND_KEYWORDS + INTENT_ACADEMIC_KEYWORDS + INTENT_SUBJECT_KEYWORDS \
+    + tuple(SUBJECT_CODE_NAMES) + tuple(SUBJECT_NAME_KEYWORDS)
+
+_PERSONA_MATCHER = KeywordMatcher(PERSONA_KEYWORDS)
+
+def scan_message(message: str) -> AbstractSet[str]:
+    """
+    Every persona keyword found in ``message`` (lowercased), in one pass.
+
+    Callers that also need other keywords (main.py adds the Frenzy phrases) build their
+    own KeywordMatcher over PERSONA_KEYWORDS plus theirs and pass its result as ``hits``.
+    """
+    return _PERSONA_MATCHER.find(message or "")
+
+def _first_group(hits: AbstractSet[str], table: Iterable[Tuple[str, Iterable[str]]]) -> Optional[str]:
+    for label, keywords in table:
+        if not hits.isdisjoint(keywords):
+            return label
+    return None
+
+def detect_jiya_question_type(message: str, hits: Optional[AbstractSet[str]] = None) -> str:
+    hits = scan_message(message) if hits is None else hits
+    return _first_group(hits, JIYA_QUESTION_KEYWORDS) or 'jiya_general'
 
 def get_jiya_prompt(is_creator: bool = False):
     return get_jiya_identity_prompt(is_creator)
@@ -78,19 +160,14 @@ def get_april_19_prompt(is_creator: bool = False):
         "Explain it beautifully but naturally. Do not use canned responses."
     )
 
-def detect_persona_trigger(message: str):
-    message_lower = message.lower()
-    if any(t in message_lower for t in ["saurav", "supreme architect", "who created you", "your developer"]): return 'saurav'
-    if any(t in message_lower for t in ["jiya", "crush", "girlfriend", "bhabhi", "your love", "partner"]): return 'jiya'
-    if any(t in message_lower for t in ["19 april", "19/04", "april 19"]): return 'april19'
-    return None
+def detect_persona_trigger(message: str, hits: Optional[AbstractSet[str]] = None):
+    hits = scan_message(message) if hits is None else hits
+    return _first_group(hits, PERSONA_TRIGGER_KEYWORDS)
 
-def detect_response_style(message: str, conversation_history: Optional[List[Dict]] = None, intent_type: Optional[str] = None) -> str:
+def detect_response_style(message: str, conversation_history: Optional[List[Dict]] = None, intent_type: Optional[str] = None, hits: Optional[AbstractSet[str]] = None) -> str:
     if intent_type == "ACADEMIC": return "ACADEMIC"
-    message_lower = (message or "").lower().strip()
-    if any(t in message_lower for t in ["i can't", "stuck", "confused", "lost", "give up", "hard", "tired"]): return "MOTIVATION"
-    if any(t in message_lower for t in ["what's up", "sup", "kya haal", "bored", "chill", "hello", "hi"]): return "CASUAL"
-    return "ACADEMIC"
+    hits = scan_message(message) if hits is None else hits
+    return _first_group(hits, RESPONSE_STYLE_KEYWORDS) or "ACADEMIC"
 
 def get_persona_style_instruction(style: str, recent_jiya_mentioned: bool, easter_egg_allowed: bool, is_creator: bool = False) -> str:
     creator_status = "USER IS CREATOR (Saurav): Act as Jiya. Be dynamic, empathetic, and highly context-aware." if is_creator else "USER IS GUEST: Be professional and redirect to studies."
@@ -314,57 +391,57 @@ def get_response_mode_instruction(mode: str) -> str:
     )
 # ===== ADVANCED REASONING FRAMEWORK =====
 
-def classify_intent(message: str, conversation_history: Optional[List[Dict]] = None) -> str:
+def classify_intent(message: str, conversation_history: Optional[List[Dict]] = None, hits: Optional[AbstractSet[str]] = None) -> str:
     """
     Classify user input into intent categories
     
     Args:
         message: User's input message
         conversation_history: List of previous messages for context
+        hits: scan_message() result for message, if the caller already has it
     
     Returns:
         String: ACADEMIC | COMMAND | PERSONAL | AMBIGUOUS
     """
     message_lower = message.lower().strip()
+    hits = scan_message(message) if hits is None else hits
     
     # PERSONAL/PERSONA triggers
-    persona_keywords = ['saurav', 'jiya', 'bhabhi', '19 april', 'april 19', '19/04', 'supreme', 'architect', 'creator', 'developer']
-    if any(kw in message_lower for kw in persona_keywords):
+    if not hits.isdisjoint(INTENT_PERSONA_KEYWORDS):
         return "PERSONAL"
     
     # COMMAND triggers
-    command_keywords = ['start exam', 'clear chat', 'new chat', 'export', 'download', 'reset', 'help', 'menu', 'settings']
-    if any(cmd in message_lower for cmd in command_keywords):
+    if not hits.isdisjoint(INTENT_COMMAND_KEYWORDS):
         return "COMMAND"
     
     # ACADEMIC indicators
-    academic_keywords = ['explain', 'what', 'how', 'define', 'teach me', 'solve', 'question', 'example', 'difference', 'algorithm', 'code', 'unit', 'chapter']
-    if any(kw in message_lower for kw in academic_keywords):
+    if not hits.isdisjoint(INTENT_ACADEMIC_KEYWORDS):
         return "ACADEMIC"
     
     # Check for subject/topic keywords (BCS, MCS, Java, Network, DBMS, etc.)
-    subject_keywords = ['bcs-', 'mcs-', 'java', 'network', 'dbms', 'algorithm', 'database', 'os', 'operating', 'web', 'html', 'css', 'sql', 'python', 'c++', 'statistics', 'math']
-    if any(subj in message_lower for subj in subject_keywords):
+    if not hits.isdisjoint(INTENT_SUBJECT_KEYWORDS):
         return "ACADEMIC"
     
     # Check conversation history for context
     if conversation_history and len(conversation_history) > 0:
         # If previous message was ACADEMIC and this is a follow-up, likely ACADEMIC
         recent_context = ' '.join([msg.get('text', '') for msg in conversation_history[-2:]])
-        if any(kw in recent_context.lower() for kw in academic_keywords + subject_keywords):
+        recent_hits = scan_message(recent_context)
+        if not recent_hits.isdisjoint(INTENT_ACADEMIC_KEYWORDS) or not recent_hits.isdisjoint(INTENT_SUBJECT_KEYWORDS):
             if len(message) < 50 and ('yes', 'no', 'more', 'explain', '1', '2', '3', '4') in message_lower.split():
                 return "ACADEMIC"
     
     # Default to AMBIGUOUS if unclear
     return "AMBIGUOUS"
 
-def extract_subject_context(message: str, selected_subject: Optional[str] = None) -> Dict:
+def extract_subject_context(message: str, selected_subject: Optional[str] = None, hits: Optional[AbstractSet[str]] = None) -> Dict:
     """
     Extract subject code and topic keywords from message
     
     Args:
         message: User's input message
         selected_subject: Currently selected subject (fallback)
+        hits: scan_message() result for message, if the caller already has it
     
     Returns:
         Dictionary with extracted context:
@@ -377,53 +454,23 @@ def extract_subject_context(message: str, selected_subject: Optional[str] = None
         }
     """
     message_lower = message.lower()
-    
-    # Subject code mapping (IGNOU BCA)
-    subject_mapping = {
-        'bcs-011': 'Computer Basics',
-        'bcs-012': 'Basic Mathematics',
-        'mcs-012': 'Computer Organization',
-        'bcs-040': 'Statistical Techniques',
-        'mcs-024': 'Java Programming',
-        'bcs-041': 'Computer Networks',
-        'bcs-042': 'Algorithm Design',
-        'mcs-011': 'Problem Solving',
-        'mcs-015': 'Web Development',
-        'mcs-021': 'Data Structures',
-        'mcs-023': 'Database Systems',
-        'bcs-031': 'Object-Oriented Programming'
-    }
+    hits = scan_message(message) if hits is None else hits
+    subject_mapping = SUBJECT_CODE_NAMES
     
     detected_subject = None
     confidence = 0.0
     
     # Look for explicit subject codes
-    for code in subject_mapping.keys():
-        if code in message_lower:
+    for code in subject_mapping:
+        if code in hits:
             detected_subject = code
             confidence = 0.95
             break
     
     # Look for subject name keywords
-    subject_name_keywords = {
-        'java': 'mcs-024',
-        'network': 'bcs-041',
-        'dbms': 'mcs-023',
-        'database': 'mcs-023',
-        'algorithm': 'bcs-042',
-        'data structure': 'mcs-021',
-        'web': 'mcs-015',
-        'html': 'mcs-015',
-        'css': 'mcs-015',
-        'oop': 'bcs-031',
-        'object-oriented': 'bcs-031',
-        'statistics': 'bcs-040',
-        'math': 'bcs-012'
-    }
-    
     if not detected_subject:
-        for keyword, code in subject_name_keywords.items():
-            if keyword in message_lower:
+        for keyword, code in SUBJECT_NAME_KEYWORDS.items():
+            if keyword in hits:
                 detected_subject = code
                 confidence = 0.80
                 break
@@ -442,10 +489,11 @@ def extract_subject_context(message: str, selected_subject: Optional[str] = None
     # Extract unit number
     unit = None
     if 'unit' in message_lower:
-        for i, word in enumerate(message_lower.split()):
-            if word == 'unit' and i + 1 < len(message_lower.split()):
+        words = message_lower.split()
+        for i, word in enumerate(words):
+            if word == 'unit' and i + 1 < len(words):
                 try:
-                    unit = int(message_lower.split()[i + 1].strip(':,;'))
+                    unit = int(words[i + 1].strip(':,;'))
                 except:
                     pass
     
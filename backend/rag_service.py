@@ -1,59 +1,119 @@
 import os
+from typing import Optional
+
 from groq import Groq
 from langchain_community.document_loaders import PyPDFLoader
 # 👇 YE LINE CHANGE HUYI HAI (New Import)
 from langchain_text_splitters import RecursiveCharacterTextSplitter 
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
+
+from embeddings import build_base_embeddings
+from parent_chunks import ParentStore, expand_to_parents, split_parent_child
+from retrieval import compress_chunks
+from user_indexes import NamespacedIndexManager
+from vector_index import ShardedFAISSStore
 
 class RAGService:
-    def __init__(self, groq_api_key, embeddings=None):
+    def __init__(
+        self,
+        groq_api_key,
+        embeddings=None,
+        compact_threshold: int = 8,
+        user_index_dir: str = "user_indexes",
+        user_index_max_resident_bytes: int = 256 * 1024 * 1024,
+        user_index_max_resident: int = 64,
+        chunking: str = "flat",
+        parent_max_chars: int = 1500,
+    ):
         self.client = Groq(api_key=groq_api_key)
         self.documents = []
         # Reuse a shared embeddings instance if provided to avoid loading the model twice
         if embeddings is not None:
             self.embeddings = embeddings
         else:
-            self.embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        self.vector_store = None
+            self.embeddings = build_base_embeddings()
         self.db_path = "faiss_index"
-        self._load_existing_index()
-
-    def _load_existing_index(self):
-        if os.path.exists(self.db_path):
-            try:
-                # 'allow_dangerous_deserialization=True' is needed for local files now
-                self.vector_store = FAISS.load_local(self.db_path, self.embeddings, allow_dangerous_deserialization=True)
-                print("RAG: Loaded existing FAISS index.")
-            except Exception as e:
-                print(f"RAG: Could not load index: {e}")
-
-    def upload_pdf(self, file_path):
-        """Index a PDF file into the FAISS vector store. Returns chunk count."""
+        # Base index in faiss_index/, each upload appends a delta shard in faiss_index_deltas/
+        self.vector_store = ShardedFAISSStore(self.db_path, self.embeddings, compact_threshold=compact_threshold)
+        if not self.vector_store.is_empty:
+            print("RAG: Loaded existing FAISS index.")
+        # Personal notes live in per-user namespaces that are loaded on demand.
+        self.user_indexes = NamespacedIndexManager(
+            user_index_dir,
+            self.embeddings,
+            max_resident_bytes=user_index_max_resident_bytes,
+            max_resident=user_index_max_resident,
+            compact_threshold=compact_threshold,
+        )
+        # "parent_child": index small chunks, answer with their (capped) parent sections.
+        self.chunking = "parent_child" if str(chunking or "").strip().lower() == "parent_child" else "flat"
+        self.parent_max_chars = max(200, int(parent_max_chars))
+        self._parent_stores: dict[str, ParentStore] = {}
+
+    def _parent_store(self, user_id: Optional[int] = None) -> ParentStore:
+        path = self.user_indexes.parent_store_path(user_id) if user_id is not None else f"{self.db_path}_parents.sqlite"
+        store = self._parent_stores.get(path)
+        if store is None:
+            store = self._parent_stores.setdefault(path, ParentStore(path))
+        return store
+
+    def upload_pdf(self, file_path, user_id: Optional[int] = None, subject: Optional[str] = None):
+        """Index a PDF file into the FAISS vector store. Returns chunk count.
+
+        With ``user_id`` the chunks go to that user's namespace instead of the shared index.
+        """
         try:
             loader = PyPDFLoader(file_path)
             docs = loader.load()
-            splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-            chunks = splitter.split_documents(docs)
+            if self.chunking == "parent_child":
+                chunks, parents = split_parent_child(docs)
+                # Parents first, so a child is never searchable before its parent exists.
+                if chunks:
+                    self._parent_store(user_id).put_many(parents)
+            else:
+                splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+                chunks = splitter.split_documents(docs)
             if not chunks:
                 return 0
-            if self.vector_store is None:
-                self.vector_store = FAISS.from_documents(chunks, self.embeddings)
+            # Only the new chunks are serialized; compaction folds deltas into the base later.
+            if user_id is not None:
+                self.user_indexes.add_documents(user_id, chunks, subject=subject)
             else:
                 self.vector_store.add_documents(chunks)
-            self.vector_store.save_local(self.db_path)
             self.documents.append(file_path)
             return len(chunks)
         except Exception as e:
             raise Exception(f"Error processing PDF: {str(e)}")
 
-    def query(self, user_query: str, k: int = 3) -> str:
-        """Retrieve relevant chunks from user-uploaded documents."""
-        if self.vector_store is None or not str(user_query or "").strip():
+    def query(
+        self,
+        user_query: str,
+        k: int = 3,
+        user_id: Optional[int] = None,
+        subject: Optional[str] = None,
+        token_budget: Optional[int] = None,
+    ) -> str:
+        """Retrieve relevant chunks from user-uploaded documents.
+
+        With ``token_budget`` the chunks are compressed to their query-relevant sentences.
+        """
+        if not str(user_query or "").strip():
             return ""
         try:
-            docs = self.vector_store.similarity_search(user_query, k=k)
-            chunks = [str(getattr(d, "page_content", "")).strip() for d in docs if str(getattr(d, "page_content", "")).strip()]
+            # Several children usually point at the same parent, so over-fetch before de-duplicating.
+            fetch_k = k * 4 if self.chunking == "parent_child" else k
+            if user_id is not None:
+                hits = self.user_indexes.similarity_search_with_score(user_id, user_query, k=fetch_k, subject=subject)
+                docs = [doc for doc, _ in hits]
+            elif self.vector_store.is_empty:
+                return ""
+            else:
+                docs = self.vector_store.similarity_search(user_query, k=fetch_k)
+            if self.chunking == "parent_child":
+                chunks = expand_to_parents(docs, self._parent_store(user_id), max_parents=k, max_chars=self.parent_max_chars)
+            else:
+                chunks = [str(getattr(d, "page_content", "")).strip() for d in docs if str(getattr(d, "page_content", "")).strip()]
+            if token_budget:
+                return compress_chunks(user_query, chunks[:k], self.embeddings, token_budget=token_budget)
             return "\n\n---\n\n".join(chunks[:k]).strip()
         except Exception:
             return ""
@@ -0,0 +1,103 @@
+"""
+Inputs for the APC performance report, aggregated in SQL.
+
+Every figure is a ``COUNT`` / ``SUM`` ... ``GROUP BY`` over indexed columns or
+a read of the rollup counters (``rollups.py``); no message text is loaded, so
+the cost stays flat however long the student's history is.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import func, select
+
+from database import APCLog, ChatHistory, ChatSession, UserStats
+
+ACTIVITY_DAYS = 14
+TOP_N = 8
+
+
+def collect_report_inputs(
+    db: Any, user_id: int, days: int = ACTIVITY_DAYS, now: Optional[datetime] = None
+) -> dict[str, Any]:
+    """Counts by sender, subject, APC tool and day for ``user_id`` (sync ``Session``)."""
+    now = now or datetime.utcnow()
+    since = (now - timedelta(days=max(1, int(days)) - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    user_sessions = select(ChatSession.id).where(ChatSession.user_id == user_id).scalar_subquery()
+
+    stats = db.get(UserStats, user_id)
+    by_sender = dict(
+        db.execute(
+            select(ChatHistory.sender, func.count())
+            .where(ChatHistory.session_id.in_(user_sessions))
+            .group_by(ChatHistory.sender)
+        ).all()
+    )
+    by_subject = db.execute(
+        select(func.coalesce(ChatSession.subject, "unknown"), func.count(), func.sum(ChatSession.message_count))
+        .where(ChatSession.user_id == user_id)
+        .group_by(func.coalesce(ChatSession.subject, "unknown"))
+        .order_by(func.sum(ChatSession.message_count).desc())
+        .limit(TOP_N)
+    ).all()
+    tools = db.execute(
+        select(APCLog.tool_name, func.count(), func.max(APCLog.created_at))
+        .where(APCLog.user_id == user_id)
+        .group_by(APCLog.tool_name)
+        .order_by(func.count().desc())
+        .limit(TOP_N)
+    ).all()
+    day = func.date(ChatHistory.created_at)
+    activity = db.execute(
+        select(day, func.count())
+        .where(ChatHistory.session_id.in_(user_sessions), ChatHistory.created_at >= since)
+        .group_by(day)
+        .order_by(day)
+    ).all()
+
+    quiz_count = int(stats.quiz_count) if stats else 0
+    return {
+        "total_sessions": int(stats.session_count) if stats else 0,
+        "total_messages": int(stats.message_count) if stats else sum(by_sender.values()),
+        "user_messages": int(by_sender.get("user", 0)),
+        "ai_messages": int(by_sender.get("ai", 0)),
+        "last_subject": stats.last_subject if stats else None,
+        "quiz_attempts": quiz_count,
+        "avg_quiz_score": round(float(stats.quiz_score_total) / quiz_count, 1) if quiz_count else None,
+        "messages_by_subject": [
+            {"subject": subject, "sessions": int(sessions), "messages": int(messages or 0)}
+            for subject, sessions, messages in by_subject
+        ],
+        "tool_usage": [
+            {"tool": tool or "unknown", "uses": int(uses), "last_used": str(last)[:10] if last else None}
+            for tool, uses, last in tools
+        ],
+        "activity_by_day": {str(d): int(n) for d, n in activity if d is not None},
+        "active_days": sum(1 for d, n in activity if d is not None and n),
+        "activity_window_days": int(days),
+    }
+
+
+def format_report_data(inputs: dict[str, Any]) -> str:
+    """Compact, prompt-friendly rendering of ``collect_report_inputs``."""
+    lines = [
+        f"total_sessions={inputs['total_sessions']}, total_messages={inputs['total_messages']}, "
+        f"user_messages={inputs['user_messages']}, ai_messages={inputs['ai_messages']}",
+        f"last_subject={inputs['last_subject'] or 'N/A'}, quiz_attempts={inputs['quiz_attempts']}, "
+        f"avg_quiz_score={inputs['avg_quiz_score'] if inputs['avg_quiz_score'] is not None else 'N/A'}",
+    ]
+    if inputs["messages_by_subject"]:
+        lines.append("messages_by_subject: " + ", ".join(
+            f"{row['subject']}={row['messages']} ({row['sessions']} sessions)" for row in inputs["messages_by_subject"]
+        ))
+    if inputs["tool_usage"]:
+        lines.append("tool_usage: " + ", ".join(
+            f"{row['tool']}={row['uses']} (last {row['last_used'] or 'N/A'})" for row in inputs["tool_usage"]
+        ))
+    window = inputs["activity_window_days"]
+    lines.append(f"active_days_last_{window}={inputs['active_days']}")
+    if inputs["activity_by_day"]:
+        lines.append(f"messages_per_day_last_{window}: " + ", ".join(
+            f"{d}={n}" for d, n in inputs["activity_by_day"].items()
+        ))
+    return "\n".join(lines)
@@ -0,0 +1,398 @@
+"""
+Retention for chat sessions and messages.
+
+Policies (per user, with a default for everyone else) bound how much chat
+history is kept:
+
+* ``max_sessions``: keep only the newest N sessions;
+* ``max_age_days``: drop sessions with no message newer than N days;
+* ``max_bytes``: keep the newest sessions whose messages fit in N bytes
+  (the newest session is always kept).
+
+Doomed sessions are selected with set-based queries (window functions, no
+per-session Python loops) and removed in bounded batches: each batch is one
+short transaction ``DELETE FROM chat_history WHERE id IN (SELECT ... LIMIT n)``,
+so a large purge never holds the SQLite write lock for long. SQLite files with
+``auto_vacuum=INCREMENTAL`` then give freed pages back with
+``PRAGMA incremental_vacuum``.
+
+The job runs on a background thread (``RetentionJob``) or from the CLI, never
+on the request path:
+
+    python retention.py --dry-run
+    python retention.py --max-sessions 50 --max-age-days 365
+    python retention.py --enable-incremental-vacuum   # one-time VACUUM, run with the API stopped
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy import LargeBinary, cast, delete, func, or_, select, union
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import ChatHistory, ChatSession  # noqa: E402
+from rollups import release_sessions  # noqa: E402
+from vector_index import try_flock  # noqa: E402
+
+BATCH_SIZE = 500
+VACUUM_PAGES = 2000
+
+
+class RetentionPolicy(NamedTuple):
+    """Limits for one user; ``None`` (or 0 from config) means unlimited."""
+
+    max_sessions: Optional[int] = None
+    max_age_days: Optional[int] = None
+    max_bytes: Optional[int] = None
+
+    @classmethod
+    def from_values(cls, max_sessions: Any = None, max_age_days: Any = None, max_bytes: Any = None) -> "RetentionPolicy":
+        def limit(value: Any) -> Optional[int]:
+            return int(value) if value not in (None, "") and int(value) > 0 else None
+
+        return cls(limit(max_sessions), limit(max_age_days), limit(max_bytes))
+
+    @property
+    def is_unlimited(self) -> bool:
+        return self.max_sessions is None and self.max_age_days is None and self.max_bytes is None
+
+
+def parse_user_policies(raw: str) -> dict[int, RetentionPolicy]:
+    """``{"42": {"max_sessions": 500}, "7": {}}`` -> per-user policies (``{}`` = keep everything)."""
+    if not str(raw or "").strip():
+        return {}
+    data = json.loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError("RETENTION_USER_POLICIES must be a JSON object keyed by user id")
+    return {int(user_id): RetentionPolicy.from_values(**(limits or {})) for user_id, limits in data.items()}
+
+
+def _text_bytes(column: Any, dialect: str) -> Any:
+    if dialect == "postgresql":
+        return func.octet_length(column)
+    return func.length(cast(column, LargeBinary))  # SQLite length() of TEXT counts characters
+
+
+def purge_sessions(
+    engine: Any, session_ids: list[int], batch_size: int = BATCH_SIZE, report: Optional[dict[str, Any]] = None
+) -> dict[str, Any]:
+    """Delete ``session_ids`` and their messages, at most ``batch_size`` messages per transaction.
+
+    ``ON DELETE CASCADE`` would remove the messages with the sessions, but as
+    one transaction holding the write lock for the whole purge; deleting them
+    first in batches leaves the final session delete with nothing to cascade.
+    """
+    if report is None:
+        report = {"sessions_deleted": 0, "messages_deleted": 0, "bytes_deleted": 0, "batches": 0}
+    if not session_ids:
+        return report
+    dialect = engine.dialect.name
+    while True:
+        with engine.begin() as conn:
+            batch = (
+                select(ChatHistory.id)
+                .where(ChatHistory.session_id.in_(session_ids))
+                .order_by(ChatHistory.id)
+                .limit(max(1, int(batch_size)))
+                .scalar_subquery()
+            )
+            count, size = conn.execute(
+                select(func.count(), func.coalesce(func.sum(_text_bytes(ChatHistory.text, dialect)), 0))
+                .where(ChatHistory.id.in_(batch))
+            ).one()
+            if not count:
+                break
+            conn.execute(delete(ChatHistory).where(ChatHistory.id.in_(batch)))
+        report["messages_deleted"] += int(count)
+        report["bytes_deleted"] += int(size or 0)
+        report["batches"] += 1
+    with engine.begin() as conn:
+        release_sessions(conn, session_ids)  # owners' dashboard counters; detached sessions were released already
+        result = conn.execute(delete(ChatSession).where(ChatSession.id.in_(session_ids)))
+    report["sessions_deleted"] += int(result.rowcount or 0)
+    report["batches"] += 1
+    return report
+
+
+class RetentionEngine:
+    """Applies retention policies to a SQLAlchemy engine in bounded batches."""
+
+    def __init__(
+        self,
+        engine: Any,
+        default_policy: RetentionPolicy,
+        user_policies: Optional[dict[int, RetentionPolicy]] = None,
+        batch_size: int = BATCH_SIZE,
+        vacuum_pages: int = VACUUM_PAGES,
+    ):
+        self.engine = engine
+        self.default_policy = default_policy
+        self.user_policies = dict(user_policies or {})
+        self.batch_size = max(1, int(batch_size))
+        self.vacuum_pages = max(0, int(vacuum_pages))
+
+    @property
+    def is_noop(self) -> bool:
+        return self.default_policy.is_unlimited and all(p.is_unlimited for p in self.user_policies.values())
+
+    def _policy_groups(self) -> list[tuple[Any, RetentionPolicy]]:
+        groups = []
+        if not self.default_policy.is_unlimited:
+            clause = ChatSession.user_id.notin_(list(self.user_policies)) if self.user_policies else None
+            groups.append((clause, self.default_policy))
+        for user_id, policy in self.user_policies.items():
+            if not policy.is_unlimited:
+                groups.append((ChatSession.user_id == user_id, policy))
+        return groups
+
+    def expired_sessions_query(self, now: Optional[datetime] = None) -> Any:
+        """SELECT of the ids of every session some policy says to drop.
+
+        Sessions detached from their user (``user_id IS NULL``; ``DELETE /sessions``
+        detaches them before purging in the background) are always included,
+        so an interrupted clear-all is finished by the next run.
+        """
+        now = now or datetime.utcnow()
+        dialect = self.engine.dialect.name
+        selects = [select(ChatSession.id).where(ChatSession.user_id.is_(None))]
+        for clause, policy in self._policy_groups():
+            where = [clause] if clause is not None else []
+            if policy.max_sessions is not None:
+                rank = func.row_number().over(partition_by=ChatSession.user_id, order_by=ChatSession.id.desc())
+                ranked = select(ChatSession.id, rank.label("rn")).where(*where).subquery()
+                selects.append(select(ranked.c.id).where(ranked.c.rn > policy.max_sessions))
+            if policy.max_age_days is not None:
+                cutoff = now - timedelta(days=policy.max_age_days)
+                recent = select(ChatHistory.id).where(
+                    ChatHistory.session_id == ChatSession.id, ChatHistory.created_at >= cutoff
+                ).exists()
+                selects.append(select(ChatSession.id).where(
+                    *where, or_(ChatSession.created_at < cutoff, ChatSession.created_at.is_(None)), ~recent
+                ))
+            if policy.max_bytes is not None:
+                sizes = (
+                    select(
+                        ChatSession.id,
+                        ChatSession.user_id,
+                        func.coalesce(func.sum(_text_bytes(ChatHistory.text, dialect)), 0).label("size"),
+                    )
+                    .select_from(ChatSession)
+                    .outerjoin(ChatHistory, ChatHistory.session_id == ChatSession.id)
+                    .where(*where)
+                    .group_by(ChatSession.id, ChatSession.user_id)
+                    .subquery()
+                )
+                window = {"partition_by": sizes.c.user_id, "order_by": sizes.c.id.desc()}
+                running = select(
+                    sizes.c.id,
+                    func.sum(sizes.c.size).over(**window).label("running"),
+                    func.row_number().over(**window).label("rn"),
+                ).subquery()
+                selects.append(select(running.c.id).where(running.c.running > policy.max_bytes, running.c.rn > 1))
+        return selects[0] if len(selects) == 1 else union(*selects)
+
+    def run_once(self, dry_run: bool = False, now: Optional[datetime] = None) -> dict[str, Any]:
+        """Apply the policies once; returns counts of rows and bytes removed/reclaimed."""
+        started = time.perf_counter()
+        report: dict[str, Any] = {
+            "dry_run": dry_run,
+            "sessions_deleted": 0,
+            "messages_deleted": 0,
+            "bytes_deleted": 0,
+            "batches": 0,
+            "vacuum": None,
+        }
+        expired = self.expired_sessions_query(now).subquery()
+        if dry_run:
+            with self.engine.connect() as conn:
+                ids = select(expired.c.id)
+                report["sessions_deleted"] = int(conn.execute(select(func.count()).select_from(expired)).scalar() or 0)
+                report["messages_deleted"], report["bytes_deleted"] = (int(v or 0) for v in conn.execute(
+                    select(func.count(), func.coalesce(func.sum(_text_bytes(ChatHistory.text, self.engine.dialect.name)), 0))
+                    .where(ChatHistory.session_id.in_(ids))
+                ).one())
+        else:
+            while True:
+                # Re-selected each pass so only a bounded chunk of ids is ever held in memory.
+                with self.engine.connect() as conn:
+                    session_ids = [int(r[0]) for r in conn.execute(
+                        select(expired.c.id).order_by(expired.c.id).limit(self.batch_size)
+                    )]
+                if not session_ids:
+                    break
+                purge_sessions(self.engine, session_ids, self.batch_size, report)
+            report["vacuum"] = self.incremental_vacuum()
+        report["duration_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+        return report
+
+    def incremental_vacuum(self) -> Optional[dict[str, Any]]:
+        """Return free pages to the OS on SQLite files created with ``auto_vacuum=INCREMENTAL``."""
+        if self.engine.dialect.name != "sqlite" or self.vacuum_pages <= 0:
+            return None
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            mode = cursor.execute("PRAGMA auto_vacuum").fetchone()[0]
+            page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+            free_before = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+            if mode != 2:
+                return {"enabled": False, "free_pages": free_before, "bytes_reclaimed": 0}
+            cursor.execute(f"PRAGMA incremental_vacuum({self.vacuum_pages})").fetchall()
+            raw.commit()
+            free_after = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+            cursor.close()
+        finally:
+            raw.close()
+        return {
+            "enabled": True,
+            "pages_reclaimed": free_before - free_after,
+            "bytes_reclaimed": (free_before - free_after) * page_size,
+            "free_pages": free_after,
+        }
+
+
+def enable_incremental_vacuum(engine: Any) -> None:
+    """Switch an existing SQLite file to ``auto_vacuum=INCREMENTAL`` (rewrites the file; run offline)."""
+    raw = engine.raw_connection()
+    try:
+        raw.isolation_level = None  # VACUUM cannot run inside a transaction
+        raw.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        raw.execute("VACUUM")
+    finally:
+        raw.close()
+
+
+class RetentionJob:
+    """Runs ``RetentionEngine.run_once`` every ``interval_s`` on a daemon thread.
+
+    With several API workers on one host only the worker holding ``lock_path``
+    (an advisory ``flock``) runs the purge; the others skip that round. The job
+    runs even with no limits configured: it then only removes sessions
+    detached by ``DELETE /sessions`` whose background purge did not finish.
+    """
+
+    def __init__(self, retention: RetentionEngine, interval_s: float, lock_path: Optional[str] = None):
+        self.retention = retention
+        self.interval_s = float(interval_s)
+        self.lock_path = lock_path
+        self._thread: Optional[threading.Thread] = None
+        self._status: dict[str, Any] = {"runs": 0, "last_run_at": None, "last_report": None, "last_error": None}
+
+    def run_now(self) -> Optional[dict[str, Any]]:
+        lock = try_flock(self.lock_path) if self.lock_path else True
+        if lock is None:
+            return None
+        try:
+            report = self.retention.run_once()
+            self._status.update({
+                "runs": self._status["runs"] + 1,
+                "last_run_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "last_report": report,
+                "last_error": None,
+            })
+            if report["sessions_deleted"]:
+                print(f"Retention: removed {report['sessions_deleted']} sessions, {report['messages_deleted']} messages "
+                      f"({report['bytes_deleted']} bytes) in {report['duration_ms']} ms")
+            return report
+        except Exception as e:
+            self._status["last_error"] = str(e)
+            print(f"Retention job error: {e}")
+            return None
+        finally:
+            if lock is not True:
+                lock.close()
+
+    def _loop(self) -> None:
+        while True:
+            time.sleep(self.interval_s)
+            self.run_now()
+
+    def start(self) -> bool:
+        if self.interval_s <= 0 or self._thread is not None:
+            return False
+        self._thread = threading.Thread(target=self._loop, name="chat-retention", daemon=True)
+        self._thread.start()
+        return True
+
+    def status(self) -> dict[str, Any]:
+        return dict(
+            self._status,
+            running=self._thread is not None,
+            detached_only=self.retention.is_noop,
+            interval_s=self.interval_s,
+            default_policy=self.retention.default_policy._asdict(),
+            user_policies={str(k): v._asdict() for k, v in self.retention.user_policies.items()},
+        )
+
+
+def build_retention_job(engine: Any, settings: Any) -> RetentionJob:
+    """The app's retention job; a malformed RETENTION_USER_POLICIES is logged and ignored, not fatal."""
+    try:
+        user_policies = parse_user_policies(settings.retention_user_policies)
+    except (ValueError, TypeError) as e:
+        print(f"Retention: ignoring RETENTION_USER_POLICIES ({e}); every user gets the default policy")
+        user_policies = {}
+    retention = RetentionEngine(
+        engine,
+        RetentionPolicy.from_values(
+            settings.retention_max_sessions, settings.retention_max_age_days, settings.retention_max_bytes
+        ),
+        user_policies,
+        batch_size=settings.retention_batch_size,
+        vacuum_pages=settings.retention_vacuum_pages,
+    )
+    lock_path = None
+    if engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+        lock_path = os.path.abspath(engine.url.database) + ".retention.lock"
+    return RetentionJob(retention, settings.retention_interval_min * 60.0, lock_path=lock_path)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from config import get_settings
+    from database import engine
+
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Apply chat retention policies once.")
+    parser.add_argument("--max-sessions", type=int, default=settings.retention_max_sessions)
+    parser.add_argument("--max-age-days", type=int, default=settings.retention_max_age_days)
+    parser.add_argument("--max-bytes", type=int, default=settings.retention_max_bytes, help="Per user")
+    parser.add_argument("--batch-size", type=int, default=settings.retention_batch_size)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="Switch the SQLite file to auto_vacuum=INCREMENTAL (one-time VACUUM) and exit")
+    args = parser.parse_args(argv)
+
+    if args.enable_incremental_vacuum:
+        if engine.dialect.name != "sqlite":
+            print("[retention] incremental vacuum only applies to SQLite")
+            return 1
+        enable_incremental_vacuum(engine)
+        print("[retention] auto_vacuum=INCREMENTAL enabled")
+        return 0
+    try:
+        user_policies = parse_user_policies(settings.retention_user_policies)
+    except (ValueError, TypeError) as e:
+        print(f"[retention] RETENTION_USER_POLICIES: {e}")
+        return 1
+    retention = RetentionEngine(
+        engine,
+        RetentionPolicy.from_values(args.max_sessions, args.max_age_days, args.max_bytes),
+        user_policies,
+        batch_size=args.batch_size,
+        vacuum_pages=settings.retention_vacuum_pages,
+    )
+    if retention.is_noop:
+        print("[retention] no limits configured (RETENTION_MAX_* / --max-*); removing detached sessions only")
+    print(json.dumps(retention.run_once(dry_run=args.dry_run), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+Retrieval helpers for assembling REFERENCE_CONTEXT in /chat.
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+CHUNK_SEPARATOR = "\n\n---\n\n"
+
+# Shared pool: retrieval is I/O + numpy bound and releases the GIL for most of its work.
+_RETRIEVAL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
+
+
+def retrieve_parallel(
+    sources: dict[str, Callable[[], str]],
+    timeout_s: float = 1.5,
+    primary: Optional[str] = None,
+    primary_grace_s: float = 3.0,
+) -> dict[str, str]:
+    """Run every source concurrently and return the texts that finished in time.
+
+    Total latency is bounded by the slowest source that makes the deadline; a
+    source that times out or raises is skipped (its worker finishes in the
+    background and the result is discarded). A ``primary`` source, when given
+    and present, gets ``primary_grace_s`` more after the deadline (with a
+    warning) so the answer keeps its study material; past that it is skipped
+    like the others.
+    """
+    if not sources:
+        return {}
+    futures = {name: _RETRIEVAL_POOL.submit(fn) for name, fn in sources.items()}
+    wait(list(futures.values()), timeout=max(0.0, timeout_s))
+
+    results: dict[str, str] = {}
+    for name, future in futures.items():
+        if not future.done():
+            if name != primary:
+                print(f"Retrieval: skipped '{name}' (timed out after {timeout_s:.2f}s)")
+                continue
+            print(f"Retrieval: WARNING '{name}' timed out after {timeout_s:.2f}s, waiting up to {primary_grace_s:.2f}s more")
+        try:
+            text = str(future.result(timeout=max(0.0, primary_grace_s)) or "").strip()
+        except FutureTimeoutError:
+            print(f"Retrieval: WARNING skipped '{name}' (no result {primary_grace_s:.2f}s after the deadline)")
+            continue
+        except Exception as e:
+            print(f"Retrieval: skipped '{name}' ({e})")
+            continue
+        if text:
+            results[name] = text
+    return results
+
+
+def _clip_to_chunks(text: str, limit: int) -> str:
+    """Trim ``text`` to ``limit`` chars, preferring to cut on a chunk boundary."""
+    if len(text) <= limit:
+        return text
+    clipped = text[:limit]
+    cut = clipped.rfind(CHUNK_SEPARATOR)
+    if cut > limit // 2:
+        return clipped[:cut].rstrip()
+    return clipped.rstrip()
+
+
+def merge_context_sections(
+    sections: list[tuple[str, str]],
+    budget_chars: int = 7000,
+    labels: Optional[dict[str, str]] = None,
+) -> str:
+    """Merge labelled sections under one shared character budget.
+
+    Each non-empty section gets an equal share; whatever a short section does
+    not use is handed to the remaining ones in order.
+    """
+    present = [(name, text.strip()) for name, text in sections if str(text or "").strip()]
+    if not present:
+        return ""
+    labels = labels or {}
+
+    parts: list[str] = []
+    remaining_budget = max(0, int(budget_chars))
+    for idx, (name, text) in enumerate(present):
+        label = labels.get(name, name.replace("_", " ").upper())
+        header = f"[{label}]\n"
+        share = remaining_budget // (len(present) - idx)
+        body_limit = max(0, share - len(header))
+        body = _clip_to_chunks(text, body_limit)
+        if not body:
+            continue
+        part = header + body
+        parts.append(part)
+        remaining_budget -= len(part) + 2  # joined with a blank line
+    return "\n\n".join(parts).strip()
+
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?।])\s+|\n+")
+MIN_OVERLAP_CHARS = 30
+MAX_OVERLAP_CHARS = 200
+# Sentences embedded per call: bounds the per-turn embedding work whatever the context size.
+MAX_SCORED_SENTENCES = 40
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars per token for English/Hinglish prose)."""
+    return max(1, len(str(text or "")) // 4)
+
+
+def _normalize_rows(vectors: Any) -> Any:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _strip_overlap(chunk: str, previous_text: str) -> str:
+    """Remove a leading span of ``chunk`` already present in earlier chunks (splitter overlap)."""
+    if not previous_text:
+        return chunk
+    for length in range(min(len(chunk), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+        if chunk[:length] in previous_text:
+            return chunk[length:].lstrip(" ,;:.-\n")
+    return chunk
+
+
+def compress_chunks(
+    query: str,
+    chunks: list[str],
+    embeddings: Any,
+    token_budget: int = 1200,
+    duplicate_threshold: float = 0.95,
+    max_sentences: int = MAX_SCORED_SENTENCES,
+) -> str:
+    """Shrink retrieved chunks to the query-relevant sentences within ``token_budget``.
+
+    1. Drop chunks whose embedding is a near-duplicate of a higher-ranked one.
+    2. Strip the splitter's overlapping span from the start of later chunks.
+    3. If what is left fits the budget, return it as is (no sentence embedding).
+       Otherwise score the first ``max_sentences`` sentences (taken from the
+       highest-ranked chunks first) against the query and keep the best ones,
+       in their original order, until the token budget is spent.
+
+    Falls back to plain joining (clipped to the budget) if embedding fails.
+    """
+    chunks = [str(c or "").strip() for c in chunks if str(c or "").strip()]
+    if not chunks:
+        return ""
+    budget_chars = max(1, int(token_budget)) * 4
+    if embeddings is None:
+        return _clip_to_chunks(CHUNK_SEPARATOR.join(chunks), budget_chars)
+
+    try:
+        chunk_vecs = _normalize_rows(embeddings.embed_documents(chunks))
+        kept: list[str] = []
+        kept_vecs: list[Any] = []
+        for text, vec in zip(chunks, chunk_vecs):
+            if kept_vecs and float(np.max(np.stack(kept_vecs) @ vec)) >= duplicate_threshold:
+                continue
+            text = _strip_overlap(text, "\n".join(kept))
+            if not text:
+                continue
+            kept.append(text)
+            kept_vecs.append(vec)
+
+        joined = CHUNK_SEPARATOR.join(kept)
+        if len(joined) <= budget_chars:
+            return joined
+
+        sentences: list[tuple[int, str]] = []
+        for chunk_idx, text in enumerate(kept):
+            for sentence in _SENTENCE_SPLIT_RE.split(text):
+                sentence = sentence.strip()
+                if sentence:
+                    sentences.append((chunk_idx, sentence))
+        sentences = sentences[:max(1, int(max_sentences))]
+        if not sentences:
+            return ""
+
+        query_vec = _normalize_rows(embeddings.embed_query(query))[0]
+        sentence_vecs = _normalize_rows(embeddings.embed_documents([s for _, s in sentences]))
+        scores = sentence_vecs @ query_vec
+    except Exception as e:
+        print(f"Retrieval: context compression skipped ({e})")
+        return _clip_to_chunks(CHUNK_SEPARATOR.join(chunks), budget_chars)
+
+    selected: set[int] = set()
+    used = 0
+    for idx in np.argsort(-scores):
+        cost = len(sentences[int(idx)][1]) + 1
+        if selected and used + cost > budget_chars:
+            continue
+        selected.add(int(idx))
+        used += cost
+
+    by_chunk: dict[int, list[str]] = {}
+    for idx, (chunk_idx, sentence) in enumerate(sentences):
+        if idx in selected:
+            by_chunk.setdefault(chunk_idx, []).append(sentence)
+    compressed = CHUNK_SEPARATOR.join(" ".join(by_chunk[i]) for i in sorted(by_chunk))
+    return compressed[:budget_chars].strip()
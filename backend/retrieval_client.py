@@ -0,0 +1,115 @@
+"""
+Thin client for the retrieval sidecar (see retrieval_sidecar.py).
+
+API workers use this instead of loading MiniLM and the FAISS index themselves.
+It only needs httpx and langchain_core, so a worker configured with
+RETRIEVAL_SIDECAR_URL never imports torch.
+"""
+
+from typing import Any, Optional
+
+import httpx
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+
+class SidecarUnavailableError(RuntimeError):
+    """The sidecar could not be reached, timed out or answered with an error."""
+
+    def __init__(self, url: str, error: Exception):
+        super().__init__(f"Retrieval sidecar at {url} unavailable: {error}")
+        self.url = url
+
+
+class RetrievalClient:
+    """Pooled HTTP client for the sidecar, over TCP or a Unix socket.
+
+    ``url`` is either ``http://host:port`` or ``unix:///path/to.sock``. Exposes
+    the same ``similarity_search*`` calls as the local stores, plus the
+    ``current``/``status``/``reload`` holder interface of ``HotSwapStore`` so
+    main.py can use either interchangeably. Errors surface as exceptions; the
+    callers already treat a failed retrieval as "no context". The admin calls
+    (``status``/``reload``) raise ``SidecarUnavailableError`` instead, naming
+    the sidecar's address.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        timeout_s: float = 1.0,
+        connect_timeout_s: float = 0.25,
+        pool_size: int = 16,
+        embed_timeout_s: float = 30.0,
+        http_client: Optional[httpx.Client] = None,
+    ):
+        self.url = url
+        # Document batches (PDF uploads) legitimately take longer than a search.
+        self.embed_timeout_s = embed_timeout_s
+        if http_client is not None:
+            self._http = http_client
+            return
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        timeout = httpx.Timeout(timeout_s, connect=connect_timeout_s)
+        if url.startswith("unix://"):
+            transport = httpx.HTTPTransport(uds=url[len("unix://"):], limits=limits, retries=1)
+            self._http = httpx.Client(base_url="http://retrieval-sidecar", transport=transport, timeout=timeout)
+        else:
+            transport = httpx.HTTPTransport(limits=limits, retries=1)
+            self._http = httpx.Client(base_url=url.rstrip("/"), transport=transport, timeout=timeout)
+
+    def _post(self, path: str, payload: dict[str, Any], **kwargs: Any) -> dict[str, Any]:
+        response = self._http.post(path, json=payload, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def search_batch(self, queries: list[str], k: int = 4) -> list[list[tuple[Document, float]]]:
+        data = self._post("/search", {"queries": list(queries), "k": int(k)})
+        return [
+            [(Document(page_content=hit["page_content"], metadata=hit.get("metadata") or {}), float(hit["score"])) for hit in hits]
+            for hits in data["results"]
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> list[tuple[Document, float]]:
+        return self.search_batch([query], k=k)[0]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return self._post("/embed", {"texts": list(texts)}, timeout=self.embed_timeout_s)["vectors"]
+
+    # HotSwapStore-compatible holder interface.
+    def current(self) -> "RetrievalClient":
+        return self
+
+    def status(self) -> dict[str, Any]:
+        try:
+            response = self._http.get("/health")
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise SidecarUnavailableError(self.url, e) from e
+        return dict(response.json(), sidecar=self.url)
+
+    def reload(self, force: bool = False) -> dict[str, Any]:
+        # Loading an index can take a while; don't cut it off at the search timeout.
+        try:
+            data = self._post("/reload", {}, params={"force": force}, timeout=None)
+        except httpx.HTTPError as e:
+            raise SidecarUnavailableError(self.url, e) from e
+        return dict(data, sidecar=self.url)
+
+    def close(self) -> None:
+        self._http.close()
+
+
+class RemoteEmbeddings(Embeddings):
+    """MiniLM embeddings computed by the sidecar (user-notes indexing, context compression)."""
+
+    def __init__(self, client: RetrievalClient):
+        self.client = client
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.client.embed(texts) if texts else []
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.client.embed([text])[0]
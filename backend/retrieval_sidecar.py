@@ -0,0 +1,132 @@
+"""
+Retrieval sidecar: one process that owns MiniLM and the study-material index.
+
+Without it every uvicorn worker imports torch, loads the model and maps the
+FAISS index on its own. With the sidecar running, start the API with
+RETRIEVAL_SIDECAR_URL and the workers only hold a pooled HTTP client
+(retrieval_client.py). Concurrent searches from all workers land in this one
+process, where the micro-batcher coalesces their query embeddings.
+
+Usage:
+    python retrieval_sidecar.py --uds /tmp/bcabuddy-retrieval.sock
+    RETRIEVAL_SIDECAR_URL=unix:///tmp/bcabuddy-retrieval.sock uvicorn main:app --workers 4
+
+    python retrieval_sidecar.py --host 127.0.0.1 --port 8765
+    RETRIEVAL_SIDECAR_URL=http://127.0.0.1:8765 uvicorn main:app --workers 4
+"""
+
+import argparse
+import os
+import sys
+from typing import Any, Optional
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_BATCH_QUERIES = 64
+MAX_K = 100
+
+
+class SearchRequest(BaseModel):
+    queries: list[str] = Field(..., min_length=1, max_length=MAX_BATCH_QUERIES)
+    k: int = Field(default=4, ge=1, le=MAX_K)
+
+
+class EmbedRequest(BaseModel):
+    texts: list[str] = Field(default_factory=list)
+
+
+def create_app(store_holder: Any, embeddings: Any) -> FastAPI:
+    """Build the sidecar API around a ``HotSwapStore`` and the shared embedding model."""
+    from embeddings import batcher_metrics
+
+    app = FastAPI(title="BCABuddy retrieval sidecar")
+
+    # Sync endpoints run in the threadpool, so concurrent requests reach
+    # embed_query at the same time and get batched together.
+    @app.post("/search")
+    def search(req: SearchRequest):
+        store = store_holder.current()
+        if store is None:
+            raise HTTPException(status_code=503, detail="Study-material index not loaded")
+        if len(req.queries) == 1:
+            vectors = [embeddings.embed_query(req.queries[0])]
+        else:
+            vectors = embeddings.embed_documents(req.queries)
+        results = []
+        for vector in vectors:
+            hits = store.similarity_search_with_score_by_vector(vector, k=req.k)
+            results.append([
+                {"page_content": doc.page_content, "metadata": doc.metadata or {}, "score": float(score)}
+                for doc, score in hits
+            ])
+        return {"results": results}
+
+    @app.post("/embed")
+    def embed(req: EmbedRequest):
+        if not req.texts:
+            return {"vectors": []}
+        if len(req.texts) == 1:
+            return {"vectors": [embeddings.embed_query(req.texts[0])]}
+        return {"vectors": embeddings.embed_documents(req.texts)}
+
+    @app.get("/health")
+    def health():
+        return {"store": store_holder.status(), "embedding_batcher": batcher_metrics(embeddings)}
+
+    @app.post("/reload")
+    def reload(force: bool = False):
+        status = store_holder.reload(force=force)
+        if status.get("last_error"):
+            raise HTTPException(status_code=500, detail=status["last_error"])
+        return status
+
+    return app
+
+
+def build_default_app(index_dir: Optional[str] = None) -> FastAPI:
+    """Wire the sidecar from the same settings the API uses."""
+    from config import get_settings
+    from embeddings import DEFAULT_ONNX_MODEL_DIR, build_base_embeddings, wrap_with_batcher
+    from vector_index import open_study_store, resolve_study_index_path
+
+    settings = get_settings()
+    embeddings = wrap_with_batcher(
+        build_base_embeddings(settings.embedding_backend, settings.onnx_embedding_model_dir or DEFAULT_ONNX_MODEL_DIR),
+        enabled=settings.embedding_batching,
+        max_batch=settings.embedding_batch_max,
+        max_wait_ms=settings.embedding_batch_wait_ms,
+    )
+    holder = open_study_store(
+        index_dir or resolve_study_index_path(BACKEND_DIR),
+        embeddings,
+        snapshots_dir=settings.vector_db_snapshots_dir,
+        prefer_mmap=settings.vector_db_mmap,
+        poll_interval_s=settings.vector_db_watch_interval_s,
+    )
+    return create_app(holder, embeddings)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve study-material retrieval for all API workers.")
+    parser.add_argument("--uds", default="", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--index-dir", default=None, help="Study-material index (default: vectorstore/db_faiss)")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    app = build_default_app(args.index_dir)
+    if args.uds:
+        if os.path.exists(args.uds):
+            os.remove(args.uds)  # stale socket from a previous run
+        uvicorn.run(app, uds=args.uds, log_level="warning")
+    else:
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Denormalized counters for the dashboard and the sessions sidebar.
+
+``user_stats`` holds one row per user (sessions, messages, last message time
+and subject, quiz results) and every ``chat_sessions`` row carries its own
+``message_count`` / ``last_message_at`` / ``subject``. They are written in the
+same transaction as the rows they count (``ChatTurn``, ``/apc/log``, session
+deletes, retention), so reading them is a single-row lookup instead of a scan
+of the user's history.
+
+All helpers take a sync ``Session`` or ``Connection``; async endpoints call
+them through ``AsyncSession.run_sync``.
+"""
+
+import re
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import func, select, update
+
+from database import ChatSession, UserStats
+
+QUIZ_TOOL_MARKERS = ("quiz", "exam")
+
+
+def _dialect_name(db: Any) -> str:
+    dialect = getattr(db, "dialect", None) or db.get_bind().dialect
+    return dialect.name
+
+
+def _upsert_user_stats(db: Any, user_id: int, increments: dict[str, Any], values: dict[str, Any]) -> None:
+    """``user_stats[user_id] += increments`` and ``= values``, creating the row on first use."""
+    table = UserStats.__table__
+    dialect = _dialect_name(db)
+    if dialect in {"sqlite", "postgresql"}:
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(user_id=user_id, **increments, **values)
+        changes = {name: table.c[name] + amount for name, amount in increments.items()}
+        db.execute(stmt.on_conflict_do_update(index_elements=[table.c.user_id], set_={**changes, **values}))
+        return
+    result = db.execute(
+        update(table)
+        .where(table.c.user_id == user_id)
+        .values(**{name: table.c[name] + amount for name, amount in increments.items()}, **values)
+    )
+    if not result.rowcount:
+        db.execute(table.insert().values(user_id=user_id, **increments, **values))
+
+
+def record_chat_turn(
+    db: Any,
+    user_id: int,
+    session_id: int,
+    message_count: int,
+    new_session: bool = False,
+    subject: Optional[str] = None,
+    at: Optional[datetime] = None,
+) -> None:
+    """Count ``message_count`` new messages in ``session_id`` (and the session itself if it is new)."""
+    at = at or datetime.utcnow()
+    session_values: dict[str, Any] = {
+        "message_count": ChatSession.message_count + message_count,
+        "last_message_at": at,
+    }
+    values: dict[str, Any] = {"last_message_at": at}
+    if subject:
+        session_values["subject"] = subject
+        values["last_subject"] = subject
+    db.execute(update(ChatSession).where(ChatSession.id == session_id).values(**session_values))
+    _upsert_user_stats(
+        db, user_id, {"session_count": 1 if new_session else 0, "message_count": message_count}, values
+    )
+
+
+def extract_score_percent(text: str) -> Optional[int]:
+    raw = (text or "").lower()
+    m = re.search(r"(\d{1,3})\s*%|\bscore\s*(\d{1,3})\b", raw)
+    if not m:
+        return None
+    val = m.group(1) or m.group(2)
+    try:
+        num = int(val)
+        return max(0, min(num, 100))
+    except Exception:
+        return None
+
+
+def record_quiz_result(db: Any, user_id: int, tool: str, response_text: str) -> Optional[int]:
+    """Add the score of a quiz/exam APC log (e.g. ``Score=12/20 (60%)``) to the user's average."""
+    if not any(marker in str(tool or "").lower() for marker in QUIZ_TOOL_MARKERS):
+        return None
+    score = extract_score_percent(response_text)
+    if score is not None:
+        _upsert_user_stats(db, user_id, {"quiz_count": 1, "quiz_score_total": float(score)}, {})
+    return score
+
+
+def release_sessions(db: Any, session_ids: list[int]) -> None:
+    """Subtract sessions and their messages from their owners' counters.
+
+    Call in the transaction that deletes or detaches them, before it does.
+    """
+    if not session_ids:
+        return
+    owners = db.execute(
+        select(ChatSession.user_id, func.count(), func.coalesce(func.sum(ChatSession.message_count), 0))
+        .where(ChatSession.id.in_(session_ids), ChatSession.user_id.isnot(None))
+        .group_by(ChatSession.user_id)
+    ).all()
+    for user_id, sessions, messages in owners:
+        db.execute(
+            update(UserStats)
+            .where(UserStats.user_id == user_id)
+            .values(
+                session_count=UserStats.session_count - int(sessions),
+                message_count=UserStats.message_count - int(messages or 0),
+            )
+        )
+
+
+def recent_activity_label(last_at: Optional[datetime], now: Optional[datetime] = None) -> str:
+    if last_at is None:
+        return "No activity yet"
+    seconds = max(0, int(((now or datetime.utcnow()) - last_at).total_seconds()))
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= size:
+            amount = seconds // size
+            return f"Last active {amount} {unit}{'s' if amount != 1 else ''} ago"
+    return "Active just now"
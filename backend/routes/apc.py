@@ -1,19 +1,24 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth_utils import get_current_user
-from database import APCLog, User, get_db
+from database import APCLog, User, get_async_db
+from pagination import NEXT_CURSOR_HEADER, clamp_limit, fetch_keyset_page, preview, preview_column
+from rollups import record_quiz_result
 
 router = APIRouter()
 
 
 @router.post("/apc/log")
-def log_apc_activity(
+async def log_apc_activity(
     tool: str,
     subject: str,
     response: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     db.add(
         APCLog(
@@ -23,20 +28,64 @@ def log_apc_activity(
             response_text=response,
         )
     )
-    db.commit()
+    # Quiz/exam scores feed the dashboard average in the same transaction.
+    await db.run_sync(lambda sync_db: record_quiz_result(sync_db, current_user.id, tool, response))
+    await db.commit()
     return {"ok": True}
 
 
 @router.get("/apc/history")
-def get_apc_history(
+async def get_apc_history(
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[int] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    logs = (
-        db.query(APCLog)
-        .filter(APCLog.user_id == current_user.id)
-        .order_by(APCLog.id.desc())
-        .limit(50)
-        .all()
+    """Newest-first list with previews; ``GET /apc/history/{log_id}`` returns the full texts."""
+    rows, next_cursor = await fetch_keyset_page(
+        db,
+        select(
+            APCLog.id,
+            APCLog.tool_name,
+            APCLog.subject,
+            APCLog.semester,
+            APCLog.created_at,
+            preview_column(APCLog.prompt_text),
+            preview_column(APCLog.response_text),
+        ).where(APCLog.user_id == current_user.id),
+        APCLog.id,
+        cursor,
+        clamp_limit(limit, default=50, maximum=200),
     )
-    return logs
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
+    items = []
+    for r in rows:
+        prompt_preview, _ = preview(r.prompt_text)
+        response_preview, truncated = preview(r.response_text)
+        items.append({
+            "id": r.id,
+            "tool_name": r.tool_name,
+            "subject": r.subject,
+            "semester": r.semester,
+            "created_at": r.created_at,
+            "prompt_preview": prompt_preview,
+            "response_preview": response_preview,
+            "truncated": truncated,
+        })
+    return items
+
+
+@router.get("/apc/history/{log_id}")
+async def get_apc_log(
+    log_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    log = (
+        await db.execute(select(APCLog).where(APCLog.id == log_id, APCLog.user_id == current_user.id))
+    ).scalars().first()
+    if log is None:
+        raise HTTPException(status_code=404, detail="APC log not found")
+    return log
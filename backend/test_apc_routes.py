@@ -0,0 +1,116 @@
+"""
+Tests for the async APC log/history endpoints (aiosqlite, auth overridden).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("greenlet")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from auth_utils import get_current_user
+from database import APCLog, User, UserStats, create_async_db_engine, get_async_db
+from pagination import NEXT_CURSOR_HEADER, PREVIEW_CHARS, clamp_limit, fetch_keyset_page, preview
+from routes.apc import router
+
+
+@pytest.fixture()
+def client(db_url, file_engine):
+    with file_engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"id": 3, "username": "student"}])
+    engine = create_async_db_engine(db_url)
+    Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def override_db():
+        async with Session() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_async_db] = override_db
+    app.dependency_overrides[get_current_user] = lambda: User(id=3, username="student")
+
+    with TestClient(app) as test_client:
+        yield test_client
+        test_client.portal.call(engine.dispose)
+
+
+def _log(client, tool, response="ok"):
+    assert client.post("/apc/log", params={"tool": tool, "subject": "MCS-023", "response": response}).json() == {"ok": True}
+
+
+def test_apc_log_then_history_newest_first(client):
+    for tool in ("quiz", "exam"):
+        _log(client, tool)
+    history = client.get("/apc/history").json()
+    assert [row["tool_name"] for row in history] == ["exam", "quiz"]
+    assert history[0]["response_preview"] == "ok" and history[0]["subject"] == "MCS-023"
+    assert "response_text" not in history[0]
+
+
+def test_apc_history_pages_by_cursor(client):
+    long_answer = "Normalization removes redundancy. " * 40
+    for i in range(5):
+        _log(client, f"tool{i}", response=long_answer)
+
+    first = client.get("/apc/history", params={"limit": 2})
+    assert [row["tool_name"] for row in first.json()] == ["tool4", "tool3"]
+    row = first.json()[0]
+    assert row["truncated"] and len(row["response_preview"]) <= PREVIEW_CHARS + 1
+    assert "response_text" not in row
+
+    seen = [r["tool_name"] for r in first.json()]
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+    while cursor:
+        page = client.get("/apc/history", params={"limit": 2, "cursor": cursor})
+        seen += [r["tool_name"] for r in page.json()]
+        cursor = page.headers.get(NEXT_CURSOR_HEADER)
+    assert seen == ["tool4", "tool3", "tool2", "tool1", "tool0"]
+
+    full = client.get(f"/apc/history/{row['id']}").json()
+    assert full["response_text"] == long_answer
+    assert client.get("/apc/history/999").status_code == 404
+
+
+def test_quiz_and_exam_logs_feed_the_dashboard_average(client):
+    _log(client, "exam_simulation", response="Exam Simulation Result | Score=12/20 (60%) | Attempted=20")
+    _log(client, "quiz", response="Score 90")
+    _log(client, "notes", response="Covered 40% of unit 2")  # not a quiz: ignored
+    stats = client.portal.call(_user_stats, client.app.dependency_overrides[get_async_db])
+    assert (stats.quiz_count, stats.quiz_score_total) == (2, 150.0)
+
+
+async def _user_stats(override_db):
+    async for db in override_db():
+        return await db.get(UserStats, 3)
+
+
+def test_preview_cuts_on_a_word_boundary():
+    assert preview("short") == ("short", False)
+    text, truncated = preview("alpha beta gamma delta", chars=12)
+    assert truncated and text == "alpha beta…"
+
+
+def test_history_defaults_to_a_bounded_page(client):
+    for i in range(7):
+        _log(client, f"tool{i}")
+    rows, next_cursor = client.portal.call(_log_ids_page, client.app.dependency_overrides[get_async_db])
+    assert rows == [7, 6, 5] and next_cursor == 5
+    assert clamp_limit(None, default=3, maximum=10) == 3
+    assert clamp_limit(50, default=3, maximum=10) == 10
+
+
+async def _log_ids_page(override_db):
+    async for db in override_db():
+        rows, next_cursor = await fetch_keyset_page(
+            db, select(APCLog.id), APCLog.id, None, clamp_limit(None, default=3, maximum=10)
+        )
+        return [r.id for r in rows], next_cursor
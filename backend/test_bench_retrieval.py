@@ -0,0 +1,63 @@
+"""
+Tests for the offline retrieval benchmark harness (benchmarks/bench_retrieval.py).
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+pytest.importorskip("langchain_community")
+pytest.importorskip("faiss")
+
+import bench_retrieval as bench
+
+
+def test_score_ranking_recall_and_reciprocal_rank():
+    keys = [None, "a", None, "a", "b"]
+    scores = bench.score_ranking(keys, expected=2, ks=(1, 3, 5))
+    assert scores["recall@1"] == 0.0
+    assert scores["recall@3"] == 0.5  # duplicate hits of the same label count once
+    assert scores["recall@5"] == 1.0
+    assert scores["rr"] == 0.5
+    assert bench.score_ranking([None, None], expected=1, ks=(1,))["rr"] == 0.0
+
+
+def test_parse_config_overrides_baseline():
+    name, config = bench.parse_config("small:chunk_size=300,k=8,mmap=off")
+    assert name == "small"
+    assert config == {"chunk_size": 300, "chunk_overlap": bench.CHUNK_OVERLAP, "k": 8, "mmap": False}
+    with pytest.raises(ValueError):
+        bench.parse_config("bad:top_k=3")
+
+
+def test_fixture_run_reports_quality_latency_and_size():
+    queries = bench.load_query_set()
+    corpus = bench._read_jsonl(bench.DEFAULT_CORPUS)
+    result = bench.run_config("baseline", dict(bench.BASELINE_CONFIG), queries, bench.HashingEmbeddings(),
+                              corpus=corpus, repeats=1)
+
+    assert result["queries"] == len(queries)
+    assert result["store"] == "MmapFAISSStore"
+    assert 0.0 <= result["recall@1"] <= result["recall@5"] <= result["recall@10"] <= 1.0
+    assert result["recall@k"] == result["recall@5"]
+    assert result["recall@10"] >= 0.8
+    assert 0.0 < result["mrr"] <= 1.0
+    assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+    assert result["index_bytes"] > 0 and result["chunks"] > 0
+
+
+def test_existing_index_is_scored_on_subject(tmp_path):
+    embeddings = bench.HashingEmbeddings()
+    corpus = bench._read_jsonl(bench.DEFAULT_CORPUS)
+    bench.build_fixture_index(corpus, dict(bench.BASELINE_CONFIG), embeddings, str(tmp_path))
+
+    queries = [{"query": "java applet lifecycle", "expected_subject": "MCS-024"}]
+    result = bench.run_config("live", dict(bench.BASELINE_CONFIG), queries, embeddings,
+                              index_dir=str(tmp_path), match="subject", repeats=1)
+    assert result["recall@1"] == 1.0
+    assert os.path.isdir(tmp_path)  # an existing index is never deleted
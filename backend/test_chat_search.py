@@ -0,0 +1,113 @@
+"""
+Tests for FTS5 chat search (migrated temporary SQLite file, aiosqlite).
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("greenlet")
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from chat_search import _like_search, fts5_query, highlight_snippet, search_messages, search_terms
+from database import ChatHistory, ChatSession, User, create_async_db_engine, create_db_engine, run_migrations
+
+
+@pytest.fixture()
+def url(db_url):
+    run_migrations(db_url)
+    engine = create_db_engine(db_url)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"id": 1, "username": "student"}, {"id": 2, "username": "other"}])
+        conn.execute(ChatSession.__table__.insert(), [
+            {"id": 10, "user_id": 1, "title": "DBMS"},
+            {"id": 11, "user_id": 1, "title": "Java"},
+            {"id": 20, "user_id": 2, "title": "DBMS too"},
+        ])
+        conn.execute(ChatHistory.__table__.insert(), [
+            {"id": 1, "session_id": 10, "sender": "user", "text": "What is normalization?"},
+            {"id": 2, "session_id": 10, "sender": "ai",
+             "text": "Normalization splits tables to remove redundancy. Normalization into 3NF and BCNF removes "
+                     "transitive dependencies."},
+            {"id": 3, "session_id": 11, "sender": "ai", "text": "Java classes are normally public."},
+            {"id": 4, "session_id": 11, "sender": "user", "text": "Explain database normalization with an example"},
+            {"id": 5, "session_id": 20, "sender": "user", "text": "normalization notes please"},
+        ])
+    engine.dispose()
+    return db_url
+
+
+def _search(url, *args, search=search_messages, **kwargs):
+    async def run():
+        engine = create_async_db_engine(url)
+        try:
+            async with async_sessionmaker(engine)() as db:
+                return await search(db, *args, **kwargs)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+def test_search_is_ranked_scoped_to_the_user_and_highlighted(url):
+    rows, next_cursor = _search(url, 1, "normalization")
+    assert {r.id for r in rows} == {1, 2, 4}  # user 2's message is never returned
+    assert [r.rank for r in rows] == sorted(r.rank for r in rows)  # bm25: best (lowest) first
+    assert next_cursor is None
+    answer = next(r for r in rows if r.id == 2)
+    assert answer.session_title == "DBMS" and answer.sender == "ai"
+    assert isinstance(answer.created_at, datetime)
+    assert answer.snippet.startswith("**Normalization** splits") and "**Normalization** into" in answer.snippet
+
+    rows, _ = _search(url, 1, "normaliz")  # the last word matches as a prefix
+    assert {r.id for r in rows} == {1, 2, 4}
+    rows, _ = _search(url, 1, "database normalization")  # every word must match
+    assert [r.id for r in rows] == [4]
+
+
+def test_search_filters_by_session_and_pages(url):
+    rows, _ = _search(url, 1, "normalization", session_id=11)
+    assert [r.id for r in rows] == [4]
+
+    first, cursor = _search(url, 1, "normalization", limit=2)
+    assert len(first) == 2 and cursor == 2
+    rest, cursor = _search(url, 1, "normalization", limit=2, offset=cursor)
+    assert cursor is None
+    assert {r.id for r in first + rest} == {1, 2, 4}
+
+
+def test_index_follows_updates_and_deletes(url):
+    engine = create_db_engine(url)
+    with engine.begin() as conn:
+        conn.execute(update(ChatHistory).where(ChatHistory.id == 3).values(text="Java normalization? No."))
+        conn.execute(delete(ChatSession).where(ChatSession.id == 10))  # cascades to messages 1 and 2
+    engine.dispose()
+    rows, _ = _search(url, 1, "normalization")
+    assert {r.id for r in rows} == {3, 4}
+
+
+def test_operators_in_user_input_are_neutralised(url):
+    assert search_terms('"BCNF" NEAR(3NF) -java: *') == ["bcnf", "near", "3nf", "java"]
+    assert fts5_query(["bcnf", "3nf"]) == '"bcnf" "3nf"*'
+    assert _search(url, 1, "\"normalization\" -(")[0]
+    assert _search(url, 1, "  ?!  ") == ([], None)
+
+
+def test_like_fallback_for_databases_without_a_search_index(url):
+    rows = _search(url, 1, ["database", "normaliz"], None, 10, 0, search=_like_search)
+    assert [r.id for r in rows] == [4]
+    assert rows[0].snippet == "Explain **database** **normaliz**ation with an example" and rows[0].rank == 0.0
+    rows = _search(url, 1, ["normalization"], None, 10, 0, search=_like_search)
+    assert [r.id for r in rows] == [4, 2, 1]  # newest first, user 1 only
+    assert _search(url, 1, ["normalization"], 11, 10, 0, search=_like_search)[0].session_title == "Java"
+
+    long_text = " ".join(f"w{i}" for i in range(40)) + " bcnf " + " ".join(f"x{i}" for i in range(40))
+    snippet = highlight_snippet(long_text, ["bcnf"], tokens=8)
+    assert snippet == "…w38 w39 **bcnf** x0 x1 x2 x3 x4…"
@@ -0,0 +1,196 @@
+"""
+Tests for the /chat unit of work (in-memory SQLite).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chat_store import ChatTurn, HistoryTailCache, fetch_history_tail
+from database import Base, ChatHistory, ChatSession, User, UserStats
+
+
+def test_new_session_turn_is_written_in_one_commit(db):
+    turn = ChatTurn(db, user_id=1, new_session_title="BCNF doubt")
+    user_row = turn.add_user_message("BCNF kya hai?")
+    assert db.query(ChatSession).count() == 0  # nothing written before the reply exists
+    assert user_row.text == "BCNF kya hai?"
+
+    turn.add_ai_message("BCNF is ...")
+    session_id = turn.commit()
+
+    assert len(db.info["commits"]) == 1
+    session = db.get(ChatSession, session_id)
+    assert session.title == "BCNF doubt"
+    rows = db.query(ChatHistory).filter(ChatHistory.session_id == session_id).order_by(ChatHistory.id).all()
+    assert [(r.sender, r.text) for r in rows] == [("user", "BCNF kya hai?"), ("ai", "BCNF is ...")]
+
+
+def test_existing_session_appends_both_messages(db):
+    first = ChatTurn(db, user_id=1)
+    first.add_user_message("hi")
+    first.add_ai_message("hello")
+    session_id = first.commit()
+
+    second = ChatTurn(db, user_id=1, session_id=session_id)
+    assert not second.is_new_session
+    second.add_user_message("next")
+    second.add_ai_message("answer")
+    assert second.commit() == session_id
+    assert db.query(ChatHistory).filter(ChatHistory.session_id == session_id).count() == 4
+    assert db.query(ChatSession).count() == 1
+
+
+def test_turn_updates_session_and_user_counters_in_the_same_commit(db):
+    first = ChatTurn(db, user_id=1, subject="MCS-023")
+    first.add_user_message("normalization?")
+    first.add_ai_message("1NF, 2NF, ...")
+    session_id = first.commit()
+    second = ChatTurn(db, user_id=1)
+    second.add_user_message("hi")
+    second.add_ai_message("hello")
+    second.commit()
+    third = ChatTurn(db, user_id=1, session_id=session_id)
+    third.add_user_message("and BCNF?")
+    third.add_ai_message("BCNF is ...")
+    third.commit()
+
+    assert len(db.info["commits"]) == 3
+    session = db.get(ChatSession, session_id)
+    db.refresh(session)
+    last = db.query(ChatHistory).filter(ChatHistory.session_id == session_id).order_by(ChatHistory.id.desc()).first()
+    assert session.message_count == 4 and session.last_message_at == last.created_at
+    stats = db.get(UserStats, 1)
+    assert (stats.session_count, stats.message_count, stats.last_subject) == (2, 6, "MCS-023")
+
+
+def test_failed_llm_call_leaves_nothing_behind(db):
+    turn = ChatTurn(db, user_id=1)
+    turn.add_user_message("question")
+    turn.discard()
+    assert db.query(ChatSession).count() == 0
+    assert db.query(ChatHistory).count() == 0
+    assert db.info["commits"] == []
+
+
+def test_commit_failure_rolls_back_and_keeps_reply_flow(db, monkeypatch):
+    turn = ChatTurn(db, user_id=1)
+    turn.add_user_message("question")
+    turn.add_ai_message("answer")
+
+    def locked():
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(db, "commit", locked)
+    assert turn.commit() is None
+    assert turn.error == "database is locked"
+    monkeypatch.undo()
+    assert db.query(ChatHistory).count() == 0
+
+
+def _seed_session(db, turns):
+    turn = ChatTurn(db, user_id=1)
+    for i in range(turns):
+        turn.add_user_message(f"q{i}")
+        turn.add_ai_message(f"a{i}")
+    return turn.commit()
+
+
+def test_fetch_history_tail_returns_last_rows_in_order(db):
+    session_id = _seed_session(db, 50)
+    tail = fetch_history_tail(db, session_id, 4)
+    assert [(line.sender, line.text) for line in tail] == [("user", "q48"), ("ai", "a48"), ("user", "q49"), ("ai", "a49")]
+
+
+def test_tail_cache_is_extended_on_write_and_served_without_refetch(db):
+    session_id = _seed_session(db, 30)
+    cache = HistoryTailCache(tail_size=10)
+    assert [line.text for line in cache.get(db, session_id)][-2:] == ["q29", "a29"]
+    assert cache.stats == {"hits": 0, "misses": 1}
+
+    turn = ChatTurn(db, user_id=1, session_id=session_id, tail_cache=cache)
+    turn.add_user_message("next")
+    turn.add_ai_message("reply")
+    turn.commit()
+
+    tail = cache.get(db, session_id, limit=6)
+    assert cache.stats == {"hits": 1, "misses": 1}
+    assert [line.text for line in tail][-2:] == ["next", "reply"]
+    assert len(tail) == 6
+    assert len(cache.get(db, session_id)) == 10
+
+
+def test_tail_cache_notices_writes_from_other_workers_and_deletes(db):
+    session_id = _seed_session(db, 3)
+    cache = HistoryTailCache(tail_size=10)
+    cache.get(db, session_id)
+
+    db.add(ChatHistory(session_id=session_id, sender="user", text="from another worker"))
+    db.commit()
+    assert cache.get(db, session_id)[-1].text == "from another worker"
+    assert cache.stats["misses"] == 2
+
+    # A turn written on top of an unseen row must not be appended to the stale tail.
+    stale = HistoryTailCache(tail_size=10)
+    stale.get(db, session_id)
+    db.add(ChatHistory(session_id=session_id, sender="ai", text="unseen"))
+    db.commit()
+    turn = ChatTurn(db, user_id=1, session_id=session_id, tail_cache=stale)
+    turn.add_user_message("mine")
+    turn.add_ai_message("ok")
+    turn.commit()
+    assert [line.text for line in stale.get(db, session_id)][-3:] == ["unseen", "mine", "ok"]
+
+    db.query(ChatHistory).filter(ChatHistory.session_id == session_id).delete()
+    db.commit()
+    assert cache.get(db, session_id) == []
+
+
+def test_new_session_rows_seed_the_cache(db):
+    cache = HistoryTailCache(tail_size=10)
+    turn = ChatTurn(db, user_id=1, tail_cache=cache)
+    turn.add_user_message("first")
+    turn.add_ai_message("hello")
+    session_id = turn.commit()
+    assert [line.text for line in cache.get(db, session_id)] == ["first", "hello"]
+    assert cache.stats == {"hits": 1, "misses": 0}
+
+
+def test_async_turn_and_tail_cache(tmp_path):
+    pytest.importorskip("aiosqlite")
+    pytest.importorskip("greenlet")
+    import asyncio
+
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    from database import create_async_db_engine
+
+    async def run():
+        engine = create_async_db_engine(f"sqlite:///{tmp_path / 'chat.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        cache = HistoryTailCache(tail_size=10)
+        async with Session() as db:
+            db.add(User(id=1, username="student"))
+            await db.commit()
+
+            turn = ChatTurn(db, user_id=1, tail_cache=cache)
+            turn.add_user_message("q")
+            turn.add_ai_message("a")
+            session_id = await turn.commit_async()
+
+            failed = ChatTurn(db, user_id=1, session_id=session_id)
+            failed.add_user_message("lost")
+            await failed.discard_async()
+
+            tail = await cache.get_async(db, session_id)
+        await engine.dispose()
+        return [line.text for line in tail], cache.stats
+
+    texts, stats = asyncio.run(run())
+    assert texts == ["q", "a"]
+    assert stats == {"hits": 1, "misses": 0}
@@ -0,0 +1,72 @@
+"""
+Tests for the SQLite storage profiles applied through connection hooks.
+"""
+
+import os
+import sys
+
+import pytest
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import create_db_engine
+
+
+def _pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_production_profile_sets_pragmas_on_every_connection(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}", profile="production",
+                              busy_timeout_ms=2500, mmap_size_mb=16, cache_size_mb=8, pool_size=3)
+    assert _pragma(engine, "journal_mode") == "wal"
+    assert _pragma(engine, "busy_timeout") == 2500
+    assert _pragma(engine, "synchronous") == 1  # NORMAL
+    assert _pragma(engine, "foreign_keys") == 1
+    assert _pragma(engine, "mmap_size") == 16 * 1024 * 1024
+    assert _pragma(engine, "cache_size") == -8 * 1024
+    assert engine.pool.size() == 3
+    engine.dispose()
+
+
+def test_compat_profile_keeps_driver_defaults_but_enforces_foreign_keys(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}", profile="compat")
+    assert _pragma(engine, "journal_mode") == "delete"
+    assert _pragma(engine, "synchronous") == 2  # FULL
+    assert _pragma(engine, "foreign_keys") == 1  # ON DELETE CASCADE needs it
+    engine.dispose()
+
+
+def test_in_memory_database_skips_wal_and_unknown_profile_fails():
+    engine = create_db_engine("sqlite://", profile="production")
+    assert _pragma(engine, "foreign_keys") == 1
+    assert _pragma(engine, "journal_mode") == "memory"
+    with pytest.raises(ValueError):
+        create_db_engine("sqlite://", profile="fast")
+
+
+def test_async_url_uses_async_drivers():
+    from database import async_database_url
+
+    assert async_database_url("postgresql+psycopg://u:p@db:5432/app") == "postgresql+asyncpg://u:p@db:5432/app"
+    assert async_database_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert async_database_url("sqlite:///./bcabuddy.db") == "sqlite+aiosqlite:///./bcabuddy.db"
+
+
+def test_async_engine_applies_the_same_profile(tmp_path):
+    pytest.importorskip("aiosqlite")
+    pytest.importorskip("greenlet")
+    import asyncio
+
+    from database import create_async_db_engine
+
+    async def run():
+        engine = create_async_db_engine(f"sqlite:///{tmp_path / 'app.db'}", busy_timeout_ms=1234)
+        async with engine.connect() as conn:
+            values = [(await conn.execute(text(f"PRAGMA {name}"))).scalar() for name in ("journal_mode", "busy_timeout")]
+        await engine.dispose()
+        return values
+
+    assert asyncio.run(run()) == ["wal", 1234]
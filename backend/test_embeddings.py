@@ -0,0 +1,76 @@
+"""
+Tests for the embedding micro-batcher (fake model, no torch required).
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("langchain_core")
+from langchain_core.embeddings import Embeddings
+
+from embeddings import MicroBatchingEmbeddings
+
+
+class _CountingEmbeddings(Embeddings):
+    """Fake model with a fixed per-call overhead, recording every batch it sees."""
+
+    def __init__(self):
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        time.sleep(0.01)
+        with self._lock:
+            self.batches.append(list(texts))
+        return [[float(len(t)), float(sum(map(ord, t)) % 97)] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_concurrent_queries_are_batched():
+    base = _CountingEmbeddings()
+    batcher = MicroBatchingEmbeddings(base, max_batch=16, max_wait_ms=20)
+    queries = [f"question {i}" * (i % 3 + 1) for i in range(32)]
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(batcher.embed_query, queries))
+
+    reference = _CountingEmbeddings()
+    assert results == [reference.embed_query(q) for q in queries]
+    assert len(base.batches) < len(queries)
+    assert max(len(b) for b in base.batches) > 1
+    assert all(len(b) <= 16 for b in base.batches)
+
+    metrics = batcher.metrics()
+    assert metrics["batch_size"]["count"] == len(base.batches)
+    assert metrics["queue_wait_ms"]["count"] == len(queries)
+    assert metrics["batch_size"]["buckets"]["+Inf"] == len(base.batches)
+
+
+def test_errors_propagate_to_every_caller():
+    class _Broken(Embeddings):
+        def embed_documents(self, texts):
+            raise RuntimeError("model not loaded")
+
+        def embed_query(self, text):
+            raise RuntimeError("model not loaded")
+
+    batcher = MicroBatchingEmbeddings(_Broken(), max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="model not loaded"):
+        batcher.embed_query("hello")
+
+
+def test_documents_bypass_the_queue():
+    base = _CountingEmbeddings()
+    batcher = MicroBatchingEmbeddings(base)
+    batcher.embed_documents(["a", "b", "c"])
+    assert base.batches == [["a", "b", "c"]]
+    assert batcher.metrics()["batch_size"]["count"] == 0
@@ -0,0 +1,78 @@
+"""
+Tests for the offline PDF ingestion helpers (no model or PDFs required).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingest_pdfs import chunk_fingerprint, dedupe_chunks, infer_metadata
+from vector_index import make_build_dir, publish_index_atomically
+
+
+def test_infer_metadata_from_layout():
+    root = os.path.join("corpus")
+    meta = infer_metadata(os.path.join(root, "pyq", "sem 3", "MCS-023", "june-2023.pdf"), root)
+    assert meta["category"] == "pyq"
+    assert meta["semester"] == "3"
+    assert meta["subject"] == "MCS-023"
+    assert meta["source"] == "pyq/sem 3/MCS-023/june-2023.pdf"
+
+    book = infer_metadata(os.path.join(root, "books", "mcs021_block1.pdf"), root)
+    assert book["category"] == "book"
+    assert book["subject"] == "MCS-021"
+
+
+def test_infer_metadata_overrides():
+    meta = infer_metadata(os.path.join("corpus", "misc.pdf"), "corpus", {"category": "pyq", "subject": ""})
+    assert meta["category"] == "pyq"
+    assert meta["subject"] == ""
+
+
+def test_fingerprint_ignores_case_and_whitespace():
+    assert chunk_fingerprint("Normal  Form\nBCNF") == chunk_fingerprint("normal form bcnf")
+
+
+def test_dedupe_drops_duplicates_and_boilerplate():
+    body = "Third normal form removes transitive dependencies between non-key attributes."
+    header = "Indira Gandhi National Open University School of Computer and Information Sciences"
+    chunks = [
+        (header, {"source": "a.pdf"}),
+        (body, {"source": "a.pdf"}),
+        (body.upper(), {"source": "a.pdf"}),
+        (header, {"source": "b.pdf"}),
+        (header, {"source": "c.pdf"}),
+        ("Unit 1", {"source": "c.pdf"}),
+    ]
+    kept, stats = dedupe_chunks(chunks, boilerplate_min_files=3)
+    assert [text for text, _ in kept] == [body]
+    assert kept[0][1]["chunk_hash"] == chunk_fingerprint(body)
+    assert stats == {"input": 6, "duplicate": 1, "boilerplate": 3, "too_short": 1, "kept": 1}
+
+
+def test_publish_replaces_existing_index(tmp_path):
+    target = tmp_path / "db_faiss"
+    target.mkdir()
+    (target / "index.faiss").write_text("old")
+
+    build = make_build_dir(str(target))
+    with open(os.path.join(build, "index.faiss"), "w") as f:
+        f.write("new")
+    publish_index_atomically(build, str(target))
+
+    assert (target / "index.faiss").read_text() == "new"
+    assert not os.path.exists(build)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["db_faiss"]
+
+
+def test_publish_refuses_incomplete_build(tmp_path):
+    target = tmp_path / "db_faiss"
+    build = make_build_dir(str(target))
+    try:
+        publish_index_atomically(build, str(target))
+    except FileNotFoundError:
+        pass
+    else:
+        raise AssertionError("incomplete build should not be published")
+    assert not target.exists()
@@ -0,0 +1,95 @@
+"""
+Tests for the one-pass keyword matcher and the persona detectors built on it.
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from keyword_matcher import REGEX_MAX_CHARS, KeywordMatcher
+from persona import (
+    INTENT_ACADEMIC_KEYWORDS,
+    INTENT_SUBJECT_KEYWORDS,
+    PERSONA_KEYWORDS,
+    PERSONA_TRIGGER_KEYWORDS,
+    SUBJECT_CODE_NAMES,
+    SUBJECT_NAME_KEYWORDS,
+    classify_intent,
+    detect_jiya_question_type,
+    detect_persona_trigger,
+    detect_response_style,
+    extract_subject_context,
+    scan_message,
+)
+
+MESSAGES = [
+    "Bhai BCNF kya hota hai, example ke saath samjhao",
+    "who is jiya? Saurav ne kya bataya tha",
+    "Do you love someone? your crush kaun hai",
+    "MCS-023 unit 3 ka normalization explain karo",
+    "java me applet lifecycle, aur database connectivity bhi",
+    "reset frenzy please, restore theme",
+    "i am frenzy",
+    "19/04 ko kya hua tha",
+    "kya haal hai, bored ho raha hu",
+    "this is so hard yaar, i can't do c++ pointers",
+    "object-oriented vs oop in bcs-031",
+    "",
+]
+
+
+def _old_any(text, keywords):
+    return any(k in text.lower() for k in keywords)
+
+
+def test_find_reports_overlapping_and_contained_keywords():
+    matcher = KeywordMatcher(["jiya", "who is jiya", "jiya kaun hai", "is"], ["c++", "19/04"])
+    assert matcher.find("Who is JIYA kaun hai?") == {"jiya", "who is jiya", "jiya kaun hai", "is"}
+    assert matcher.find("c++ on 19/04") == {"c++", "19/04"}
+    assert matcher.find("nothing here") == frozenset()
+    assert KeywordMatcher([]).find("jiya") == frozenset()
+
+
+def test_find_matches_substring_search_for_every_keyword():
+    matcher = KeywordMatcher(PERSONA_KEYWORDS)
+    rng = random.Random(7)
+    words = list(PERSONA_KEYWORDS) + ["kya", "hai", "samjhao", "yaar", "x", "-", "'s", " "]
+    texts = MESSAGES + ["".join(rng.choice(words) for _ in range(rng.randint(1, 12))) for _ in range(300)]
+    for text in texts:
+        assert matcher.find(text) == {k for k in matcher.keywords if k in text.lower()}, text
+    # Long texts take the per-keyword path; short ones the regex. Both agree.
+    long_text = " ".join(MESSAGES) * 3
+    assert len(long_text) > REGEX_MAX_CHARS
+    assert matcher.find(long_text) == {k for k in matcher.keywords if k in long_text.lower()}
+    assert matcher.find(long_text) == frozenset().union(*(matcher.find(m) for m in MESSAGES))
+
+
+def test_detectors_give_the_same_answers_as_the_linear_scans():
+    for message in MESSAGES:
+        expected_trigger = next(
+            (label for label, keywords in PERSONA_TRIGGER_KEYWORDS if _old_any(message, keywords)), None
+        )
+        expected_subject = next((c for c in SUBJECT_CODE_NAMES if c in message.lower()), None) or next(
+            (c for k, c in SUBJECT_NAME_KEYWORDS.items() if k in message.lower()), "UNKNOWN"
+        )
+        assert detect_persona_trigger(message) == expected_trigger
+        # A caller's wider hit set (e.g. main.py's, with the Frenzy phrases) gives the same result.
+        wider = KeywordMatcher(PERSONA_KEYWORDS, ["reset frenzy", "i am frenzy"]).find(message)
+        assert detect_persona_trigger(message, wider) == expected_trigger
+        assert detect_jiya_question_type(message, wider) == detect_jiya_question_type(message)
+        assert extract_subject_context(message)["subject_code"] == expected_subject
+
+    assert detect_jiya_question_type("tell me about Jiya") == "jiya_identity"
+    assert detect_jiya_question_type("who does saurav love, your crush?") == "ai_love"
+    assert detect_jiya_question_type("jiya") == "jiya_general"
+    assert extract_subject_context("MCS-023 and java")["subject_code"] == "mcs-023"
+    assert extract_subject_context("web ke liye css")["subject_code"] == "mcs-015"
+    assert extract_subject_context("kuch bhi", "mcs-011")["confidence"] == 0.60
+    assert detect_response_style("this") == "CASUAL"  # substring semantics, as before
+    assert detect_response_style("stuck on this") == "MOTIVATION"
+    assert classify_intent("settings kholo") == "COMMAND"
+    assert classify_intent("ok", [{"text": "explain dbms"}]) == "AMBIGUOUS"
+    assert scan_message("DBMS") >= {"dbms"}
+    assert not scan_message("dbms").isdisjoint(INTENT_ACADEMIC_KEYWORDS + INTENT_SUBJECT_KEYWORDS)
@@ -0,0 +1,61 @@
+"""
+Tests for the SQLite -> PostgreSQL copy tool (SQLite target stands in for Postgres).
+"""
+
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+
+from migrate_sqlite_to_postgres import copy_database, main
+
+
+def _legacy_sqlite(path):
+    # An old database file: fewer user columns than the current model.
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, hashed_password VARCHAR, display_name VARCHAR);
+        CREATE TABLE chat_sessions (id INTEGER PRIMARY KEY, user_id INTEGER, title VARCHAR, created_at DATETIME);
+        CREATE TABLE chat_history (id INTEGER PRIMARY KEY, session_id INTEGER, sender VARCHAR, text TEXT,
+                                   created_at DATETIME);
+        INSERT INTO users VALUES (5, 'student', 'x', 'Student');
+        INSERT INTO chat_sessions VALUES (9, 5, 'BCNF', '2025-01-01 10:00:00');
+        """
+    )
+    conn.executemany(
+        "INSERT INTO chat_history VALUES (?, 9, ?, ?, '2025-01-01 10:00:00')",
+        [(i, "user" if i % 2 else "ai", f"message {i}") for i in range(1, 8)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_copy_keeps_ids_and_fills_new_columns(tmp_path):
+    source = tmp_path / "old.db"
+    _legacy_sqlite(str(source))
+    target_url = f"sqlite:///{tmp_path / 'new.db'}"
+
+    copied = copy_database(f"sqlite:///{source}", target_url, batch_size=3)
+    assert copied["users"] == 1 and copied["chat_sessions"] == 1 and copied["chat_history"] == 7
+    assert copied["apc_logs"] == 0
+
+    engine = create_engine(target_url)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id, username, email FROM users")).all() == [(5, "student", None)]
+        ids = [r[0] for r in conn.execute(text("SELECT id FROM chat_history WHERE session_id = 9 ORDER BY id"))]
+    engine.dispose()
+    assert ids == list(range(1, 8))
+
+
+def test_copy_refuses_a_non_empty_target_unless_truncating(tmp_path, capsys):
+    source = tmp_path / "old.db"
+    _legacy_sqlite(str(source))
+    target_url = f"sqlite:///{tmp_path / 'new.db'}"
+    assert main(["--source", str(source), "--target", target_url]) == 0
+    assert main(["--source", str(source), "--target", target_url]) == 1
+    assert "already has" in capsys.readouterr().out
+    assert main(["--source", str(source), "--target", target_url, "--truncate"]) == 0
@@ -0,0 +1,171 @@
+"""
+Tests for the Alembic migration chain (temporary SQLite files).
+"""
+
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from alembic import command
+from sqlalchemy import create_engine, inspect
+
+from database import Base, alembic_config, run_migrations
+
+
+def _indexes(url):
+    engine = create_engine(url)
+    insp = inspect(engine)
+    found = {table: {ix["name"]: ix["column_names"] for ix in insp.get_indexes(table)} for table in insp.get_table_names()}
+    columns = {c["name"] for c in insp.get_columns("users")}
+    engine.dispose()
+    return found, columns
+
+
+def test_fresh_database_matches_the_models(tmp_path):
+    migrated = f"sqlite:///{tmp_path / 'migrated.db'}"
+    run_migrations(migrated)
+    modelled = f"sqlite:///{tmp_path / 'modelled.db'}"
+    engine = create_engine(modelled)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    migrated_indexes, migrated_columns = _indexes(migrated)
+    model_indexes, model_columns = _indexes(modelled)
+    migrated_indexes.pop("alembic_version", None)
+    for table in [t for t in migrated_indexes if t.startswith("chat_history_fts")]:
+        migrated_indexes.pop(table)  # FTS5 search index and its shadow tables (migration 0006)
+    assert migrated_indexes == model_indexes
+    assert migrated_columns == model_columns
+    assert migrated_indexes["chat_history"]["ix_chat_history_session_id_id"] == ["session_id", "id"]
+
+
+def test_legacy_file_gets_missing_columns_and_indexes_once(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, hashed_password VARCHAR, display_name VARCHAR);
+        CREATE TABLE chat_sessions (id INTEGER PRIMARY KEY, user_id INTEGER, title VARCHAR, created_at DATETIME);
+        CREATE TABLE chat_history (id INTEGER PRIMARY KEY, session_id INTEGER, sender VARCHAR, text TEXT,
+                                   created_at DATETIME);
+        INSERT INTO users (id, username) VALUES (1, 'student');
+        """
+    )
+    conn.close()
+    url = f"sqlite:///{path}"
+    run_migrations(url)
+    run_migrations(url)  # already at head: no-op
+
+    indexes, columns = _indexes(url)
+    assert {"privacy_mode", "achievements_json", "is_creator"} <= columns
+    assert "ix_chat_sessions_user_id_id" in indexes["chat_sessions"]
+    assert "ix_apc_logs_user_id_id" in indexes["apc_logs"]
+    row = sqlite3.connect(path).execute("SELECT username, privacy_mode, auto_save_history FROM users").fetchone()
+    assert row == ("student", 0, 1)
+
+
+def test_index_migration_downgrades(tmp_path):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    run_migrations(url)
+    command.downgrade(alembic_config(url), "0001")
+    indexes, _ = _indexes(url)
+    assert "ix_chat_history_session_id_id" not in indexes["chat_history"]
+    assert indexes["apc_logs"]["ix_apc_logs_user_id"] == ["user_id"]
+
+
+def test_session_delete_cascades_to_messages_after_migration(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR);
+        CREATE TABLE chat_sessions (id INTEGER PRIMARY KEY, user_id INTEGER, title VARCHAR, created_at DATETIME);
+        CREATE TABLE chat_history (id INTEGER PRIMARY KEY, session_id INTEGER, sender VARCHAR, text TEXT,
+                                   created_at DATETIME);
+        INSERT INTO users (id, username) VALUES (1, 'student');
+        INSERT INTO chat_sessions (id, user_id, title) VALUES (1, 1, 'kept'), (2, 1, 'deleted');
+        INSERT INTO chat_history (session_id, sender, text) VALUES (1, 'user', 'a'), (2, 'user', 'b'), (9, 'user', 'orphan');
+        """
+    )
+    conn.close()
+    url = f"sqlite:///{path}"
+    run_migrations(url)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys=ON")
+    assert [r[0] for r in conn.execute("SELECT text FROM chat_history ORDER BY id")] == ["a", "b"]
+    conn.execute("DELETE FROM chat_sessions WHERE id = 2")
+    assert [r[0] for r in conn.execute("SELECT text FROM chat_history")] == ["a"]
+    conn.close()
+    indexes, _ = _indexes(url)
+    assert "ix_chat_history_session_id_id" in indexes["chat_history"]
+
+    command.downgrade(alembic_config(url), "0002")
+    engine = create_engine(url)
+    fks = inspect(engine).get_foreign_keys("chat_history")
+    engine.dispose()
+    assert [fk["options"].get("ondelete") for fk in fks] == [None]
+
+
+def test_rollup_counters_are_backfilled(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR);
+        CREATE TABLE chat_sessions (id INTEGER PRIMARY KEY, user_id INTEGER, title VARCHAR, created_at DATETIME);
+        CREATE TABLE chat_history (id INTEGER PRIMARY KEY, session_id INTEGER, sender VARCHAR, text TEXT,
+                                   created_at DATETIME);
+        CREATE TABLE apc_logs (id INTEGER PRIMARY KEY, user_id INTEGER, tool_name VARCHAR, subject VARCHAR,
+                               semester VARCHAR, prompt_text TEXT, response_text TEXT, created_at DATETIME);
+        INSERT INTO users (id, username) VALUES (1, 'student'), (2, 'new');
+        INSERT INTO chat_sessions (id, user_id, title) VALUES (1, 1, 'a'), (2, 1, 'b');
+        INSERT INTO chat_history (session_id, sender, text, created_at) VALUES
+            (1, 'user', 'q', '2026-01-01 10:00:00'), (1, 'ai', 'a', '2026-01-01 10:00:05'),
+            (2, 'user', 'q', '2026-02-01 09:00:00');
+        INSERT INTO apc_logs (user_id, tool_name, response_text) VALUES
+            (1, 'exam_simulation', 'Score=8/10 (80%)'), (1, 'quiz', 'Score 60'), (1, 'notes', '50%');
+        """
+    )
+    conn.close()
+    run_migrations(f"sqlite:///{path}")
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT id, message_count, last_message_at FROM chat_sessions ORDER BY id").fetchall() == [
+        (1, 2, "2026-01-01 10:00:05"), (2, 1, "2026-02-01 09:00:00"),
+    ]
+    assert conn.execute(
+        "SELECT user_id, session_count, message_count, last_message_at, quiz_count, quiz_score_total "
+        "FROM user_stats ORDER BY user_id"
+    ).fetchall() == [(1, 2, 3, "2026-02-01 09:00:00", 2, 140.0), (2, 0, 0, None, 0, 0.0)]
+    conn.close()
+
+
+def test_topic_coverage_is_backfilled_from_history(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR);
+        CREATE TABLE chat_sessions (id INTEGER PRIMARY KEY, user_id INTEGER, title VARCHAR, created_at DATETIME);
+        CREATE TABLE chat_history (id INTEGER PRIMARY KEY, session_id INTEGER, sender VARCHAR, text TEXT,
+                                   created_at DATETIME);
+        INSERT INTO users (id, username) VALUES (1, 'student');
+        INSERT INTO chat_sessions (id, user_id, title) VALUES (1, 1, 'maths');
+        INSERT INTO chat_history (session_id, sender, text, created_at) VALUES
+            (1, 'user', 'explain matrices', '2026-01-01 10:00:00'),
+            (1, 'ai', 'Matrices and determinants ...', '2026-01-03 10:00:00');
+        """
+    )
+    conn.close()
+    run_migrations(f"sqlite:///{path}")
+
+    conn = sqlite3.connect(path)
+    rows = conn.execute(
+        "SELECT subject, topic, first_seen_at, last_seen_at, hits FROM topic_coverage ORDER BY topic"
+    ).fetchall()
+    conn.close()
+    assert ("BCS-012", "Determinants", "2026-01-03 10:00:00.000000", "2026-01-03 10:00:00.000000", 1) in rows
+    assert ("BCS-012", "Matrices", "2026-01-01 10:00:00.000000", "2026-01-03 10:00:00.000000", 2) in rows
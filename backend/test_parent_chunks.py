@@ -0,0 +1,97 @@
+"""
+Tests for parent-child chunking of uploaded notes (deterministic fake embeddings).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("langchain_community.vectorstores")
+from langchain_core.documents import Document
+
+from parent_chunks import PARENT_ID_KEY, ParentStore, _window, expand_to_parents, split_parent_child
+
+SECTION = (
+    "Normalization organises relations to remove redundancy. "
+    "First normal form requires atomic values. "
+    "Second normal form removes partial dependencies on a composite key. "
+    "Third normal form removes transitive dependencies. "
+    "BCNF requires every determinant to be a super key, which is stricter than 3NF."
+)
+
+
+def _pages():
+    return [
+        Document(page_content=SECTION, metadata={"source": "dbms.pdf", "page": 0}),
+        Document(page_content="Java applets run init, start, paint, stop and destroy. " * 3, metadata={"source": "java.pdf", "page": 4}),
+    ]
+
+
+def test_children_point_at_their_parent_page():
+    children, parents = split_parent_child(_pages(), child_size=80, child_overlap=10)
+    assert len(parents) == 2
+    assert len(children) > len(parents)
+    for child in children:
+        parent = parents[child.metadata[PARENT_ID_KEY]]
+        assert child.page_content in parent.page_content
+        assert child.metadata["source"] == parent.metadata["source"]
+
+
+def test_hits_collapse_to_deduplicated_capped_parents(tmp_path):
+    children, parents = split_parent_child(_pages(), child_size=80, child_overlap=10)
+    store = ParentStore(str(tmp_path / "parents.sqlite"))
+    assert store.put_many(parents) == 2
+    store.put_many(parents)  # re-upload is idempotent
+
+    dbms_children = [c for c in children if c.metadata["source"] == "dbms.pdf"]
+    java_child = next(c for c in children if c.metadata["source"] == "java.pdf")
+    flat_chunk = Document(page_content="a flat-mode chunk without a parent", metadata={})
+    ranked = dbms_children[:3] + [java_child, flat_chunk]
+
+    pieces = expand_to_parents(ranked, store, max_parents=3, max_chars=5000)
+    assert pieces == [SECTION, parents[java_child.metadata[PARENT_ID_KEY]].page_content, flat_chunk.page_content]
+
+    capped = expand_to_parents(ranked, store, max_parents=1, max_chars=120)
+    assert len(capped) == 1 and len(capped[0]) <= 120
+    assert dbms_children[0].page_content[:40] in capped[0]
+
+
+def test_window_centres_on_the_matching_child():
+    parent = "Intro sentence. " * 20 + "The answer is here. " + "Outro sentence. " * 20
+    window = _window(parent, "The answer is here.", 80)
+    assert "The answer is here." in window
+    assert len(window) <= 80
+
+
+def test_rag_service_parent_child_mode_end_to_end(tmp_path, monkeypatch):
+    pytest.importorskip("groq")
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    import rag_service
+
+    class _Loader:
+        def __init__(self, path):
+            self.path = path
+
+        def load(self):
+            return _pages()
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(rag_service, "PyPDFLoader", _Loader)
+    service = rag_service.RAGService(
+        groq_api_key="test",
+        embeddings=DeterministicFakeEmbedding(size=16),
+        user_index_dir=str(tmp_path / "user_indexes"),
+        chunking="parent_child",
+        parent_max_chars=2000,
+    )
+    assert service.upload_pdf("notes.pdf", user_id=7) > 2
+    assert os.path.isfile(service.user_indexes.parent_store_path(7))
+
+    context = service.query("anything", k=2, user_id=7)
+    pieces = context.split("\n\n---\n\n")
+    # Two whole sections rather than fragments, no duplicates.
+    assert sorted(pieces) == sorted(d.page_content.strip() for d in _pages())
@@ -0,0 +1,76 @@
+"""
+Tests for the SQL-aggregated APC performance report inputs (in-memory SQLite).
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chat_store import ChatTurn
+from database import APCLog, ChatHistory, User
+from report_inputs import collect_report_inputs, format_report_data
+from rollups import record_quiz_result
+
+NOW = datetime(2026, 3, 10, 18, 0)
+
+
+@pytest.fixture()
+def db(db):
+    db.add(User(id=2, username="other"))
+    db.commit()
+    return db
+
+
+def _turn(db, user_id, subject=None, session_id=None, when=NOW):
+    turn = ChatTurn(db, user_id=user_id, session_id=session_id, subject=subject)
+    for message in (turn.add_user_message("q"), turn.add_ai_message("a")):
+        message.created_at = when
+    return turn.commit()
+
+
+def test_report_inputs_are_aggregated_per_subject_tool_and_day(db):
+    dbms = _turn(db, 1, "MCS-023", when=NOW - timedelta(days=1))
+    _turn(db, 1, "MCS-023", session_id=dbms)
+    _turn(db, 1, "MCS-024", when=NOW - timedelta(days=30))  # outside the activity window
+    _turn(db, 1)
+    _turn(db, 2, "BCS-011")
+    for tool, response in (("exam_simulation", "Score=7/10 (70%)"), ("quiz", "Score 90"), ("notes", "ok")):
+        db.add(APCLog(user_id=1, tool_name=tool, response_text=response, created_at=NOW))
+        record_quiz_result(db, 1, tool, response)
+    db.commit()
+
+    inputs = collect_report_inputs(db, 1, days=7, now=NOW)
+    assert (inputs["total_sessions"], inputs["total_messages"]) == (3, 8)
+    assert (inputs["user_messages"], inputs["ai_messages"]) == (4, 4)
+    assert inputs["messages_by_subject"][0] == {"subject": "MCS-023", "sessions": 1, "messages": 4}
+    assert {r["subject"] for r in inputs["messages_by_subject"]} == {"MCS-023", "MCS-024", "unknown"}
+    assert {r["tool"]: r["uses"] for r in inputs["tool_usage"]} == {"exam_simulation": 1, "quiz": 1, "notes": 1}
+    assert inputs["avg_quiz_score"] == 80.0 and inputs["quiz_attempts"] == 2
+    assert inputs["activity_by_day"] == {"2026-03-09": 2, "2026-03-10": 4}
+    assert inputs["active_days"] == 2
+
+    text = format_report_data(inputs)
+    assert "total_messages=8" in text and "MCS-023=4 (1 sessions)" in text
+    assert "messages_per_day_last_7: 2026-03-09=2, 2026-03-10=4" in text
+
+
+def test_report_inputs_load_no_message_rows(db):
+    _turn(db, 1, "MCS-023")
+    loaded = []
+    event.listen(db, "loaded_as_persistent", lambda _session, obj: loaded.append(obj))
+    db.expunge_all()
+    inputs = collect_report_inputs(db, 1, now=NOW)
+    assert inputs["total_messages"] == 2
+    assert not any(isinstance(obj, ChatHistory) for obj in loaded)
+
+
+def test_new_user_gets_empty_inputs(db):
+    inputs = collect_report_inputs(db, 2, now=NOW)
+    assert inputs["total_sessions"] == 0 and inputs["avg_quiz_score"] is None
+    assert inputs["messages_by_subject"] == [] and inputs["activity_by_day"] == {}
+    assert "avg_quiz_score=N/A" in format_report_data(inputs)
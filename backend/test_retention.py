@@ -0,0 +1,190 @@
+"""
+Tests for the set-based chat retention engine (temporary SQLite file).
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select, text
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import ChatHistory, ChatSession, User, UserStats
+from rollups import record_chat_turn
+from retention import (
+    RetentionEngine,
+    RetentionJob,
+    RetentionPolicy,
+    build_retention_job,
+    parse_user_policies,
+    purge_sessions,
+)
+
+NOW = datetime(2026, 6, 1)
+
+
+@pytest.fixture()
+def engine(file_engine):
+    """Retention runs on a real file so incremental vacuum can be measured."""
+    return file_engine
+
+
+def _seed(engine, user_id, sessions, messages=3, text_size=10, age_days=0):
+    """Create ``sessions`` sessions for ``user_id``; returns their ids oldest first."""
+    created = NOW - timedelta(days=age_days)
+    ids = []
+    with engine.begin() as conn:
+        if conn.execute(select(User.id).where(User.id == user_id)).first() is None:
+            conn.execute(User.__table__.insert(), [{"id": user_id, "username": f"user{user_id}"}])
+        for _ in range(sessions):
+            session_id = conn.execute(
+                ChatSession.__table__.insert().values(user_id=user_id, title="chat", created_at=created)
+            ).inserted_primary_key[0]
+            conn.execute(ChatHistory.__table__.insert(), [
+                {"session_id": session_id, "sender": "user", "text": "é" * text_size, "created_at": created}
+                for _ in range(messages)
+            ])
+            record_chat_turn(conn, user_id, session_id, messages, new_session=True, at=created)
+            ids.append(session_id)
+    return ids
+
+
+def _session_ids(engine, user_id):
+    with engine.connect() as conn:
+        return [r[0] for r in conn.execute(
+            select(ChatSession.id).where(ChatSession.user_id == user_id).order_by(ChatSession.id)
+        )]
+
+
+def _message_count(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(ChatHistory)).scalar()
+
+
+def test_max_sessions_keeps_newest_per_user_in_batches(engine):
+    alice = _seed(engine, 1, sessions=5, messages=4, text_size=10)
+    bob = _seed(engine, 2, sessions=2)
+
+    retention = RetentionEngine(engine, RetentionPolicy.from_values(max_sessions=2), batch_size=3)
+    dry = retention.run_once(dry_run=True, now=NOW)
+    assert (dry["sessions_deleted"], dry["messages_deleted"]) == (3, 12)
+    assert _session_ids(engine, 1) == alice
+
+    report = retention.run_once(now=NOW)
+    assert report["sessions_deleted"] == 3
+    assert report["messages_deleted"] == 12
+    assert report["bytes_deleted"] == 12 * 20  # "é" is two bytes in UTF-8
+    assert report["batches"] > 3  # 12 messages in batches of 3, plus the session deletes
+    assert _session_ids(engine, 1) == alice[-2:]
+    assert _session_ids(engine, 2) == bob
+    assert _message_count(engine) == 2 * 4 + 2 * 3
+    assert retention.run_once(now=NOW)["sessions_deleted"] == 0
+
+
+def test_max_age_spares_old_sessions_with_recent_messages(engine):
+    stale, revived = _seed(engine, 1, sessions=2, age_days=90)
+    fresh = _seed(engine, 1, sessions=1)
+    with engine.begin() as conn:
+        conn.execute(ChatHistory.__table__.insert().values(
+            session_id=revived, sender="user", text="back again", created_at=NOW - timedelta(days=1)
+        ))
+
+    report = RetentionEngine(engine, RetentionPolicy.from_values(max_age_days=30)).run_once(now=NOW)
+    assert report["sessions_deleted"] == 1
+    assert _session_ids(engine, 1) == [revived] + fresh
+    assert stale not in _session_ids(engine, 1)
+
+
+def test_max_bytes_and_per_user_overrides(engine):
+    alice = _seed(engine, 1, sessions=4, messages=1, text_size=50)  # 100 bytes per session
+    bob = _seed(engine, 2, sessions=4, messages=1, text_size=50)
+    carol = _seed(engine, 3, sessions=1, messages=1, text_size=500)
+
+    retention = RetentionEngine(
+        engine,
+        RetentionPolicy.from_values(max_bytes=250),
+        parse_user_policies('{"2": {}}'),  # bob keeps everything
+    )
+    report = retention.run_once(now=NOW)
+    assert _session_ids(engine, 1) == alice[-2:]
+    assert _session_ids(engine, 2) == bob
+    assert _session_ids(engine, 3) == carol  # the newest session is always kept
+    assert report["bytes_deleted"] == 200
+
+
+def test_no_limits_keeps_history_but_job_still_runs_for_detached_sessions(engine):
+    _seed(engine, 1, sessions=3)
+    retention = RetentionEngine(engine, RetentionPolicy.from_values(0, 0, 0))
+    assert retention.is_noop
+    assert retention.run_once()["sessions_deleted"] == 0
+    job = RetentionJob(retention, interval_s=3600)
+    assert job.start() is True
+    assert job.status()["detached_only"] is True
+    assert RetentionJob(retention, interval_s=0).start() is False
+
+
+def test_job_reports_last_run_and_incremental_vacuum(engine, tmp_path):
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA auto_vacuum")).scalar() == 2  # INCREMENTAL on a new file
+    _seed(engine, 1, sessions=6, messages=20, text_size=2000)
+
+    job = RetentionJob(
+        RetentionEngine(engine, RetentionPolicy.from_values(max_sessions=1)),
+        interval_s=60,
+        lock_path=str(tmp_path / "retention.lock"),
+    )
+    report = job.run_now()
+    assert report["sessions_deleted"] == 5
+    assert report["vacuum"]["enabled"] is True
+    assert report["vacuum"]["bytes_reclaimed"] > 0
+    status = job.status()
+    assert status["runs"] == 1 and status["last_report"] == report and status["running"] is False
+
+
+def test_detached_sessions_are_purged_without_limits(engine):
+    cleared = _seed(engine, 1, sessions=3, messages=5)
+    kept = _seed(engine, 2, sessions=1)
+    with engine.begin() as conn:  # what DELETE /sessions does before its background purge
+        conn.execute(ChatSession.__table__.update().where(ChatSession.id.in_(cleared)).values(user_id=None))
+
+    report = RetentionEngine(engine, RetentionPolicy.from_values(), batch_size=4).run_once(now=NOW)
+    assert (report["sessions_deleted"], report["messages_deleted"]) == (3, 15)
+    assert _session_ids(engine, 2) == kept
+    assert _message_count(engine) == 3
+
+
+def test_purge_sessions_deletes_messages_in_batches(engine):
+    doomed = _seed(engine, 1, sessions=2, messages=5)
+    report = purge_sessions(engine, doomed, batch_size=4)
+    assert report == {"sessions_deleted": 2, "messages_deleted": 10, "bytes_deleted": 10 * 20, "batches": 4}
+    assert _message_count(engine) == 0
+
+
+def test_purge_keeps_dashboard_counters_in_step(engine):
+    _seed(engine, 1, sessions=4, messages=3)
+    RetentionEngine(engine, RetentionPolicy.from_values(max_sessions=1)).run_once(now=NOW)
+    with engine.connect() as conn:
+        stats = conn.execute(select(UserStats.session_count, UserStats.message_count).where(UserStats.user_id == 1)).one()
+    assert tuple(stats) == (1, 3)
+
+
+def test_malformed_user_policies_fall_back_to_the_default(engine, capsys):
+    settings = SimpleNamespace(
+        retention_max_sessions=2,
+        retention_max_age_days=0,
+        retention_max_bytes=0,
+        retention_user_policies='{"42": {"max_sessions": 500',
+        retention_batch_size=100,
+        retention_vacuum_pages=0,
+        retention_interval_min=60,
+    )
+    job = build_retention_job(engine, settings)
+    assert job.retention.user_policies == {}
+    assert job.retention.default_policy.max_sessions == 2
+    assert "ignoring RETENTION_USER_POLICIES" in capsys.readouterr().out
+
+    settings.retention_user_policies = '{"42": {"max_chats": 5}}'  # unknown limit
+    assert build_retention_job(engine, settings).retention.user_policies == {}
@@ -0,0 +1,153 @@
+"""
+Tests for /chat retrieval helpers (no vector store required).
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from retrieval import CHUNK_SEPARATOR, compress_chunks, merge_context_sections, retrieve_parallel
+
+
+class _BagOfWordsEmbeddings:
+    """Tiny deterministic embedding: word-count vector over a fixed vocabulary."""
+
+    def __init__(self, vocabulary):
+        self.vocabulary = vocabulary
+
+    def _embed(self, text):
+        words = text.lower().replace(".", " ").split()
+        return [float(words.count(w)) for w in self.vocabulary]
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def _slow(text, seconds):
+    def run():
+        time.sleep(seconds)
+        return text
+    return run
+
+
+def test_sources_run_concurrently():
+    started = time.perf_counter()
+    results = retrieve_parallel({"a": _slow("A", 0.2), "b": _slow("B", 0.2)}, timeout_s=2)
+    elapsed = time.perf_counter() - started
+    assert results == {"a": "A", "b": "B"}
+    assert elapsed < 0.35
+
+
+def test_slow_or_failing_source_is_skipped():
+    def boom():
+        raise RuntimeError("index missing")
+
+    started = time.perf_counter()
+    results = retrieve_parallel({"fast": _slow("ok", 0), "slow": _slow("late", 1.0), "bad": boom}, timeout_s=0.2)
+    assert results == {"fast": "ok"}
+    assert time.perf_counter() - started < 0.6
+
+
+
+def test_slow_primary_source_is_waited_for(capsys):
+    results = retrieve_parallel(
+        {"user_notes": _slow("note", 0), "study_material": _slow("material", 0.4)},
+        timeout_s=0.1,
+        primary="study_material",
+    )
+    assert results == {"user_notes": "note", "study_material": "material"}
+    assert "WARNING 'study_material' timed out" in capsys.readouterr().out
+
+
+def test_primary_grace_is_bounded_and_only_for_a_named_source():
+    started = time.perf_counter()
+    results = retrieve_parallel(
+        {"user_notes": _slow("note", 0), "study_material": _slow("material", 1.0)},
+        timeout_s=0.1,
+        primary="study_material",
+        primary_grace_s=0.1,
+    )
+    assert results == {"user_notes": "note"}
+    assert time.perf_counter() - started < 0.6
+
+    # No study material requested: user notes get the plain deadline.
+    results = retrieve_parallel({"user_notes": _slow("late", 1.0)}, timeout_s=0.1, primary="study_material")
+    assert results == {}
+
+
+def test_merge_respects_shared_budget():
+    long_text = CHUNK_SEPARATOR.join(["x" * 300] * 10)
+    merged = merge_context_sections([("study_material", long_text), ("user_notes", "short note")], budget_chars=1000)
+    assert len(merged) <= 1000
+    assert merged.startswith("[STUDY MATERIAL]\n")
+    assert merged.endswith("[USER NOTES]\nshort note")
+    # Cut on a chunk boundary, not mid-chunk.
+    assert merged.split("\n\n[USER NOTES]")[0].endswith("x")
+    assert "---\n\n[USER NOTES]" not in merged
+
+
+def test_merge_skips_empty_sections():
+    assert merge_context_sections([("a", ""), ("b", "  ")]) == ""
+    assert merge_context_sections([("a", "only")], labels={"a": "NOTES"}) == "[NOTES]\nonly"
+
+
+VOCAB = ["bcnf", "normal", "form", "key", "java", "applet", "ignou", "university", "dependency"]
+
+
+def test_compression_drops_near_duplicates_and_overlap():
+    first = "BCNF is a stricter normal form. Every determinant must be a candidate key."
+    duplicate = "bcnf is a stricter normal form. every determinant must be a candidate key."
+    overlapping = "Every determinant must be a candidate key. BCNF removes dependency anomalies."
+    compressed = compress_chunks("what is bcnf", [first, duplicate, overlapping], _BagOfWordsEmbeddings(VOCAB), token_budget=500)
+
+    parts = compressed.split(CHUNK_SEPARATOR)
+    assert len(parts) == 2
+    assert parts[0] == first
+    assert parts[1] == "BCNF removes dependency anomalies."
+
+
+def test_compression_keeps_query_relevant_sentences_within_budget():
+    chunk = (
+        "IGNOU is a university. "
+        "BCNF is a normal form based on keys. "
+        "Java applet runs in a browser."
+    )
+    compressed = compress_chunks("bcnf normal form", [chunk], _BagOfWordsEmbeddings(VOCAB), token_budget=12)
+    assert compressed == "BCNF is a normal form based on keys."
+
+
+class _CountingEmbeddings(_BagOfWordsEmbeddings):
+    def __init__(self, vocabulary):
+        super().__init__(vocabulary)
+        self.document_batches = []
+
+    def embed_documents(self, texts):
+        self.document_batches.append(len(texts))
+        return super().embed_documents(texts)
+
+
+def test_compression_caps_the_sentences_it_embeds():
+    chunks = [" ".join(f"Sentence {i} about {topic}." for i in range(30)) for topic in ("bcnf", "java", "applet", "ignou")]
+    embeddings = _CountingEmbeddings(VOCAB)
+    compressed = compress_chunks("java", chunks, embeddings, token_budget=100, max_sentences=25)
+    assert embeddings.document_batches == [4, 25]  # the chunks, then at most 25 sentences
+    assert 0 < len(compressed) <= 400
+    assert "java" not in compressed  # only the top-ranked chunk's sentences were candidates
+
+    # Context that already fits the budget is returned without scoring any sentence.
+    embeddings = _CountingEmbeddings(VOCAB)
+    assert compress_chunks("bcnf", ["BCNF is a normal form.", "Keys matter."], embeddings, token_budget=100) == (
+        "BCNF is a normal form." + CHUNK_SEPARATOR + "Keys matter."
+    )
+    assert embeddings.document_batches == [2]
+
+
+def test_compression_without_embeddings_falls_back_to_clipping():
+    chunks = ["a" * 100, "b" * 100]
+    assert compress_chunks("q", chunks, None, token_budget=1000) == CHUNK_SEPARATOR.join(chunks)
+    assert len(compress_chunks("q", chunks, None, token_budget=10)) <= 40
@@ -0,0 +1,86 @@
+"""
+Tests for the retrieval sidecar API and its thin client (in-process, fake embeddings).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("langchain_community.vectorstores")
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from embeddings import MicroBatchingEmbeddings
+from retrieval_client import RemoteEmbeddings, RetrievalClient, SidecarUnavailableError
+from retrieval_sidecar import create_app
+from vector_index import HotSwapStore, export_sqlite_docstore, load_study_store
+
+TEXTS = ["stack push pop", "queue enqueue", "binary tree", "deadlock", "paging"]
+
+
+def _client(tmp_path, with_index=True):
+    from langchain_community.vectorstores import FAISS
+
+    embeddings = DeterministicFakeEmbedding(size=16)
+    index_dir = tmp_path / "db_faiss"
+    if with_index:
+        store = FAISS.from_documents(
+            [Document(page_content=t, metadata={"category": "book", "n": i}) for i, t in enumerate(TEXTS)], embeddings
+        )
+        store.save_local(str(index_dir))
+        export_sqlite_docstore(str(index_dir), store)
+    holder = HotSwapStore(str(index_dir), lambda path: load_study_store(path, embeddings),
+                          snapshots_dir=str(tmp_path / "snapshots"), poll_interval_s=0)
+    holder.reload()
+    app = create_app(holder, MicroBatchingEmbeddings(embeddings, max_wait_ms=1))
+    return RetrievalClient("http://testserver", http_client=TestClient(app)), holder, embeddings
+
+
+def test_client_search_matches_local_store(tmp_path):
+    client, holder, _ = _client(tmp_path)
+    local = holder.current()
+    for query in ("stack", "paging", "anything at all"):
+        expected = [(d.page_content, d.metadata, round(s, 4)) for d, s in local.similarity_search_with_score(query, k=3)]
+        actual = [(d.page_content, d.metadata, round(s, 4)) for d, s in client.similarity_search_with_score(query, k=3)]
+        assert actual == expected
+    assert [d.page_content for d in client.similarity_search("deadlock", k=1)] == ["deadlock"]
+
+
+def test_batched_search_and_remote_embeddings(tmp_path):
+    client, _, embeddings = _client(tmp_path)
+    batches = client.search_batch(["binary tree", "queue enqueue"], k=1)
+    assert [hits[0][0].page_content for hits in batches] == ["binary tree", "queue enqueue"]
+
+    remote = RemoteEmbeddings(client)
+    assert remote.embed_query("stack") == pytest.approx(embeddings.embed_query("stack"))
+    for got, want in zip(remote.embed_documents(["a", "b"]), embeddings.embed_documents(["a", "b"])):
+        assert got == pytest.approx(want)
+    assert remote.embed_documents([]) == []
+
+
+def test_health_reports_store_and_missing_index_is_503(tmp_path):
+    client, _, _ = _client(tmp_path)
+    status = client.status()
+    assert status["store"]["version"].startswith("db_faiss@")
+    assert status["embedding_batcher"]["max_batch"] == 32
+
+    empty_client, _, _ = _client(tmp_path / "empty", with_index=False)
+    with pytest.raises(Exception) as exc:
+        empty_client.similarity_search("stack")
+    assert "503" in str(exc.value)
+
+
+def test_admin_calls_name_the_sidecar_when_it_is_down(tmp_path):
+    url = f"unix://{tmp_path / 'missing.sock'}"
+    client = RetrievalClient(url)
+    with pytest.raises(SidecarUnavailableError) as exc:
+        client.status()
+    assert exc.value.url == url and url in str(exc.value)
+    with pytest.raises(SidecarUnavailableError):
+        client.reload()
+    client.close()
@@ -0,0 +1,76 @@
+"""
+Tests for the compiled syllabus topic matcher and incremental coverage rows (in-memory SQLite).
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chat_store import ChatTurn
+from database import TopicCoverage
+from topic_coverage import TopicMatcher, coverage_history, record_topic_coverage
+
+TOPICS = {
+    "MCS-023": ["Normalization", "ER Model", "SQL", "Transactions"],
+    "MCS-024": ["Exception Handling", "Threads"],
+    "MCS-012": ["Memory", "Cache Memory"],
+    "BCS-011": ["Memory"],
+}
+
+
+def test_matcher_finds_all_topics_in_one_pass_like_substring_search():
+    matcher = TopicMatcher(TOPICS)
+    text = "Cache memory vs threads; also SQLite transactions and er models"
+    assert matcher.match(text) == {
+        ("MCS-012", "Cache Memory"),
+        ("MCS-012", "Memory"),  # contained in the longer match
+        ("BCS-011", "Memory"),  # same topic name in two subjects
+        ("MCS-024", "Threads"),
+        ("MCS-023", "SQL"),
+        ("MCS-023", "Transactions"),
+        ("MCS-023", "ER Model"),
+    }
+    assert matcher.match("nothing relevant here") == set()
+    assert TopicMatcher({}).match("sql") == set()
+
+
+def test_matcher_agrees_with_the_old_scan_on_the_real_syllabus():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "syllabus_topics.json"), encoding="utf-8") as f:
+        syllabus = json.load(f)
+    matcher = TopicMatcher(syllabus)
+    text = " ".join(t for topics in list(syllabus.values())[::3] for t in topics).upper() + " filler words"
+    expected = {(s.upper(), t) for s, topics in syllabus.items() for t in topics if t.lower() in text.lower()}
+    assert matcher.match(text) == expected
+
+
+def test_turns_record_first_and_last_seen_and_hits(db):
+    matcher = TopicMatcher(TOPICS)
+    first = ChatTurn(db, user_id=1, topic_matcher=matcher)
+    first.add_user_message("explain normalization")
+    first.add_ai_message("Normalization removes redundancy; SQL keys help.")
+    for message in first._messages:
+        message.created_at = datetime(2026, 1, 1, 9)
+    session_id = first.commit()
+    second = ChatTurn(db, user_id=1, session_id=session_id, topic_matcher=matcher)
+    second.add_user_message("and normalization in practice?")
+    second.add_ai_message("Use SQL constraints.")
+    for message in second._messages:
+        message.created_at = datetime(2026, 1, 5, 9)
+    second.commit()
+
+    rows = {r.topic: r for r in db.query(TopicCoverage).filter(TopicCoverage.user_id == 1)}
+    assert set(rows) == {"Normalization", "SQL"}
+    assert rows["Normalization"].hits == 3
+    assert rows["Normalization"].first_seen_at == datetime(2026, 1, 1, 9)
+    assert rows["Normalization"].last_seen_at == datetime(2026, 1, 5, 9)
+
+    assert record_topic_coverage(db, matcher, 1, ["Threads!"], at=datetime(2026, 1, 6)) == {("MCS-024", "Threads")}
+    db.commit()
+    history = coverage_history(r.first_seen_at for r in db.query(TopicCoverage))
+    assert history == [
+        {"date": "2026-01-01", "new_topics": 2, "covered_count": 2},
+        {"date": "2026-01-06", "new_topics": 1, "covered_count": 3},
+    ]
@@ -0,0 +1,251 @@
+"""
+Tests for the sharded FAISS store and per-user namespaces (deterministic fake embeddings).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("langchain_community.vectorstores")
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from user_indexes import NamespacedIndexManager
+from vector_index import ShardedFAISSStore
+
+
+def _docs(*texts):
+    return [Document(page_content=t, metadata={"source": t}) for t in texts]
+
+
+def test_uploads_write_delta_shards_only(tmp_path):
+    base_dir = str(tmp_path / "faiss_index")
+    store = ShardedFAISSStore(base_dir, DeterministicFakeEmbedding(size=16), compact_threshold=100)
+    assert store.is_empty
+
+    store.add_documents(_docs("stack", "queue"))
+    store.add_documents(_docs("tree"))
+
+    assert not os.path.exists(base_dir)
+    assert len(os.listdir(store.delta_root)) == 2
+    assert {d.page_content for d in store.similarity_search("anything", k=10)} == {"stack", "queue", "tree"}
+    assert store.similarity_search("tree", k=1)[0].page_content == "tree"
+
+
+def test_compaction_folds_deltas_into_base(tmp_path):
+    base_dir = str(tmp_path / "faiss_index")
+    embeddings = DeterministicFakeEmbedding(size=16)
+    store = ShardedFAISSStore(base_dir, embeddings, compact_threshold=100)
+    store.add_documents(_docs("stack"))
+    store.add_documents(_docs("queue"))
+    store.add_documents(_docs("tree"))
+
+    assert store.compact() == 3
+    assert store.deltas == []
+    assert os.listdir(store.delta_root) == []
+
+    reloaded = ShardedFAISSStore(base_dir, embeddings, compact_threshold=100)
+    assert {d.page_content for d in reloaded.similarity_search("x", k=10)} == {"stack", "queue", "tree"}
+
+
+def test_workers_sharing_a_store_see_each_others_deltas_and_compactions(tmp_path):
+    from vector_index import try_flock
+
+    base_dir = str(tmp_path / "faiss_index")
+    embeddings = DeterministicFakeEmbedding(size=16)
+    worker_a = ShardedFAISSStore(base_dir, embeddings, compact_threshold=100)
+    worker_b = ShardedFAISSStore(base_dir, embeddings, compact_threshold=100)
+
+    worker_a.add_documents(_docs("stack"))
+    worker_b.add_documents(_docs("queue"))
+    assert {d.page_content for d in worker_b.similarity_search("x", k=10)} == {"stack", "queue"}
+
+    # Another process holds the compaction lock: nothing is merged or deleted.
+    held = try_flock(worker_a.lock_path)
+    assert worker_b.compact() == 0
+    held.close()
+    assert len(os.listdir(worker_b.delta_root)) == 2
+
+    assert worker_b.compact() == 2
+    worker_a.add_documents(_docs("tree"))  # written after B's compaction, kept as a delta
+    assert worker_a.compact() == 1
+    for store in (worker_a, worker_b):
+        assert sorted(d.page_content for d in store.similarity_search("x", k=10)) == ["queue", "stack", "tree"]
+    assert worker_b.deltas == [] and os.listdir(worker_b.delta_root) == []
+
+
+def test_threshold_triggers_background_compaction(tmp_path):
+    base_dir = str(tmp_path / "faiss_index")
+    store = ShardedFAISSStore(base_dir, DeterministicFakeEmbedding(size=16), compact_threshold=2)
+    store.add_documents(_docs("stack"))
+    store.add_documents(_docs("queue"))
+    store._compaction_thread.join(timeout=10)
+
+    assert store.deltas == []
+    assert os.path.isfile(os.path.join(base_dir, "index.faiss"))
+    assert len(store.similarity_search("x", k=10)) == 2
+
+
+def test_user_namespaces_are_isolated_and_lazy(tmp_path):
+    manager = NamespacedIndexManager(str(tmp_path / "user_indexes"), DeterministicFakeEmbedding(size=16))
+    assert manager.get(1) is None
+    manager.add_documents(1, _docs("my dbms notes"))
+    manager.add_documents(2, _docs("someone else's notes"))
+    manager.add_documents(1, _docs("bcnf summary"), subject="MCS-023")
+
+    fresh = NamespacedIndexManager(str(tmp_path / "user_indexes"), DeterministicFakeEmbedding(size=16))
+    assert fresh.metrics()["resident_namespaces"] == 0
+    general = [d.page_content for d, _ in fresh.similarity_search_with_score(1, "notes", k=10)]
+    assert general == ["my dbms notes"]
+    both = {d.page_content for d, _ in fresh.similarity_search_with_score(1, "notes", k=10, subject="MCS-023")}
+    assert both == {"my dbms notes", "bcnf summary"}
+    assert fresh.metrics()["loads"] == 2
+
+
+def test_cached_namespace_sees_uploads_from_another_worker(tmp_path):
+    root = str(tmp_path / "user_indexes")
+    worker_a = NamespacedIndexManager(root, DeterministicFakeEmbedding(size=16))
+    worker_b = NamespacedIndexManager(root, DeterministicFakeEmbedding(size=16))
+    assert worker_b.get(1, create=True).is_empty  # cached while the user had no notes yet
+    assert worker_b.metrics()["resident_bytes"] == 0
+
+    worker_a.add_documents(1, _docs("my dbms notes"))
+    worker_a.add_documents(1, _docs("bcnf summary"))
+    assert {d.page_content for d, _ in worker_b.similarity_search_with_score(1, "x", k=5)} == {
+        "my dbms notes", "bcnf summary"
+    }
+    metrics = worker_b.metrics()
+    assert metrics["loads"] == 1 and metrics["resident_bytes"] > 0
+
+
+def test_user_namespaces_lru_eviction(tmp_path):
+    manager = NamespacedIndexManager(str(tmp_path / "user_indexes"), DeterministicFakeEmbedding(size=16), max_resident=2)
+    for user_id in (1, 2, 3):
+        manager.add_documents(user_id, _docs(f"notes of {user_id}"))
+
+    metrics = manager.metrics()
+    assert metrics["resident_namespaces"] == 2
+    assert metrics["evictions"] == 1
+    assert [n["namespace"] for n in metrics["namespaces"]] == ["u3/_all", "u2/_all"]
+
+    # Evicted namespaces reload transparently from disk.
+    assert manager.get(1) is not None
+    assert manager.metrics()["evictions"] == 2
+
+
+def test_mmap_store_matches_pickled_store(tmp_path):
+    from langchain_community.vectorstores import FAISS
+
+    from vector_index import DOCSTORE_SQLITE, MmapFAISSStore, export_sqlite_docstore, load_study_store
+
+    embeddings = DeterministicFakeEmbedding(size=16)
+    index_dir = str(tmp_path / "db_faiss")
+    docs = [Document(page_content=t, metadata={"category": "book", "n": i}) for i, t in enumerate(["stack", "queue", "tree", "graph"])]
+    FAISS.from_documents(docs, embeddings).save_local(index_dir)
+
+    assert not isinstance(load_study_store(index_dir, embeddings), MmapFAISSStore)
+    export_sqlite_docstore(index_dir)
+    assert os.path.isfile(os.path.join(index_dir, DOCSTORE_SQLITE))
+
+    pickled = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+    mapped = load_study_store(index_dir, embeddings)
+    assert isinstance(mapped, MmapFAISSStore)
+    for query in ("stack", "graph", "anything"):
+        expected = [(d.page_content, d.metadata, round(s, 4)) for d, s in pickled.similarity_search_with_score(query, k=3)]
+        actual = [(d.page_content, d.metadata, round(s, 4)) for d, s in mapped.similarity_search_with_score(query, k=3)]
+        assert actual == expected
+
+
+def test_mmap_store_keeps_its_docstore_when_the_index_is_swapped(tmp_path):
+    import threading
+
+    from vector_index import load_study_store, publish_index_atomically
+
+    embeddings = DeterministicFakeEmbedding(size=16)
+    index_dir = str(tmp_path / "db_faiss")
+    publish_index_atomically(_build_index(tmp_path, ["stack", "queue", "tree"], embeddings), index_dir)
+    live = load_study_store(index_dir, embeddings)
+    before = [d.page_content for d in live.similarity_search("stack", k=3)]
+
+    # Same positions, different chunks: a mixed-up docstore would return these texts.
+    publish_index_atomically(_build_index(tmp_path, ["alpha", "beta", "gamma"], embeddings), index_dir)
+    results = []
+    worker = threading.Thread(target=lambda: results.append([d.page_content for d in live.similarity_search("stack", k=3)]))
+    worker.start()
+    worker.join()
+    assert results == [before] and set(before) == {"stack", "queue", "tree"}
+    assert {d.page_content for d in load_study_store(index_dir, embeddings).similarity_search("x", k=3)} == {"alpha", "beta", "gamma"}
+
+
+def _build_index(parent, texts, embeddings):
+    from langchain_community.vectorstores import FAISS
+
+    from vector_index import export_sqlite_docstore, make_build_dir
+
+    build_dir = make_build_dir(str(parent / "next"))
+    store = FAISS.from_documents(_docs(*texts), embeddings)
+    store.save_local(build_dir)
+    export_sqlite_docstore(build_dir, store)
+    return build_dir
+
+
+def test_hot_swap_store_serves_new_snapshot_without_restart(tmp_path):
+    from vector_index import HotSwapStore, load_study_store, publish_snapshot, resolve_snapshot
+
+    embeddings = DeterministicFakeEmbedding(size=16)
+    snapshots = tmp_path / "snapshots"
+    snapshots.mkdir()
+    v1 = publish_snapshot(_build_index(snapshots, ["stack", "queue"], embeddings), str(snapshots), version="v1")
+    holder = HotSwapStore(str(tmp_path / "db_faiss"), lambda path: load_study_store(path, embeddings),
+                          snapshots_dir=str(snapshots), poll_interval_s=0)
+
+    status = holder.reload()
+    assert status["version"] == v1 and status["load_ms"] is not None
+    in_flight = holder.current()
+    assert holder.reload() == status  # unchanged version is a no-op
+
+    publish_snapshot(_build_index(snapshots, ["tree", "graph"], embeddings), str(snapshots), version="v2")
+    assert resolve_snapshot(str(snapshots))[0] == "v2"
+    status = holder.reload()
+    assert status["version"] == "v2" and status["reloads"] == 1
+    assert {d.page_content for d in holder.current().similarity_search("x", k=10)} == {"tree", "graph"}
+    # A request that grabbed the old store before the swap still completes on it.
+    assert {d.page_content for d in in_flight.similarity_search("x", k=10)} == {"stack", "queue"}
+
+
+def test_hot_swap_keeps_serving_when_new_version_fails_to_load(tmp_path):
+    from vector_index import HotSwapStore, load_study_store, publish_snapshot
+
+    embeddings = DeterministicFakeEmbedding(size=16)
+    snapshots = tmp_path / "snapshots"
+    snapshots.mkdir()
+    publish_snapshot(_build_index(snapshots, ["stack"], embeddings), str(snapshots), version="v1")
+
+    def loader(path):
+        if path.endswith("v2"):
+            raise RuntimeError("corrupt index")
+        return load_study_store(path, embeddings)
+
+    holder = HotSwapStore(str(tmp_path / "db_faiss"), loader, snapshots_dir=str(snapshots), poll_interval_s=0)
+    holder.reload()
+    publish_snapshot(_build_index(snapshots, ["tree"], embeddings), str(snapshots), version="v2")
+
+    status = holder.reload()
+    assert status["version"] == "v1"
+    assert "corrupt index" in status["last_error"]
+    assert holder.current().similarity_search("x", k=1)[0].page_content == "stack"
+
+
+def test_publish_snapshot_prunes_old_versions(tmp_path):
+    from vector_index import SNAPSHOT_POINTER, publish_snapshot
+
+    embeddings = DeterministicFakeEmbedding(size=16)
+    snapshots = tmp_path / "snapshots"
+    snapshots.mkdir()
+    for version in ("v1", "v2", "v3"):
+        publish_snapshot(_build_index(snapshots, [version], embeddings), str(snapshots), version=version, keep=2)
+    assert sorted(os.listdir(snapshots)) == [SNAPSHOT_POINTER, "v2", "v3"]
+    assert (snapshots / SNAPSHOT_POINTER).read_text() == "v3"
@@ -0,0 +1,105 @@
+"""
+Incremental syllabus topic coverage.
+
+``TopicMatcher`` compiles every topic of ``syllabus_topics.json`` into one
+``KeywordMatcher``, so a message is scanned once for all subjects instead of
+once per topic. ``record_topic_coverage`` runs it on the messages of a chat
+turn and upserts one ``topic_coverage`` row per (user, subject, topic) with
+first/last-seen times and a hit count, in the turn's own transaction.
+``/syllabus-progress`` then reads those rows with a single indexed query.
+
+Matching keeps the old semantics: a topic is covered when its name appears
+anywhere in a message, case-insensitively.
+"""
+
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import select
+
+from database import TopicCoverage
+from keyword_matcher import KeywordMatcher
+
+
+class TopicMatcher:
+    """Finds which (subject, topic) pairs occur in a text, in one regex pass."""
+
+    def __init__(self, subject_topics: dict[str, list[str]]):
+        self._owners: dict[str, list[tuple[str, str]]] = {}
+        for subject, topics in subject_topics.items():
+            for topic in topics:
+                key = str(topic).strip().lower()
+                if key:
+                    self._owners.setdefault(key, []).append((str(subject).upper(), str(topic)))
+        self._keywords = KeywordMatcher(self._owners)
+
+    def match_keys(self, text: str) -> set[str]:
+        return set(self._keywords.find(text))
+
+    def match(self, text: str) -> set[tuple[str, str]]:
+        """``{(subject_code, topic), ...}`` mentioned in ``text``."""
+        return {owner for key in self.match_keys(text) for owner in self._owners[key]}
+
+
+def _upsert_coverage(db: Any, rows: list[dict[str, Any]]) -> None:
+    table = TopicCoverage.__table__
+    dialect = (getattr(db, "dialect", None) or db.get_bind().dialect).name
+    if dialect in {"sqlite", "postgresql"}:
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.subject, table.c.topic],
+                set_={"last_seen_at": stmt.excluded.last_seen_at, "hits": table.c.hits + stmt.excluded.hits},
+            ),
+            rows,
+        )
+        return
+    for row in rows:
+        existing = db.execute(
+            select(table.c.id).where(
+                table.c.user_id == row["user_id"], table.c.subject == row["subject"], table.c.topic == row["topic"]
+            )
+        ).first()
+        if existing is None:
+            db.execute(table.insert().values(**row))
+        else:
+            db.execute(
+                table.update()
+                .where(table.c.id == existing[0])
+                .values(last_seen_at=row["last_seen_at"], hits=table.c.hits + row["hits"])
+            )
+
+
+def record_topic_coverage(
+    db: Any, matcher: TopicMatcher, user_id: int, texts: Iterable[str], at: Optional[datetime] = None
+) -> set[tuple[str, str]]:
+    """Mark the topics mentioned in ``texts`` as covered by ``user_id``; returns them."""
+    hits: dict[tuple[str, str], int] = {}
+    for text in texts:
+        for pair in matcher.match(text):
+            hits[pair] = hits.get(pair, 0) + 1
+    if hits:
+        at = at or datetime.utcnow()
+        _upsert_coverage(db, [
+            {"user_id": user_id, "subject": subject, "topic": topic, "first_seen_at": at, "last_seen_at": at, "hits": n}
+            for (subject, topic), n in sorted(hits.items())
+        ])
+    return set(hits)
+
+
+def coverage_history(first_seen: Iterable[Optional[datetime]]) -> list[dict[str, Any]]:
+    """Cumulative covered-topic count per day a new topic was first seen."""
+    per_day: dict[str, int] = {}
+    for at in first_seen:
+        if at is not None:
+            day = at.date().isoformat()
+            per_day[day] = per_day.get(day, 0) + 1
+    history, total = [], 0
+    for day in sorted(per_day):
+        total += per_day[day]
+        history.append({"date": day, "new_topics": per_day[day], "covered_count": total})
+    return history
@@ -0,0 +1,184 @@
+"""
+Per-user (and optionally per-subject) vector namespaces for uploaded notes.
+
+Each namespace is a ShardedFAISSStore stored under
+``<root>/u<user_id>/<subject or _all>``. Namespaces are loaded lazily on first
+use and kept in an LRU that is trimmed to a resident-memory ceiling, so only
+recently active users occupy RAM. A cached namespace is rescanned on every
+access (``ShardedFAISSStore.refresh``), so notes uploaded through another
+worker are searchable right away.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from vector_index import ShardedFAISSStore
+
+GENERAL_NAMESPACE = "_all"
+
+
+def _namespace_key(user_id: int, subject: Optional[str] = None) -> str:
+    subject_key = re.sub(r"[^a-z0-9-]+", "_", str(subject or "").strip().lower()).strip("_")
+    return f"u{int(user_id)}/{subject_key or GENERAL_NAMESPACE}"
+
+
+def _dir_size_bytes(path: str) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class NamespacedIndexManager:
+    """Lazy-loading LRU cache of per-user vector namespaces.
+
+    Resident size is estimated from the namespace's on-disk footprint (FAISS
+    vectors plus pickled docstore), which tracks its in-memory size closely.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        embeddings: Any,
+        max_resident_bytes: int = 256 * 1024 * 1024,
+        max_resident: int = 64,
+        compact_threshold: int = 8,
+    ):
+        self.root_dir = root_dir
+        self.embeddings = embeddings
+        self.max_resident_bytes = max(0, int(max_resident_bytes))
+        self.max_resident = max(1, int(max_resident))
+        self.compact_threshold = compact_threshold
+        self._resident: "OrderedDict[str, dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "loads": 0, "evictions": 0, "load_seconds": 0.0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root_dir, *key.split("/"))
+
+    def _exists_on_disk(self, key: str) -> bool:
+        path = self._path(key)
+        return os.path.isdir(path) or os.path.isdir(f"{path}_deltas")
+
+    def _footprint(self, key: str) -> int:
+        path = self._path(key)
+        return _dir_size_bytes(path) + _dir_size_bytes(f"{path}_deltas")
+
+    def get(self, user_id: int, subject: Optional[str] = None, create: bool = False) -> Optional[ShardedFAISSStore]:
+        """Return the namespace store, loading it from disk on first use."""
+        key = _namespace_key(user_id, subject)
+        with self._lock:
+            entry = self._resident.get(key)
+            if entry is not None:
+                self._resident.move_to_end(key)
+                self._stats["hits"] += 1
+            else:
+                self._stats["misses"] += 1
+        if entry is not None:
+            if entry["store"].refresh():
+                # Another worker added or compacted shards: re-measure and re-apply the budget.
+                with self._lock:
+                    entry["bytes"] = self._footprint(key)
+                    self._evict_locked(keep=key)
+            return entry["store"]
+
+        if not create and not self._exists_on_disk(key):
+            return None
+
+        started = time.perf_counter()
+        os.makedirs(os.path.dirname(self._path(key)), exist_ok=True)
+        store = ShardedFAISSStore(self._path(key), self.embeddings, compact_threshold=self.compact_threshold)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            # Another request may have loaded the same namespace while we were reading it.
+            entry = self._resident.get(key)
+            if entry is not None:
+                self._resident.move_to_end(key)
+                return entry["store"]
+            self._resident[key] = {"store": store, "bytes": self._footprint(key), "loaded_at": time.time()}
+            self._stats["loads"] += 1
+            self._stats["load_seconds"] += elapsed
+            self._evict_locked(keep=key)
+        return store
+
+    def _evict_locked(self, keep: str) -> None:
+        def over_budget() -> bool:
+            resident_bytes = sum(e["bytes"] for e in self._resident.values())
+            return len(self._resident) > self.max_resident or (
+                self.max_resident_bytes > 0 and resident_bytes > self.max_resident_bytes
+            )
+
+        while len(self._resident) > 1 and over_budget():
+            oldest = next(iter(self._resident))
+            if oldest == keep:
+                break
+            self._resident.pop(oldest)
+            self._stats["evictions"] += 1
+
+    def add_documents(self, user_id: int, docs: list[Any], subject: Optional[str] = None) -> int:
+        store = self.get(user_id, subject, create=True)
+        if store is None:
+            return 0
+        added = store.add_documents(docs)
+        key = _namespace_key(user_id, subject)
+        with self._lock:
+            entry = self._resident.get(key)
+            if entry is not None:
+                entry["bytes"] = self._footprint(key)
+            self._evict_locked(keep=key)
+        return added
+
+    def similarity_search_with_score(
+        self,
+        user_id: int,
+        query: str,
+        k: int = 4,
+        subject: Optional[str] = None,
+    ) -> list[tuple[Any, float]]:
+        """Search the user's general namespace plus the subject namespace, if any."""
+        stores = [self.get(user_id)]
+        if subject and _namespace_key(user_id, subject) != _namespace_key(user_id):
+            stores.append(self.get(user_id, subject))
+
+        hits: list[tuple[Any, float]] = []
+        for store in stores:
+            if store is not None and not store.is_empty:
+                hits.extend(store.similarity_search_with_score(query, k=k))
+        hits.sort(key=lambda hit: float(hit[1]))
+        return hits[:k]
+
+    def parent_store_path(self, user_id: int) -> str:
+        """SQLite file holding the user's parent sections (shared by all their namespaces)."""
+        return os.path.join(self.root_dir, f"u{int(user_id)}", "parents.sqlite")
+
+    def evict(self, user_id: int, subject: Optional[str] = None) -> bool:
+        with self._lock:
+            return self._resident.pop(_namespace_key(user_id, subject), None) is not None
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "resident_namespaces": len(self._resident),
+                "resident_bytes": sum(e["bytes"] for e in self._resident.values()),
+                "max_resident": self.max_resident,
+                "max_resident_bytes": self.max_resident_bytes,
+                "hits": self._stats["hits"],
+                "misses": self._stats["misses"],
+                "loads": self._stats["loads"],
+                "evictions": self._stats["evictions"],
+                "avg_load_ms": round(1000.0 * self._stats["load_seconds"] / self._stats["loads"], 2)
+                if self._stats["loads"]
+                else 0.0,
+                "namespaces": [
+                    {"namespace": key, "bytes": e["bytes"]} for key, e in reversed(self._resident.items())
+                ],
+            }
@@ -0,0 +1,618 @@
+"""
+Shared helpers for the on-disk FAISS indexes used by BCABuddy.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Optional
+
+
+def make_build_dir(target_dir: str) -> str:
+    """Create an empty staging directory next to ``target_dir``.
+
+    Staging on the same filesystem keeps the final publish a plain rename.
+    """
+    target = os.path.abspath(target_dir)
+    parent = os.path.dirname(target)
+    os.makedirs(parent, exist_ok=True)
+    return tempfile.mkdtemp(prefix=f".{os.path.basename(target)}.build-", dir=parent)
+
+
+def publish_index_atomically(build_dir: str, target_dir: str) -> None:
+    """Move a fully written index from ``build_dir`` into ``target_dir``.
+
+    The previous index is renamed aside first and only removed once the new
+    one is in place, so readers never observe a half-written directory. If the
+    swap fails the previous index is restored.
+    """
+    target = os.path.abspath(target_dir)
+    build = os.path.abspath(build_dir)
+    if not os.path.isfile(os.path.join(build, "index.faiss")):
+        raise FileNotFoundError(f"Refusing to publish incomplete index at {build}")
+
+    backup = None
+    if os.path.exists(target):
+        backup = f"{target}.old-{int(time.time() * 1000)}"
+        os.replace(target, backup)
+    try:
+        os.replace(build, target)
+    except Exception:
+        if backup is not None:
+            os.replace(backup, target)
+        raise
+    if backup is not None:
+        shutil.rmtree(backup, ignore_errors=True)
+
+
+COMPACTION_MANIFEST = "compacted.json"
+
+
+def _file_signature(path: str) -> Optional[tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def try_flock(path: str) -> Optional[Any]:
+    """Non-blocking exclusive ``flock`` on ``path``; ``None`` if another process holds it."""
+    try:
+        import fcntl
+    except ImportError:  # Windows dev setups run a single worker
+        return True
+    handle = open(path, "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+class ShardedFAISSStore:
+    """FAISS store made of one base index plus small append-only delta shards.
+
+    ``add_documents`` writes only the new chunks as a delta shard, so upload
+    cost no longer grows with corpus size. Searches fan out over every shard
+    and merge by distance. Once ``compact_threshold`` deltas accumulate, a
+    background thread folds them into the base and publishes it atomically.
+
+    The directories are the source of truth, so several API workers can share
+    one store: each search and compaction first rescans the base (by inode and
+    mtime) and the delta directory, loading only what changed. Only one process
+    compacts at a time (``flock`` on ``<base_dir>.compact.lock``). It works from the deltas
+    on disk at that moment, so a delta written meanwhile by another worker is
+    neither deleted nor merged twice.
+    """
+
+    def __init__(self, base_dir: str, embeddings: Any, compact_threshold: int = 8):
+        self.base_dir = base_dir
+        self.delta_root = f"{base_dir}_deltas"
+        self.lock_path = f"{base_dir}.compact.lock"
+        self.embeddings = embeddings
+        self.compact_threshold = max(1, int(compact_threshold or 1))
+        self.base: Any = None
+        self.deltas: list[tuple[str, Any]] = []
+        self._lock = threading.RLock()
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._base_signature: Optional[tuple[int, int, int]] = None
+        self._delta_names: frozenset[str] = frozenset()
+        self.load()
+
+    def _load_dir(self, path: str) -> Any:
+        from langchain_community.vectorstores import FAISS
+        return FAISS.load_local(path, self.embeddings, allow_dangerous_deserialization=True)
+
+    def _compacted_names(self) -> set[str]:
+        try:
+            with open(os.path.join(self.base_dir, COMPACTION_MANIFEST), "r", encoding="utf-8") as f:
+                return set(json.load(f).get("deltas", []))
+        except Exception:
+            return set()
+
+    def _base_index_signature(self) -> Optional[tuple[int, int, int]]:
+        return _file_signature(os.path.join(self.base_dir, "index.faiss"))
+
+    def _delta_names_on_disk(self) -> frozenset[str]:
+        try:
+            entries = os.listdir(self.delta_root)
+        except OSError:
+            return frozenset()
+        return frozenset(
+            name for name in entries
+            if not name.startswith(".") and os.path.isdir(os.path.join(self.delta_root, name))
+        )
+
+    def load(self) -> None:
+        """Sync with the directories, reusing shards that are already loaded."""
+        base_signature = self._base_index_signature()
+        with self._lock:
+            base = self.base
+            loaded = dict(self.deltas)
+        if base_signature != self._base_signature or base is None:
+            base = None
+            if os.path.isdir(self.base_dir):
+                try:
+                    base = self._load_dir(self.base_dir)
+                except Exception as e:
+                    print(f"RAG: Could not load base index: {e}")
+
+        # Deltas already folded into the base (crash between publish and cleanup) are dropped.
+        compacted = self._compacted_names()
+        names = self._delta_names_on_disk()
+        deltas: list[tuple[str, Any]] = []
+        for name in sorted(names):
+            path = os.path.join(self.delta_root, name)
+            if name in compacted:
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            if name in loaded:
+                deltas.append((name, loaded[name]))
+                continue
+            try:
+                deltas.append((name, self._load_dir(path)))
+            except Exception as e:
+                print(f"RAG: Could not load delta shard {name}: {e}")
+
+        with self._lock:
+            self.base = base
+            self.deltas = deltas
+            self._base_signature = base_signature
+            self._delta_names = names
+
+    def refresh(self) -> bool:
+        """Pick up deltas and compactions written by other processes. Returns True if anything changed."""
+        if self._base_index_signature() == self._base_signature and self._delta_names_on_disk() == self._delta_names:
+            return False
+        self.load()
+        return True
+
+    @property
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self.base is None and not self.deltas
+
+    def _shards(self) -> list[Any]:
+        with self._lock:
+            shards = [store for _, store in self.deltas]
+            if self.base is not None:
+                shards.insert(0, self.base)
+            return shards
+
+    def add_documents(self, docs: list[Any]) -> int:
+        """Index ``docs`` as a new delta shard. Returns the number of chunks written."""
+        from langchain_community.vectorstores import FAISS
+
+        if not docs:
+            return 0
+        shard = FAISS.from_documents(docs, self.embeddings)
+        name = f"delta-{time.time_ns()}"
+        os.makedirs(self.delta_root, exist_ok=True)
+        build_dir = tempfile.mkdtemp(prefix=f".{name}.build-", dir=self.delta_root)
+        try:
+            shard.save_local(build_dir)
+            os.replace(build_dir, os.path.join(self.delta_root, name))
+        except Exception:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+
+        with self._lock:
+            self.deltas.append((name, shard))
+            self._delta_names = self._delta_names | {name}
+        self.maybe_compact_async()
+        return len(docs)
+
+    def similarity_search_with_score(self, query: str, k: int = 4) -> list[tuple[Any, float]]:
+        self.refresh()
+        shards = self._shards()
+        if not shards:
+            return []
+        vector = self.embeddings.embed_query(query)
+        hits: list[tuple[Any, float]] = []
+        for shard in shards:
+            hits.extend(shard.similarity_search_with_score_by_vector(vector, k=k))
+        # All shards share one embedding model and L2 metric, so distances compare directly.
+        hits.sort(key=lambda hit: float(hit[1]))
+        return hits[:k]
+
+    def similarity_search(self, query: str, k: int = 4) -> list[Any]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+
+    def maybe_compact_async(self) -> bool:
+        with self._lock:
+            if len(self.deltas) < self.compact_threshold:
+                return False
+            if self._compaction_thread is not None and self._compaction_thread.is_alive():
+                return False
+            self._compaction_thread = threading.Thread(
+                target=self._compact_safely, name="faiss-compaction", daemon=True
+            )
+            self._compaction_thread.start()
+        return True
+
+    def _compact_safely(self) -> None:
+        try:
+            merged = self.compact()
+            print(f"RAG: Compacted {merged} delta shard(s) into base index.")
+        except Exception as e:
+            print(f"RAG: Delta compaction failed: {e}")
+
+    def compact(self) -> int:
+        """Fold the delta shards on disk into the base index. Returns shards merged.
+
+        Returns 0 without doing anything while another process is compacting.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+        lock = try_flock(self.lock_path)
+        if lock is None:
+            return 0
+        try:
+            return self._compact_locked()
+        finally:
+            if lock is not True:
+                lock.close()
+
+    def _compact_locked(self) -> int:
+        self.load()  # the base as last published and every delta not folded into it yet
+        with self._lock:
+            pending = list(self.deltas)
+        if not pending:
+            return 0
+
+        # Build the merged index from disk copies so live shards keep serving queries meanwhile.
+        if os.path.isdir(self.base_dir):
+            merged = self._load_dir(self.base_dir)
+            to_merge = pending
+        else:
+            merged = self._load_dir(os.path.join(self.delta_root, pending[0][0]))
+            to_merge = pending[1:]
+        for _, shard in to_merge:
+            merged.merge_from(shard)
+
+        names = [name for name, _ in pending]
+        build_dir = make_build_dir(self.base_dir)
+        try:
+            merged.save_local(build_dir)
+            with open(os.path.join(build_dir, COMPACTION_MANIFEST), "w", encoding="utf-8") as f:
+                json.dump({"deltas": sorted(names)}, f)
+            publish_index_atomically(build_dir, self.base_dir)
+        except Exception:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+
+        for name in names:
+            shutil.rmtree(os.path.join(self.delta_root, name), ignore_errors=True)
+        with self._lock:
+            self.base = merged
+            self.deltas = [(name, shard) for name, shard in self.deltas if name not in names]
+            self._base_signature = self._base_index_signature()
+            self._delta_names = self._delta_names - set(names)
+        return len(names)
+
+
+DOCSTORE_SQLITE = "docstore.sqlite"
+
+
+def export_sqlite_docstore(index_dir: str, store: Any = None, index_name: str = "index") -> str:
+    """Write the chunk texts/metadata of a FAISS index to ``docstore.sqlite``.
+
+    Rows are keyed by FAISS vector position so a search hit can be resolved
+    with a single primary-key lookup. Pass ``store`` to skip reloading the
+    pickled docstore (e.g. right after a build).
+    """
+    if store is None:
+        from langchain_community.embeddings import FakeEmbeddings
+        from langchain_community.vectorstores import FAISS
+        # Only the docstore is needed; the embedding model is never called.
+        store = FAISS.load_local(
+            index_dir, FakeEmbeddings(size=1), index_name=index_name, allow_dangerous_deserialization=True
+        )
+
+    final_path = os.path.join(index_dir, DOCSTORE_SQLITE)
+    tmp_path = f"{final_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute(
+            "CREATE TABLE chunks (position INTEGER PRIMARY KEY, doc_id TEXT NOT NULL, "
+            "page_content TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        rows = []
+        for position, doc_id in store.index_to_docstore_id.items():
+            doc = store.docstore.search(doc_id)
+            if isinstance(doc, str):  # docstore returns an error string for missing ids
+                continue
+            rows.append((
+                int(position),
+                str(doc_id),
+                str(getattr(doc, "page_content", "") or ""),
+                json.dumps(getattr(doc, "metadata", {}) or {}, ensure_ascii=False, default=str),
+            ))
+        conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, final_path)
+    return final_path
+
+
+class MmapFAISSStore:
+    """Read-only FAISS store that memory-maps the index and reads chunks from SQLite.
+
+    Vectors are mapped with ``IO_FLAG_MMAP_IFC`` so every worker process shares
+    the same page-cache pages, and only the hit rows are fetched from
+    ``docstore.sqlite`` instead of unpickling the whole docstore at startup.
+    Exposes the ``similarity_search*`` subset of the LangChain FAISS API used by
+    the app (L2 distance, no query normalisation - same as the default FAISS store).
+
+    The docstore is opened once, here, next to the index it belongs to. The open
+    file handle keeps pointing at that version even after
+    ``publish_index_atomically`` swaps the directory, so row positions always
+    resolve against the index they came from. The connection is shared by all
+    threads under a lock.
+    """
+
+    def __init__(self, index_dir: str, embeddings: Any, index_name: str = "index"):
+        import faiss
+
+        self.index_dir = index_dir
+        self.embeddings = embeddings
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+        self.index = faiss.read_index(os.path.join(index_dir, f"{index_name}.faiss"), flags)
+        self.docstore_path = os.path.join(index_dir, DOCSTORE_SQLITE)
+        if not os.path.isfile(self.docstore_path):
+            raise FileNotFoundError(f"Missing {DOCSTORE_SQLITE} in {index_dir}")
+        # immutable=1: published indexes never change in place, so no locking or journal lookups by path.
+        uri = f"file:{os.path.abspath(self.docstore_path)}?mode=ro&immutable=1"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._conn.execute("SELECT count(*) FROM chunks").fetchone()  # open the file now, not on first search
+        self._conn_lock = threading.Lock()
+
+    def similarity_search_with_score_by_vector(self, embedding: Any, k: int = 4, **kwargs: Any) -> list[tuple[Any, float]]:
+        import numpy as np
+        from langchain_core.documents import Document
+
+        query = np.asarray([embedding], dtype=np.float32)
+        distances, positions = self.index.search(query, int(k))
+        hits = [(int(p), float(d)) for p, d in zip(positions[0], distances[0]) if int(p) >= 0]
+        if not hits:
+            return []
+
+        placeholders = ",".join("?" for _ in hits)
+        with self._conn_lock:
+            rows = self._conn.execute(
+                f"SELECT position, page_content, metadata FROM chunks WHERE position IN ({placeholders})",
+                [p for p, _ in hits],
+            ).fetchall()
+        by_position = {int(r[0]): Document(page_content=r[1], metadata=json.loads(r[2])) for r in rows}
+        return [(by_position[p], d) for p, d in hits if p in by_position]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> list[tuple[Any, float]]:
+        return self.similarity_search_with_score_by_vector(self.embeddings.embed_query(query), k=k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list[Any]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+
+
+def load_study_store(index_dir: str, embeddings: Any, prefer_mmap: bool = True) -> Any:
+    """Load an index directory, memory-mapped when it ships a SQLite docstore."""
+    if prefer_mmap and os.path.isfile(os.path.join(index_dir, DOCSTORE_SQLITE)):
+        try:
+            return MmapFAISSStore(index_dir, embeddings)
+        except Exception as e:
+            print(f"FAISS mmap load failed, falling back to full load: {e}")
+    from langchain_community.vectorstores import FAISS
+    return FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+
+
+
+SNAPSHOT_POINTER = "CURRENT"
+
+
+def _snapshot_versions(snapshots_dir: str) -> list[str]:
+    # Dot-prefixed entries are in-progress builds from make_build_dir.
+    return sorted(
+        name for name in os.listdir(snapshots_dir)
+        if not name.startswith(".") and os.path.isfile(os.path.join(snapshots_dir, name, "index.faiss"))
+    )
+
+
+def publish_snapshot(build_dir: str, snapshots_dir: str, version: Optional[str] = None, keep: int = 3) -> str:
+    """Move a fully written index into ``snapshots_dir/<version>`` and point CURRENT at it.
+
+    Snapshots are immutable once published; the pointer file is replaced
+    atomically, so a watcher sees either the old or the new version. Only the
+    newest ``keep`` snapshots are retained (the active one is never removed).
+    """
+    build = os.path.abspath(build_dir)
+    if not os.path.isfile(os.path.join(build, "index.faiss")):
+        raise FileNotFoundError(f"Refusing to publish incomplete index at {build}")
+    os.makedirs(snapshots_dir, exist_ok=True)
+    version = version or time.strftime("%Y%m%dT%H%M%S", time.gmtime()) + f"-{time.time_ns() % 1_000_000:06d}"
+    target = os.path.join(snapshots_dir, version)
+    if os.path.exists(target):
+        raise FileExistsError(f"Snapshot {version} already exists")
+    os.replace(build, target)
+
+    pointer = os.path.join(snapshots_dir, SNAPSHOT_POINTER)
+    with open(f"{pointer}.tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(f"{pointer}.tmp", pointer)
+
+    if keep > 0:
+        for old in _snapshot_versions(snapshots_dir)[:-keep]:
+            if old != version:
+                shutil.rmtree(os.path.join(snapshots_dir, old), ignore_errors=True)
+    return version
+
+
+def resolve_snapshot(snapshots_dir: str) -> Optional[tuple[str, str]]:
+    """Return ``(version, path)`` of the active snapshot: CURRENT if set, else the newest."""
+    if not snapshots_dir or not os.path.isdir(snapshots_dir):
+        return None
+    pointer = os.path.join(snapshots_dir, SNAPSHOT_POINTER)
+    if os.path.isfile(pointer):
+        with open(pointer, encoding="utf-8") as f:
+            version = f.read().strip()
+        path = os.path.join(snapshots_dir, version)
+        if version and os.path.isfile(os.path.join(path, "index.faiss")):
+            return version, path
+    versions = _snapshot_versions(snapshots_dir)
+    if not versions:
+        return None
+    return versions[-1], os.path.join(snapshots_dir, versions[-1])
+
+
+def _directory_version(index_dir: str) -> Optional[str]:
+    """Version tag for an unversioned index dir (changes whenever it is republished)."""
+    try:
+        stat = os.stat(os.path.join(index_dir, "index.faiss"))
+    except OSError:
+        return None
+    return f"{os.path.basename(os.path.normpath(index_dir))}@{stat.st_mtime_ns}-{stat.st_size}"
+
+
+class HotSwapStore:
+    """Holds the active study-material store and swaps in new index versions live.
+
+    The active version comes from ``snapshots_dir`` (see ``publish_snapshot``)
+    when it has any snapshot, otherwise from ``index_dir`` itself. ``reload``
+    loads the new index off to the side and then replaces the reference in one
+    assignment: requests that already called ``current()`` finish on the old
+    store, which is released once they drop it. ``start_watching`` polls for a
+    new version in a daemon thread.
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        loader: Any,
+        snapshots_dir: Optional[str] = None,
+        poll_interval_s: float = 30.0,
+    ):
+        self.index_dir = index_dir
+        self.snapshots_dir = snapshots_dir
+        self.loader = loader
+        self.poll_interval_s = float(poll_interval_s)
+        self._store: Any = None
+        self._reload_lock = threading.Lock()
+        self._status: dict[str, Any] = {
+            "version": None, "path": None, "loaded_at": None, "load_ms": None, "reloads": 0, "last_error": None,
+        }
+        self._watcher: Optional[threading.Thread] = None
+
+    def current(self) -> Any:
+        return self._store
+
+    def _target(self) -> Optional[tuple[str, str]]:
+        snapshot = resolve_snapshot(self.snapshots_dir) if self.snapshots_dir else None
+        if snapshot:
+            return snapshot
+        version = _directory_version(self.index_dir)
+        return (version, self.index_dir) if version else None
+
+    def reload(self, force: bool = False) -> dict[str, Any]:
+        """Load the active version if it differs from the one being served."""
+        with self._reload_lock:
+            target = self._target()
+            if target is None:
+                self._status["last_error"] = f"No index found at {self.snapshots_dir or self.index_dir}"
+                return self.status()
+            version, path = target
+            if version == self._status["version"] and not force:
+                return self.status()
+
+            started = time.perf_counter()
+            try:
+                store = self.loader(path)
+            except Exception as e:
+                # Keep serving the previous version.
+                self._status["last_error"] = f"{version}: {e}"
+                print(f"FAISS reload of {version} failed, keeping {self._status['version']}: {e}")
+                return self.status()
+            load_ms = round((time.perf_counter() - started) * 1000.0, 1)
+
+            previous = self._store
+            self._store = store
+            self._status.update({
+                "version": version,
+                "path": os.path.abspath(path),
+                "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "load_ms": load_ms,
+                "reloads": self._status["reloads"] + (previous is not None),
+                "last_error": None,
+            })
+            print(f"FAISS store now serving {version} (loaded in {load_ms} ms)")
+        return self.status()
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.poll_interval_s)
+            try:
+                target = self._target()
+                if target and target[0] != self._status["version"]:
+                    self.reload()
+            except Exception as e:
+                print(f"FAISS watcher error: {e}")
+
+    def start_watching(self) -> bool:
+        if self.poll_interval_s <= 0 or self._watcher is not None:
+            return False
+        self._watcher = threading.Thread(target=self._watch, name="faiss-watcher", daemon=True)
+        self._watcher.start()
+        return True
+
+    def status(self) -> dict[str, Any]:
+        return dict(self._status, watching=self._watcher is not None)
+
+
+
+def resolve_study_index_path(backend_dir: str) -> str:
+    """Locate ``vectorstore/db_faiss`` next to the backend, the repo root or the CWD."""
+    candidates = [
+        os.path.join(backend_dir, "vectorstore", "db_faiss"),
+        os.path.join(backend_dir, "..", "vectorstore", "db_faiss"),
+        "vectorstore/db_faiss",
+    ]
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return "vectorstore/db_faiss"
+
+
+def open_study_store(
+    index_dir: str,
+    embeddings: Any,
+    snapshots_dir: Optional[str] = None,
+    prefer_mmap: bool = True,
+    poll_interval_s: float = 30.0,
+) -> HotSwapStore:
+    """Load the study-material index into a ``HotSwapStore`` and start watching for new versions."""
+    holder = HotSwapStore(
+        index_dir,
+        lambda path: load_study_store(path, embeddings, prefer_mmap=prefer_mmap),
+        snapshots_dir=snapshots_dir or os.path.join(os.path.dirname(os.path.abspath(index_dir)), "snapshots"),
+        poll_interval_s=poll_interval_s,
+    )
+    status = holder.reload()
+    if status.get("last_error"):
+        print(f"FAISS load skipped: {status['last_error']}")
+    holder.start_watching()
+    return holder
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="FAISS index maintenance")
+    parser.add_argument("command", choices=["export-docstore"])
+    parser.add_argument("index_dir", help="Directory containing index.faiss / index.pkl")
+    args = parser.parse_args()
+    print(f"Wrote {export_sqlite_docstore(args.index_dir)}")
@@ -51,7 +51,7 @@ import BrandLogo from './components/BrandLogo';
 import { useTheme } from './context/ThemeContext';
 import { getToken, setToken, clearToken, isTokenExpiringSoon, shouldForceLogout, getTokenRemainingMinutes, shouldWarnTokenExpiry } from './utils/tokenManager';
 import { useAuth } from './AuthContext';
-import { API_BASE } from './utils/apiConfig';
+import { API_BASE, fetchAllPages } from './utils/apiConfig';
 import useHinglishVoice from './hooks/useHinglishVoice';
 import { getExamTrackerSummary } from './utils/examSchedule';
 import { BADGE_CATALOG, normalizeAchievements, computeBadgeTriggers, mergeAchievements, getBadgeById } from './utils/achievements';
@@ -1035,7 +1035,7 @@ const Dashboard = ({ onThemeOverride }) => {
 
   const loadSessions = async () => {
     try {
-      const res = await fetch(`${API_BASE}/sessions`, { headers: getHeaders() });
+      const res = await fetchAllPages(`${API_BASE}/sessions`, { headers: getHeaders() });
       if (!res.ok) {
         console.error('Failed to load sessions:', res.status);
         // Supreme rule: do not wipe UI on refresh/errors; retry once.
@@ -1045,10 +1045,9 @@ const Dashboard = ({ onThemeOverride }) => {
         }
         return;
       }
-      const data = await res.json();
-      console.log('Sessions loaded:', data);
+      const safeSessions = res.items;
+      console.log('Sessions loaded:', safeSessions);
       sessionsRetryRef.current = 0;
-      const safeSessions = Array.isArray(data) ? data : [];
       setSessions(safeSessions);
       setRecentChats(safeSessions.map(s => ({ id: s.id, title: s.title })));
     } catch (e) {
@@ -1349,10 +1348,9 @@ const Dashboard = ({ onThemeOverride }) => {
     isHistoryLoadingRef.current = true;
     try {
       setSessionId(id);
-      const res = await fetch(`${API_BASE}/history?session_id=${id}`, { headers: getHeaders() });
+      const res = await fetchAllPages(`${API_BASE}/history?session_id=${id}`, { headers: getHeaders() }, { olderFirst: true });
       if (!res.ok) throw new Error('Failed to load chat history');
-      const data = await res.json();
-      const formattedMessages = data.map(msg => ({
+      const formattedMessages = res.items.map(msg => ({
         id: msg.id,
         text: msg.text,
         sender: msg.sender,
@@ -14,7 +14,7 @@ import {
 import { useLocation, useNavigate } from 'react-router-dom';
 import { useAuth } from './AuthContext';
 import BackButton from './components/BackButton';
-import { API_BASE } from './utils/apiConfig';
+import { API_BASE, fetchAllPages } from './utils/apiConfig';
 
 const NEON_PURPLE = '#bb86fc';
 const NEON_CYAN = '#03dac6';
@@ -299,15 +299,14 @@ const EditProfile = () => {
     try {
       const token = localStorage.getItem('token');
       if (!token) return;
-      const response = await fetch(`${API_BASE}/history`, {
+      const response = await fetchAllPages(`${API_BASE}/history?full=true`, {
         headers: {
           'Authorization': `Bearer ${token}`
         }
-      });
+      }, { olderFirst: true });
 
       if (response.ok) {
-        const data = await response.json();
-        setChatHistory(Array.isArray(data) ? data : []);
+        setChatHistory(response.items);
       }
     } catch (err) {
       console.error('Failed to load chat history:', err);
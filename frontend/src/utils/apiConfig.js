@@ -23,3 +23,31 @@ export const buildApiUrl = (path = '') => {
   const leadingSlash = normalizedPath.startsWith('/') ? '' : '/';
   return `${API_BASE}${leadingSlash}${normalizedPath.replace(/^\/+/, '')}`;
 };
+
+export const NEXT_CURSOR_HEADER = 'X-Next-Cursor';
+
+/**
+ * Fetches every page of a keyset-paginated list, following X-Next-Cursor.
+ * Pages arrive newest first; with `olderFirst` each older page is put in front
+ * (for lists that are oldest-first within a page, like an open chat).
+ * @param {string} url List URL without a cursor.
+ * @param {RequestInit} init Fetch options (headers) reused for every page.
+ * @returns {Promise<{ok: boolean, status: number, items: Array}>}
+ */
+export const fetchAllPages = async (url, init = {}, { olderFirst = false, maxPages = 50 } = {}) => {
+  let items = [];
+  let cursor = null;
+  for (let page = 0; page < maxPages; page += 1) {
+    const separator = url.includes('?') ? '&' : '?';
+    const res = await fetch(cursor ? `${url}${separator}cursor=${encodeURIComponent(cursor)}` : url, init);
+    if (!res.ok) {
+      return { ok: false, status: res.status, items };
+    }
+    const data = await res.json();
+    const rows = Array.isArray(data) ? data : [];
+    items = olderFirst ? rows.concat(items) : items.concat(rows);
+    cursor = res.headers.get(NEXT_CURSOR_HEADER);
+    if (!cursor) break;
+  }
+  return { ok: true, status: 200, items };
+};